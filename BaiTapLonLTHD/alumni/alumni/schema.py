@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from drf_yasg import openapi
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+api_info = openapi.Info(
+    title="Alumni API",
+    default_version='v1',
+    description="API for AlumniApp",
+    contact=openapi.Contact(email="trungtiendoan22@gmail.com"),
+    license=openapi.License(name="Doan Tien Trung@2022"),
+)
+
+schema_view = get_schema_view(
+    api_info,
+    public=True,
+    permission_classes=(permissions.AllowAny, ),
+)
+
+SCHEMA_FORMATS = {
+    '.json': ('swagger.json', 'application/json'),
+    '.yaml': ('swagger.yaml', 'application/yaml'),
+}
+
+# path -> (mtime, nội dung, etag); chỉ đọc lại file khi nó được build lại
+_prebuilt_cache = {}
+
+
+def schema_path(format):
+    return os.path.join(settings.API_SCHEMA_DIR, SCHEMA_FORMATS[format][0])
+
+
+def _load_prebuilt(format):
+    path = schema_path(format)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        raise Http404('Schema has not been built, run "manage.py build_schema"')
+    cached = _prebuilt_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            content = f.read()
+        cached = (mtime, content, hashlib.sha1(content).hexdigest())
+        _prebuilt_cache[path] = cached
+    return cached
+
+
+@condition(etag_func=lambda request, format: _load_prebuilt(format)[2])
+def prebuilt_schema(request, format):
+    _, content, _ = _load_prebuilt(format)
+    response = HttpResponse(content, content_type=SCHEMA_FORMATS[format][1])
+    # Client luôn hỏi lại server, nhận 304 khi ETag không đổi
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def schema_json_view():
+    if settings.API_SCHEMA_PREBUILT:
+        return prebuilt_schema
+    return schema_view.without_ui(cache_timeout=settings.API_SCHEMA_CACHE_TIMEOUT)
@@ -57,17 +57,42 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # orjson nếu đã cài, nếu không thì dùng json của thư viện chuẩn
+    'DEFAULT_RENDERER_CLASSES': (
+        'alumniapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'alumniapp.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Token bucket (alumniapp/throttling.py): "N/min" cho phép liên tiếp N request rồi hồi N token mỗi phút.
+    # 'user'/'anon' áp dụng cho mọi endpoint, các scope còn lại cho endpoint có throttle_scope tương ứng
+    'DEFAULT_THROTTLE_CLASSES': (
+        'alumniapp.throttling.UserRateThrottle',
+        'alumniapp.throttling.ScopedRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '60/min',
+        'user': '600/min',
+        'react': '60/min',
+        'comment': '20/min',
+        'statistics': '10/min',
+    },
 }
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'alumniapp.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'oauth2_provider.middleware.OAuth2TokenMiddleware',
+    'alumniapp.db_router.ReplicaRoutingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware'
 ]
 
@@ -113,6 +138,14 @@ DATABASES = {
     }
 }
 
+# Đọc từ replica cho các request GET/HEAD/OPTIONS, ghi luôn vào primary.
+# Thêm alias của replica vào DATABASES rồi khai báo trong REPLICA_DATABASES.
+DATABASE_ROUTERS = ['alumniapp.db_router.ReplicaRouter']
+REPLICA_DATABASES = []
+# Sau khi ghi, người dùng được ghim vào primary trong khoảng thời gian này (giây).
+# Cần cache dùng chung (Redis/Memcached) khi chạy nhiều worker.
+REPLICA_PIN_SECONDS = 5
+
 AUTH_USER_MODEL = 'alumniapp.User'
 
 # Password validation
@@ -160,6 +193,85 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_ROOT = '%s/alumniapp/static/' % BASE_DIR
 CKEDITOR_UPLOAD_PATH = 'ckeditor/images'
+# Ảnh trong nội dung rộng hơn mức này (px) được hiển thị bằng bản thu nhỏ (ckeditor/resized/...)
+RICH_TEXT_IMAGE_MAX_WIDTH = 1080
+# Ảnh upload không còn nội dung nào dùng quá số giờ này thì bị job sweep_orphan_images xóa
+RICH_TEXT_ORPHAN_GRACE_HOURS = 24
+# Chỉ bật sau khi đã chạy "manage.py backfill_rendered_text --force" để ghi nhận ảnh của nội dung cũ
+RICH_TEXT_ORPHAN_SWEEP_ENABLED = False
+
+# OpenAPI schema: khi API_SCHEMA_PREBUILT=True, /swagger.json|yaml được phục vụ
+# từ file do lệnh "manage.py build_schema" tạo ra (kèm ETag) thay vì sinh lại mỗi request
+API_SCHEMA_DIR = BASE_DIR / 'schema'
+API_SCHEMA_PREBUILT = False
+API_SCHEMA_CACHE_TIMEOUT = 0
+
+# Số bản ghi xóa trong mỗi lô khi purge dữ liệu đã xóa mềm
+PURGE_BATCH_SIZE = 500
+# Task purge không cập nhật tiến độ trong khoảng này (giây) thì worker khác được lấy lại
+PURGE_STALE_SECONDS = 10 * 60
+
+# Bình luận/reaction cùng loại trên cùng bài viết trong khoảng này (giây) được gộp vào một thông báo
+NOTIFICATION_COALESCE_SECONDS = 60 * 60
+
+# Nén response (brotli nếu đã cài gói brotli, nếu không thì gzip) khi lớn hơn ngưỡng này (byte)
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 4
+RESPONSE_COMPRESSION_EXCLUDE_PATHS = ['/o/']
+
+# Changelist admin của bảng lớn hơn ngưỡng này (dòng) dùng số dòng ước lượng thay cho COUNT(*)
+ADMIN_ESTIMATED_COUNT_MIN_ROWS = 100000
+
+# API /sync/: nhật ký thay đổi giữ trong SYNC_RETENTION_DAYS ngày (client có con trỏ cũ hơn phải tải lại toàn bộ);
+# thay đổi mới hơn SYNC_SETTLE_SECONDS giây (hoặc mới hơn transaction đang ghi lâu nhất) chưa được trả về
+# để transaction đang chạy kịp commit
+SYNC_RETENTION_DAYS = 30
+SYNC_SETTLE_SECONDS = 2
+
+# Kết quả request có header Idempotency-Key được giữ trong khoảng này (giây) để phát lại khi client gửi lại
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+# Request đang xử lý giữ key trong khoảng này (giây); quá hạn thì request gửi lại cùng key được chạy thay
+IDEMPOTENCY_LEASE_SECONDS = 60
+
+# Thông báo đã đọc không thay đổi sau read_days ngày, hoặc cũ hơn max_days ngày, được chuyển sang bảng
+# lưu trữ (retention.py); 'default' áp dụng cho các loại không khai báo riêng
+NOTIFICATION_RETENTION = {
+    'default': {'read_days': 30, 'max_days': 180},
+    'REACTION': {'read_days': 7, 'max_days': 90},
+    'SYSTEM': {'read_days': 90, 'max_days': 365},
+}
+# Thông báo trong bảng lưu trữ cũ hơn số ngày này bị xóa hẳn (None: giữ mãi)
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = None
+# Câu trả lời của khảo sát đã đóng quá số ngày này được chuyển sang bảng lưu trữ (None: không chuyển)
+SURVEY_RESPONSE_ARCHIVE_AFTER_DAYS = 180
+
+# Nhật ký thao tác quản trị (audit.py) được gom trong bộ nhớ và ghi một lần khi đủ số sự kiện này hoặc
+# sau AUDIT_LOG_FLUSH_SECONDS giây; 0: ghi ngay trong request
+AUDIT_LOG_BUFFER_SIZE = 100
+AUDIT_LOG_FLUSH_SECONDS = 5
+
+# Upload ảnh theo từng phần (uploads.py): giới hạn kích thước file và mỗi phần (byte), phiên không có
+# thay đổi trong UPLOAD_SESSION_TTL_HOURS bị xóa. File tạm nằm trên đĩa của server nhận request nên khi
+# chạy nhiều server, UPLOAD_TEMP_DIR phải là thư mục dùng chung (None: thư mục tạm của hệ thống)
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL_HOURS = 24
+UPLOAD_TEMP_DIR = None
+
+# Nhắc trước hạn chót (reminders.py): số phút trước khi khảo sát đóng / hết hạn đổi mật khẩu của giảng viên,
+# mỗi mốc gửi một lần thông báo và email cho những người chưa trả lời / chưa đổi
+DEADLINE_REMINDER_OFFSETS = {
+    'SURVEY': [24 * 60, 60],
+    'PASSWORD': [6 * 60, 60],
+}
+DEADLINE_REMINDER_EMAIL = True
+
+# Giới hạn request: None thì mỗi worker đếm riêng trong bộ nhớ; khi chạy nhiều worker đặt tên một cache dùng
+# chung (Redis/Memcached) trong CACHES. Mỗi lần gọi cache, worker lấy trước THROTTLE_LEASE_FRACTION số token
+# của bucket, chia cho số worker dùng chung cache (THROTTLE_WORKERS), để dùng dần mà không gọi lại cache
+THROTTLE_CACHE = None
+THROTTLE_LEASE_FRACTION = 0.1
+THROTTLE_WORKERS = 1
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -0,0 +1,25 @@
+"""
+Local settings: two SQLite connections standing in for the MySQL primary
+and its read replica, so the replica router can be exercised without MySQL.
+
+    python manage.py migrate --settings=alumni.settings_local
+    python manage.py runserver --settings=alumni.settings_local
+"""
+
+from .settings import *  # noqa
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Cùng một file với primary (replica không có độ trễ); khi chạy test,
+    # replica dùng chung kết nối với default nhờ MIRROR.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+REPLICA_DATABASES = ['replica']
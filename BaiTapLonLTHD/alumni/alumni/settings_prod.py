@@ -0,0 +1,26 @@
+"""
+Production settings: no dev-only apps/middleware and a prebuilt OpenAPI schema.
+
+    DJANGO_SETTINGS_MODULE=alumni.settings_prod python manage.py build_schema
+"""
+import os
+
+from .settings import *  # noqa
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split(',')
+
+DEV_ONLY_APPS = ['debug_toolbar']
+DEV_ONLY_MIDDLEWARE = ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_ONLY_APPS]
+MIDDLEWARE = [m for m in MIDDLEWARE if m not in DEV_ONLY_MIDDLEWARE]
+
+API_SCHEMA_PREBUILT = True
+API_SCHEMA_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Swagger UI/ReDoc tải schema từ file đã build sẵn
+SWAGGER_SETTINGS = {'SPEC_URL': ('schema-json', {'format': '.json'})}
+REDOC_SETTINGS = {'SPEC_URL': ('schema-json', {'format': '.json'})}
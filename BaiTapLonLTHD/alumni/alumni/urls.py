@@ -14,34 +14,26 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-import debug_toolbar
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include, re_path
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Alumni API",
-        default_version='v1',
-        description="API for AlumniApp",
-        contact=openapi.Contact(email="trungtiendoan22@gmail.com"),
-        license=openapi.License(name="Doan Tien Trung@2022"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny, ),
-)
+from .schema import schema_view, schema_json_view
 
 urlpatterns = [
     path('', include('alumniapp.urls')),
     #path('admin/', admin.site.urls),
     path('o/', include('oauth2_provider.urls', namespace='oauth2_provider')),
     re_path(r'^ckeditor/',include('ckeditor_uploader.urls')),
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    re_path('__debug__', include(debug_toolbar.urls)),
-
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_json_view(), name='schema-json'),
+    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=settings.API_SCHEMA_CACHE_TIMEOUT),
+            name='schema-swagger-ui'),
+    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=settings.API_SCHEMA_CACHE_TIMEOUT),
+            name='schema-redoc'),
 ]
+
+# debug_toolbar chỉ có trong môi trường dev (xem settings_prod.py)
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    import debug_toolbar
+
+    urlpatterns.append(re_path('__debug__', include(debug_toolbar.urls)))
@@ -1,13 +1,22 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
 from django import forms
 from django.db.models import Count
+from django.forms.models import BaseInlineFormSet
 from django.template.response import TemplateResponse
-from django.utils.html import mark_safe
-from .models import User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption, SurveyResponse, Group
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, mark_safe
+from . import surveys
+from .paginators import EstimatedCountPaginator
+from .richtext import get_rendered
+from .models import User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption, SurveyResponse, Group, PurgeTask, \
+    Event, EventAttendee, Job, JobRun, AuditEvent
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from django.urls import path
 from django.db.models.functions import TruncMonth, TruncYear, TruncQuarter
 from django.http import JsonResponse
+import datetime
 import json
 
 
@@ -24,14 +33,47 @@ class PostForm(forms.ModelForm):
         fields = '__all__'
 
 
-class CommentInline(admin.StackedInline):
+# Số bình luận mới nhất hiển thị trong trang sửa bài viết
+INLINE_RECENT_LIMIT = 20
+
+
+def changelist_link(admin_site, model, label, **filters):
+    url = reverse('admin:%s_%s_changelist' % (model._meta.app_label, model._meta.model_name),
+                  current_app=admin_site.name)
+    query = '&'.join('%s=%s' % item for item in filters.items())
+    return format_html('<a href="{}?{}">{}</a>', url, query, label)
+
+
+class RecentInlineFormSet(BaseInlineFormSet):
+    # Chỉ lấy INLINE_RECENT_LIMIT bản ghi mới nhất (cắt sau khi đã lọc theo bài viết)
+    def get_queryset(self):
+        if not hasattr(self, '_recent_queryset'):
+            self._recent_queryset = super().get_queryset().order_by('-created_at')[:INLINE_RECENT_LIMIT]
+        return self._recent_queryset
+
+
+class CommentInline(admin.TabularInline):
+    """Bản tóm tắt chỉ đọc các bình luận mới nhất; xem đầy đủ ở danh sách bình luận."""
     model = Comment
-    pk_name = 'post'
+    formset = RecentInlineFormSet
+    fields = ('author', 'excerpt', 'created_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+    verbose_name_plural = 'Recent comments'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author').prefetch_related('rendered')
 
-class ReactInline(admin.StackedInline):
-    model = Reaction
-    pk_name = 'post'
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def excerpt(self, comment):
+        return get_rendered(comment, 'content').excerpt
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -43,10 +85,27 @@ class PostAdmin(admin.ModelAdmin):
     form = PostForm
     list_display = ('author', 'post_type', 'created_at', 'comments_locked')
     list_filter = ('post_type', 'created_at', 'comments_locked')
+    list_select_related = ('author',)
     search_fields = ('content', 'author__username')
     ordering = ('-created_at',)
-    inlines = (CommentInline, ReactInline)
-    readonly_fields = ['avatar']
+    autocomplete_fields = ('author',)
+    inlines = (CommentInline,)
+    readonly_fields = ['avatar', 'comment_summary', 'reaction_summary']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def comment_summary(self, post):
+        if not post.pk:
+            return '-'
+        count = Comment.objects.filter(post=post).count()
+        return changelist_link(self.admin_site, Comment, 'View all %d comments' % count, post=post.pk)
+
+    def reaction_summary(self, post):
+        if not post.pk:
+            return '-'
+        counts = post.reactions.values('reaction_type').annotate(count=Count('id')).order_by('reaction_type')
+        label = ', '.join('%s: %d' % (row['reaction_type'], row['count']) for row in counts) or 'No reactions'
+        return changelist_link(self.admin_site, Reaction, label, post=post.pk)
 
     def avatar(self, Post):
         if Post:
@@ -65,44 +124,211 @@ class CommentAdmin(admin.ModelAdmin):
     form = CommentForm
     list_display = ('author', 'post', 'created_at')
     list_filter = ('created_at',)
+    list_select_related = ('author', 'post')
     search_fields = ('content', 'author__username')
     ordering = ('-created_at',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post', 'parent_comment')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class ReactionAdmin(admin.ModelAdmin):
     list_display = ('user', 'post', 'reaction_type', 'created_at')
     list_filter = ('reaction_type', 'created_at')
+    list_select_related = ('user', 'post')
     search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('post',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class SurveyAdmin(admin.ModelAdmin):
-    list_display = ('title', 'end_date', 'is_anonymous')
+    list_display = ('title', 'end_date', 'is_anonymous', 'audience_computed_at')
     list_filter = ('end_date', 'is_anonymous')
     search_fields = ('title', 'description')
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('audience_groups',)
+    readonly_fields = ('version', 'audience_computed_at', 'response_rate')
+
+    @admin.display(description='Response rate')
+    def response_rate(self, survey):
+        if survey.pk is None:
+            return '-'
+        counts = surveys.response_rate(survey.pk)
+        if counts['rate'] is None:
+            return '-'
+        return '%d / %d (%.1f%%)' % (counts['responded'], counts['eligible'], counts['rate'] * 100)
 
 
 class SurveyQuestionAdmin(admin.ModelAdmin):
     list_display = ('survey', 'question_text', 'question_type', 'required')
     list_filter = ('question_type', 'required')
+    list_select_related = ('survey',)
     search_fields = ('question_text',)
+    raw_id_fields = ('survey',)
 
 
 class SurveyOptionAdmin(admin.ModelAdmin):
     list_display = ('question', 'option_text', 'order')
+    list_select_related = ('question',)
     search_fields = ('option_text',)
+    raw_id_fields = ('question',)
 
 
 class SurveyResponseAdmin(admin.ModelAdmin):
     list_display = ('survey', 'user', 'submitted_at')
     list_filter = ('submitted_at',)
+    list_select_related = ('survey', 'user')
     search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('survey', 'question', 'selected_options')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_by', 'created_at')
     list_filter = ('created_at',)
+    list_select_related = ('created_by',)
     search_fields = ('name', 'description')
-    filter_horizontal = ('members',)
+    autocomplete_fields = ('created_by', 'members')
+
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('title', 'location', 'start_time', 'capacity', 'attendee_count')
+    list_filter = ('start_time',)
+    search_fields = ('title', 'location')
+    readonly_fields = ('attendee_count',)
+    raw_id_fields = ('post',)
+
+
+class EventAttendeeAdmin(admin.ModelAdmin):
+    list_display = ('event', 'user', 'created_at')
+    search_fields = ('user__username', 'event__title')
+    raw_id_fields = ('event', 'user')
+    list_select_related = ('event', 'user')
+
+
+class PurgeTaskAdmin(admin.ModelAdmin):
+    list_display = ('target_type', 'target_id', 'status', 'stage', 'owner', 'deleted_rows',
+                    'created_at', 'updated_at', 'finished_at')
+    list_filter = ('status', 'target_type')
+    readonly_fields = ('target_type', 'target_id', 'status', 'stage', 'owner', 'deleted_rows',
+                       'error', 'created_at', 'updated_at', 'finished_at')
+
+class JobRunInline(admin.TabularInline):
+    model = JobRun
+    extra = 0
+    max_num = 0
+    can_delete = False
+    readonly_fields = ('worker', 'started_at', 'duration_ms', 'status', 'result', 'error')
+
+    def get_queryset(self, request):
+        # Chỉ các lần chạy trong 7 ngày gần đây
+        since = timezone.now() - timezone.timedelta(days=7)
+        return super().get_queryset(request).filter(started_at__gte=since)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'schedule', 'enabled', 'next_run_at', 'last_run_at', 'last_status',
+                    'last_duration_ms', 'average_duration_ms', 'run_count', 'failure_count')
+    list_filter = ('enabled', 'last_status')
+    readonly_fields = ('name', 'last_run_at', 'last_status', 'last_duration_ms', 'last_error',
+                       'run_count', 'failure_count', 'total_duration_ms')
+    inlines = (JobRunInline,)
+
+    def save_model(self, request, obj, form, change):
+        # Tính lại lần chạy kế tiếp theo lịch mới
+        if 'schedule' in form.changed_data:
+            obj.next_run_at = None
+        super().save_model(request, obj, form, change)
+        if obj.next_run_at is None:
+            from .jobs import next_run
+            obj.next_run_at = next_run(obj.schedule, timezone.now())
+            obj.save(update_fields=['next_run_at'])
+
+
+class AuditLogFilterForm(forms.Form):
+    action = forms.ChoiceField(choices=[('', 'All actions')] + AuditEvent.Action.choices, required=False)
+    actor = forms.CharField(required=False, label='Actor username')
+    target_type = forms.CharField(required=False)
+    target_id = forms.IntegerField(required=False, min_value=1)
+    since = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    until = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+class AuditEventAdmin(admin.ModelAdmin):
+    """
+    Nhật ký chỉ đọc. Danh sách phân trang theo con trỏ id (?before=) thay cho changelist mặc định,
+    không cần COUNT(*) hay OFFSET trên bảng chỉ ghi thêm và rất lớn.
+    """
+    page_size = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def filter_events(self, queryset, data):
+        if data.get('action'):
+            queryset = queryset.filter(action=data['action'])
+        if data.get('actor'):
+            # Lọc theo tên lưu trong nhật ký: vẫn tìm được thao tác của tài khoản đã xóa hoặc đổi tên
+            queryset = queryset.filter(actor_username=data['actor'])
+        if data.get('target_type'):
+            queryset = queryset.filter(target_type=data['target_type'].lower())
+        if data.get('target_id'):
+            queryset = queryset.filter(target_id=data['target_id'])
+        # So sánh trực tiếp với created_at (không dùng __date) để đi theo index
+        if data.get('since'):
+            queryset = queryset.filter(created_at__gte=start_of_day(data['since']))
+        if data.get('until'):
+            queryset = queryset.filter(created_at__lt=start_of_day(data['until'] + datetime.timedelta(days=1)))
+        return queryset
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form = AuditLogFilterForm(request.GET)
+        queryset = self.filter_events(AuditEvent.objects.order_by('-pk'), form.cleaned_data if form.is_valid() else {})
+        try:
+            before = int(request.GET.get('before', ''))
+        except ValueError:
+            before = None
+        if before:
+            queryset = queryset.filter(pk__lt=before)
+
+        # Lấy dư một dòng để biết còn trang sau hay không
+        events = list(queryset[:self.page_size + 1])
+        next_query = None
+        if len(events) > self.page_size:
+            events = events[:self.page_size]
+            params = request.GET.copy()
+            params['before'] = events[-1].pk
+            next_query = params.urlencode()
+        params = request.GET.copy()
+        params.pop('before', None)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Audit log',
+            'opts': self.model._meta,
+            'form': form,
+            'events': events,
+            'next_query': next_query,
+            'first_query': params.urlencode() if before else None,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/audit-log.html', context)
+
 
 class PostAdminSite(admin.AdminSite):
     site_header = 'HE THONG MANG XA HOI CUU SINH VIEN'
@@ -193,4 +419,9 @@ admin_site.register(SurveyQuestion, SurveyQuestionAdmin)
 admin_site.register(SurveyOption, SurveyOptionAdmin)
 admin_site.register(SurveyResponse, SurveyResponseAdmin)
 admin_site.register(Group, GroupAdmin)
+admin_site.register(Event, EventAdmin)
+admin_site.register(EventAttendee, EventAttendeeAdmin)
+admin_site.register(PurgeTask, PurgeTaskAdmin)
+admin_site.register(Job, JobAdmin)
+admin_site.register(AuditEvent, AuditEventAdmin)
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AlumniappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'alumniapp'
+
+    def ready(self):
+        from . import signals
+        signals.connect(self)
@@ -0,0 +1,165 @@
+"""
+Async (ASGI) versions of the hottest read endpoints.
+
+The responses have the same shape as the DRF viewsets; every related object
+is prefetched up front so the serializers run without touching the database
+from the event loop.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from oauth2_provider.models import get_access_token_model
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import retention, surveys
+from .renderers import dumps
+from .models import Post, Survey, Notification, Reaction, ArchivedNotification, Group
+from .serializers import (
+    PostSerializer, PostListSerializer, SurveySerializer, NotificationListSerializer, ArchivedNotificationSerializer
+)
+from .views import post_list_queryset, reaction_count_rows
+
+AccessToken = get_access_token_model()
+
+POST_QUERYSET = Post.objects.select_related('author') \
+    .prefetch_related('rendered', 'comments__author', 'comments__rendered')
+POST_LIST_QUERYSET = post_list_queryset()
+SURVEY_QUERYSET = Survey.objects.filter(post__deleted_at__isnull=True) \
+    .prefetch_related('rendered', 'questions__options', 'questions__rendered',
+                      Prefetch('audience_groups', queryset=Group.objects.only('pk')))
+
+
+async def aget_user(request):
+    # Giống OAuth2Validator._load_access_token nhưng dùng ORM async
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer '):
+        return None
+    checksum = hashlib.sha256(auth[len('Bearer '):].strip().encode('utf-8')).hexdigest()
+    token = await AccessToken.objects.select_related('user').filter(token_checksum=checksum).afirst()
+    if token is None or not token.is_valid() or not token.user.is_active:
+        return None
+    return token.user
+
+
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if user is None:
+            return _json({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _json(data, status=200):
+    response = HttpResponse(dumps(data), status=status, content_type='application/json')
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def _not_found(model):
+    return _json({'detail': 'No %s matches the given query.' % model._meta.object_name}, status=404)
+
+
+async def aget_my_reactions(user, posts):
+    reactions = Reaction.objects.filter(user=user, post_id__in=[post.pk for post in posts])
+    return {post_id: reaction_type
+            async for post_id, reaction_type in reactions.values_list('post_id', 'reaction_type')}
+
+
+async def aget_reaction_counts(posts):
+    # Như views.get_reaction_counts: serializer không được tự truy vấn trong event loop
+    counts = {post.pk: dict.fromkeys(Reaction.ReactionType.values, 0) for post in posts}
+    async for post_id, reaction_type, count in reaction_count_rows(list(counts)):
+        counts[post_id][reaction_type] = count
+    return counts
+
+
+async def areaction_context(request, posts):
+    return {
+        'request': request,
+        'my_reactions': await aget_my_reactions(request.user, posts),
+        'reaction_counts': await aget_reaction_counts(posts),
+    }
+
+
+async def apaginate(request, queryset, serializer_class, with_reactions=False, archived=None):
+    """
+    Phân trang giống PageNumberPagination: count, next, previous, results.
+
+    archived: (queryset, serializer) đọc tiếp khi đã hết queryset, qua retention.InboxList như view DRF.
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    # none(): không có bảng lưu trữ thì InboxList không chạy thêm truy vấn nào
+    inbox = retention.InboxList(queryset, archived[0] if archived else queryset.none())
+    count = await inbox.acount()
+    offset = (page - 1) * page_size
+    if page < 1 or (offset and offset >= count):
+        return _json({'detail': 'Invalid page.'}, status=404)
+
+    page_items = await inbox.aslice(offset, offset + page_size)
+    items = [obj for obj in page_items if isinstance(obj, queryset.model)]
+    archived_items = page_items[len(items):]
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if offset + page_size < count else None
+    if page == 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+
+    context = await areaction_context(request, items) if with_reactions else {'request': request}
+    results = serializer_class(items, many=True, context=context).data
+    if archived_items:
+        results += archived[1](archived_items, many=True, context=context).data
+    return _json({
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': results,
+    })
+
+
+@async_login_required
+async def post_list(request):
+    return await apaginate(request, POST_LIST_QUERYSET, PostListSerializer, with_reactions=True)
+
+
+@async_login_required
+async def post_detail(request, pk):
+    try:
+        post = await POST_QUERYSET.aget(pk=pk)
+    except Post.DoesNotExist:
+        return _not_found(Post)
+    return _json(PostSerializer(post, context=await areaction_context(request, [post])).data)
+
+
+@async_login_required
+async def notification_list(request):
+    queryset = Notification.objects.filter(recipient=request.user).select_related('recipient') \
+        .defer('message').prefetch_related('rendered')
+    archived = ArchivedNotification.objects.filter(recipient=request.user).select_related('recipient')
+    return await apaginate(request, queryset, NotificationListSerializer,
+                           archived=(archived, ArchivedNotificationSerializer))
+
+
+@async_login_required
+async def survey_detail(request, pk):
+    try:
+        # Cùng điều kiện đối tượng như SurveyViewSet: khảo sát không dành cho người dùng trả về 404
+        survey = await surveys.visible_to(SURVEY_QUERYSET, request.user).aget(pk=pk)
+    except Survey.DoesNotExist:
+        return _not_found(Survey)
+    # Gắn bài viết đã tải sẵn cùng số reaction để serializer không phải truy vấn thêm
+    survey.post = await POST_QUERYSET.aget(pk=survey.post_id)
+    return _json(SurveySerializer(survey, context=await areaction_context(request, [survey.post])).data)
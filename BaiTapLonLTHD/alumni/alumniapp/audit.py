@@ -0,0 +1,114 @@
+"""
+Audit log for admin and moderation actions.
+
+record() only appends the event to an in-process buffer; the request does not
+wait for an INSERT. The buffer is written with one bulk_create when it holds
+AUDIT_LOG_BUFFER_SIZE events, every AUDIT_LOG_FLUSH_SECONDS by a background
+thread, and at interpreter exit. Events of a worker that is killed without
+running atexit handlers (SIGKILL, OOM) are lost; AUDIT_LOG_BUFFER_SIZE = 0
+writes every event synchronously instead.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 100
+DEFAULT_FLUSH_SECONDS = 5
+# Ghi lỗi liên tục (CSDL không truy cập được): bỏ sự kiện cũ nhất khi vượt quá số lần dung lượng này
+MAX_PENDING_FACTOR = 10
+
+
+def get_buffer_size():
+    return getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+
+
+def get_flush_seconds():
+    return getattr(settings, 'AUDIT_LOG_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._pid = None
+        self._wakeup = threading.Event()
+
+    def _ensure_flusher(self):
+        # Gọi khi đang giữ khóa. Tiến trình con sau fork (gunicorn --preload) không có luồng của cha
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._events = []
+        threading.Thread(target=self._run, name='audit-log-flusher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(get_flush_seconds())
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def add(self, event):
+        with self._lock:
+            self._ensure_flusher()
+            self._events.append(event)
+            full = len(self._events) >= get_buffer_size()
+        if full:
+            # Luồng nền ghi thay cho request đang chạy
+            self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+        try:
+            AuditEvent.objects.bulk_create(events)
+        except Exception:
+            logger.exception('Cannot write %d audit events, keeping them for the next flush', len(events))
+            with self._lock:
+                limit = max(get_buffer_size(), 1) * MAX_PENDING_FACTOR
+                self._events = (events + self._events)[-limit:]
+            return 0
+        return len(events)
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def record(request, action, target=None, **data):
+    """Ghi một thao tác của request.user lên target (đối tượng model hoặc None) kèm dữ liệu tùy ý."""
+    user = request.user if request.user.is_authenticated else None
+    event = AuditEvent(
+        created_at=timezone.now(),
+        actor_id=user.pk if user else None,
+        actor_username=user.get_username() if user else '',
+        action=action,
+        target_type=target._meta.model_name if target is not None else '',
+        target_id=target.pk if target is not None else None,
+        data=data,
+        ip_address=client_ip(request),
+    )
+    if get_buffer_size() <= 0:
+        event.save()
+    else:
+        buffer.add(event)
+    return event
+
+
+def flush():
+    return buffer.flush()
@@ -0,0 +1,96 @@
+"""
+Response compression negotiated from Accept-Encoding: brotli when the brotli
+package is installed and the client accepts it, otherwise gzip. Responses
+below RESPONSE_COMPRESSION_MIN_SIZE bytes are sent as is.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml', 'application/openapi',
+    'application/vnd.oai.openapi', 'image/svg+xml', 'text/',
+)
+
+_coding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def get_min_size():
+    return getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+
+
+def available_encodings():
+    # Theo thứ tự ưu tiên của server khi client chấp nhận như nhau
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """{mã hóa: q} từ header Accept-Encoding, bỏ qua phần không hợp lệ."""
+    accepted = {}
+    for part in header.split(','):
+        match = _coding_re.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match[2]) if match[2] is not None else 1.0
+        except ValueError:
+            continue
+        accepted[match[1].lower()] = quality
+    return accepted
+
+
+def negotiate(header):
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0
+    for coding in available_encodings():
+        quality = accepted.get(coding, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 4))
+    return compress_string(content)
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding') or not is_compressible(response):
+            return response
+        if len(response.content) < get_min_size():
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Endpoint trả token (OAuth) không nén để tránh tấn công kiểu BREACH
+        if request.path.startswith(tuple(getattr(settings, 'RESPONSE_COMPRESSION_EXCLUDE_PATHS', ()))):
+            return response
+
+        coding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if coding is None:
+            return response
+        compressed = compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        # Nội dung đã khác từng byte nên ETag mạnh phải chuyển thành ETag yếu
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
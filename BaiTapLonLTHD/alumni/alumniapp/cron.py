@@ -0,0 +1,81 @@
+import datetime
+
+# (tên, nhỏ nhất, lớn nhất) của 5 trường cron: phút giờ ngày tháng thứ
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    # 0 và 7 đều là Chủ nhật
+    ('weekday', 0, 7),
+)
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        try:
+            step = int(step) if step else 1
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = end = int(part)
+                if step != 1:
+                    end = high
+        except ValueError:
+            raise CronError('Invalid cron field "%s"' % text)
+        if step < 1 or not low <= start <= end <= high:
+            raise CronError('Cron field "%s" out of range %s-%s' % (text, low, high))
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Lịch cron 5 trường, hỗ trợ *, a-b, a,b và bước /n (thứ: 0 hoặc 7 = Chủ nhật).
+
+    Giống cron: khi cả ngày trong tháng lẫn thứ đều bị giới hạn thì chỉ cần khớp một trong hai.
+    """
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise CronError('Cron expression must have 5 fields: "%s"' % expression)
+        self.expression = expression
+        (self.minutes, self.hours, self.days, self.months, weekdays) = (
+            _parse_field(part, low, high) for part, (_, low, high) in zip(parts, FIELDS))
+        # Python: thứ Hai = 0; cron: Chủ nhật = 0
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = dt.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt):
+        """Thời điểm khớp lịch đầu tiên sau dt (tính theo phút)."""
+        dt = dt.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = dt + datetime.timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += datetime.timedelta(minutes=1)
+            else:
+                return dt
+        raise CronError('Cron expression "%s" never matches' % self.expression)
@@ -0,0 +1,134 @@
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework import permissions
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+# Trạng thái định tuyến của request hiện tại (an toàn cho cả thread và async)
+_routing = contextvars.ContextVar('db_routing', default=PRIMARY)
+
+
+def get_replicas():
+    return [alias for alias in getattr(settings, 'REPLICA_DATABASES', []) if alias in connections]
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+@contextmanager
+def use_database(routing):
+    token = _routing.set(routing)
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def use_primary(view):
+    """Đánh dấu view luôn đọc từ primary."""
+    view.db_routing = PRIMARY
+    return view
+
+
+def use_replica(view):
+    """Đánh dấu view luôn đọc từ replica, kể cả khi người dùng vừa ghi (thống kê, báo cáo)."""
+    view.db_routing = REPLICA
+    return view
+
+
+def _client_key(request):
+    auth = request.META.get('HTTP_AUTHORIZATION')
+    if auth:
+        return 'db-pin:%s' % hashlib.sha1(auth.encode()).hexdigest()
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return 'db-pin:user:%s' % user.pk
+    return None
+
+
+def _view_routing(view_func):
+    routing = getattr(view_func, 'db_routing', None)
+    if routing is None:
+        # ViewSet/APIView: as_view() gắn lớp view vào thuộc tính cls
+        routing = getattr(getattr(view_func, 'cls', None), 'db_routing', None)
+    return routing
+
+
+class ReplicaRoutingMiddleware:
+    """Chọn primary/replica cho từng request và ghim người dùng vào primary sau khi ghi."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing.set(PRIMARY)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if self._is_write(request, response):
+            key = _client_key(request)
+            if key:
+                cache.set(key, True, get_pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(PRIMARY)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if self._is_write(request, response):
+            # request.user có thể phải đọc session (ORM đồng bộ)
+            key = await sync_to_async(_client_key)(request)
+            if key:
+                await cache.aset(key, True, get_pin_seconds())
+        return response
+
+    def _is_write(self, request, response):
+        return request.method not in permissions.SAFE_METHODS and response.status_code < 400
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _view_routing(view_func)
+        if routing is None:
+            routing = PRIMARY
+            if request.method in permissions.SAFE_METHODS:
+                key = _client_key(request)
+                if not (key and cache.get(key)):
+                    routing = REPLICA
+        _routing.set(routing)
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or _routing.get() != REPLICA:
+            return 'default'
+        # Trong transaction đang mở trên primary thì phải đọc từ primary
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
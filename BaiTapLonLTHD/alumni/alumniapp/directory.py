@@ -0,0 +1,98 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import User, DirectoryFacet
+
+FACET_FIELDS = ('graduation_year', 'role')
+# Các trường quyết định user được đếm vào facet nào
+SOURCE_FIELDS = FACET_FIELDS + ('is_active', 'deleted_at')
+
+
+def directory_users():
+    """Người dùng hiển thị trong danh bạ."""
+    return User.objects.filter(is_active=True, deleted_at__isnull=True)
+
+
+def facet_values(user):
+    """Các cặp (facet, giá trị) mà user được đếm vào; rỗng nếu user không nằm trong danh bạ."""
+    if user is None or not user.is_active or user.deleted_at is not None:
+        return set()
+    values = set()
+    for field in FACET_FIELDS:
+        value = getattr(user, field)
+        if value not in (None, ''):
+            values.add((field, str(value)))
+    return values
+
+
+def stored_facet_values(user):
+    """
+    facet_values của user theo dữ liệu đang lưu trong DB: lấy từ lần lưu trước hoặc lúc tải (User.from_db),
+    chỉ SELECT lại khi instance được tải thiếu trường. Một instance cũ ghi đè thay đổi của instance khác
+    thì số đếm có thể lệch, khi đó chạy rebuild_directory_facets.
+    """
+    if user.pk is None:
+        return set()
+    if hasattr(user, '_directory_facets'):
+        return user._directory_facets
+    loaded = getattr(user, '_loaded_values', None) or {}
+    if all(field in loaded for field in SOURCE_FIELDS):
+        return facet_values(SimpleNamespace(**loaded))
+    return facet_values(User.objects.filter(pk=user.pk).first())
+
+
+def remember_facet_values(user, values):
+    user._directory_facets = values
+
+
+def _increment(facet, value, delta):
+    updated = DirectoryFacet.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DirectoryFacet.objects.create(facet=facet, value=value, count=delta)
+    except IntegrityError:
+        # Tiến trình khác vừa tạo dòng này
+        DirectoryFacet.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+
+
+def apply_deltas(deltas):
+    """deltas: {(facet, giá trị): số cần cộng thêm}, dùng cho các thay đổi hàng loạt bằng UPDATE."""
+    for (facet, value), delta in deltas.items():
+        if delta:
+            _increment(facet, value, delta)
+
+
+def apply_change(old_values, new_values):
+    """Cập nhật số đếm theo chênh lệch giữa giá trị cũ và mới của một người dùng."""
+    deltas = Counter()
+    for key in old_values - new_values:
+        deltas[key] -= 1
+    for key in new_values - old_values:
+        deltas[key] += 1
+    apply_deltas(deltas)
+
+
+def get_facets():
+    facets = {field: {} for field in FACET_FIELDS}
+    for facet, value, count in DirectoryFacet.objects.filter(count__gt=0).values_list('facet', 'value', 'count'):
+        facets.setdefault(facet, {})[value] = count
+    return facets
+
+
+def rebuild_facets():
+    """Đếm lại toàn bộ bằng GROUP BY, dùng khi số đếm bị lệch (vd. sau khi sửa dữ liệu bằng SQL)."""
+    rows = []
+    for field in FACET_FIELDS:
+        counts = directory_users().filter(**{field + '__isnull': False}) \
+            .values(field).annotate(total=Count('pk')).order_by()
+        rows += [DirectoryFacet(facet=field, value=str(row[field]), count=row['total'])
+                 for row in counts if row[field] != '']
+    with transaction.atomic():
+        DirectoryFacet.objects.all().delete()
+        DirectoryFacet.objects.bulk_create(rows)
+    return rows
@@ -0,0 +1,142 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+The first request with a given key claims it by inserting an IN_PROGRESS row
+(the unique (user, key) constraint lets exactly one concurrent duplicate win),
+runs the view and stores the response. A retry with the same key and the same
+request gets the stored response back without running the view again; a
+duplicate that arrives while the first is still running gets 409. The claim
+is a lease of IDEMPOTENCY_LEASE_SECONDS: if the worker dies before storing the
+response, a retry after the lease has expired takes the key over and runs the
+view instead of getting 409 until the key expires.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.datastructures import MultiValueDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .renderers import dumps
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_LEASE_SECONDS = 60
+
+
+def get_ttl():
+    return timezone.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+
+
+def get_lease():
+    return timezone.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+
+def _canonical(value):
+    """Dữ liệu đã parse ở dạng so sánh được: file được thay bằng tên, kích thước và SHA-256 nội dung."""
+    if isinstance(value, UploadedFile):
+        digest = hashlib.sha256()
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+        return {'name': value.name, 'size': value.size, 'sha256': digest.hexdigest()}
+    if isinstance(value, MultiValueDict):
+        return {str(key): [_canonical(item) for item in value.getlist(key)] for key in value}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def fingerprint(request):
+    # Theo request.data thay vì body thô: body multipart chứa boundary ngẫu nhiên, khác nhau ở mỗi lần gửi lại
+    data = json.dumps(_canonical(request.data), sort_keys=True, default=str)
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path(), data):
+        digest.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def claim(user, key, request_fingerprint):
+    """Giữ key cho request hiện tại; trả về (bản ghi, True) nếu giữ được, (bản ghi đã có, False) nếu không."""
+    now = timezone.now()
+    # Key đã hết hạn nhưng job dọn dẹp chưa chạy: coi như chưa dùng
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    locked_until = now + get_lease()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key, fingerprint=request_fingerprint,
+                                                 locked_until=locked_until, expires_at=now + get_ttl()), True
+    except IntegrityError:
+        pass
+    # Request trước đã quá hạn giữ key mà chưa xong (worker chết giữa chừng): UPDATE có điều kiện để chỉ
+    # một request gửi lại lấy được key
+    taken = IdempotencyKey.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        user=user, key=key, fingerprint=request_fingerprint, status=IdempotencyKey.Status.IN_PROGRESS,
+    ).update(locked_until=locked_until)
+    return IdempotencyKey.objects.get(user=user, key=key), bool(taken)
+
+
+def _held(record):
+    """Bản ghi nếu request hiện tại vẫn giữ key (locked_until chưa bị request gửi lại thay)."""
+    return IdempotencyKey.objects.filter(pk=record.pk, locked_until=record.locked_until)
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        return Response({"error": "Idempotency-Key was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status == IdempotencyKey.Status.IN_PROGRESS:
+        return Response({"error": "A request with this Idempotency-Key is still being processed"},
+                        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+    data = json.loads(record.response_body) if record.response_body else None
+    return Response(data, status=record.response_status, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """Action của viewset: request có header Idempotency-Key chỉ được thực thi một lần."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": "Idempotency-Key must be at most %d characters" % MAX_KEY_LENGTH},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        request_fingerprint = fingerprint(request)
+        record, claimed = claim(request.user, key, request_fingerprint)
+        if not claimed:
+            return replay(record, request_fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            # Lỗi (kể cả lỗi DRF như 403/404): trả key lại để client thử lại được
+            _held(record).delete()
+            raise
+        if response.status_code >= 500:
+            _held(record).delete()
+            return response
+        _held(record).update(
+            status=IdempotencyKey.Status.COMPLETED, response_status=response.status_code,
+            response_body=dumps(response.data).decode('utf-8') if response.data is not None else '',
+            locked_until=None,
+        )
+        return response
+    return wrapper
+
+
+def prune():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
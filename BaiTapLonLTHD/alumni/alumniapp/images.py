@@ -0,0 +1,193 @@
+"""
+Images embedded in rich text through ckeditor_uploader.
+
+When rich text is rendered (richtext.store_rendered), every <img> pointing at
+an upload is rewritten to a resized variant with explicit width/height, and
+the upload paths used by each RenderedText row are recorded in
+ImageReference. sweep_orphans() deletes uploads no content refers to any more.
+"""
+import io
+import logging
+import posixpath
+from urllib.parse import unquote, urlparse
+
+from ckeditor_uploader.utils import storage
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http.request import validate_host
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import UploadedImage, ImageReference
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PREFIX = 'ckeditor/resized'
+DEFAULT_MAX_WIDTH = 1080
+JPEG_QUALITY = 85
+# Ảnh vừa upload nhưng bài viết chưa lưu: chưa coi là ảnh mồ côi
+DEFAULT_ORPHAN_GRACE_HOURS = 24
+SWEEP_BATCH_SIZE = 500
+
+
+def get_upload_prefix():
+    return settings.CKEDITOR_UPLOAD_PATH.strip('/') + '/'
+
+
+def get_max_width():
+    return getattr(settings, 'RICH_TEXT_IMAGE_MAX_WIDTH', DEFAULT_MAX_WIDTH)
+
+
+def upload_path(src):
+    """Đường dẫn trong storage của ảnh upload mà src trỏ tới, None nếu là ảnh ngoài."""
+    try:
+        url = urlparse(src.strip())
+    except ValueError:
+        return None
+    if url.netloc and not validate_host(url.hostname or '', settings.ALLOWED_HOSTS):
+        return None
+    path = posixpath.normpath(unquote(url.path)).lstrip('/')
+    for prefix in (settings.MEDIA_URL, settings.STATIC_URL):
+        prefix = (prefix or '').strip('/')
+        if prefix and path.startswith(prefix + '/'):
+            path = path[len(prefix) + 1:]
+            break
+    if not path.startswith(get_upload_prefix()) or path.startswith('../'):
+        return None
+    return path
+
+
+def thumb_path(path):
+    # Ảnh nhỏ do ckeditor_uploader tự tạo cạnh ảnh gốc
+    root, ext = posixpath.splitext(path)
+    return '%s_thumb%s' % (root, ext)
+
+
+def _make_variant(path, image, width):
+    height = round(image.height * width / image.width)
+    resized = image.resize((width, height), Image.LANCZOS)
+    image_format = image.format or 'JPEG'
+    options = {'optimize': True}
+    if image_format == 'JPEG':
+        resized = resized.convert('RGB') if resized.mode not in ('RGB', 'L') else resized
+        options['quality'] = JPEG_QUALITY
+    buffer = io.BytesIO()
+    resized.save(buffer, format=image_format, **options)
+    name = '%s/%d/%s' % (VARIANT_PREFIX, width, path[len(get_upload_prefix()):])
+    return storage.save(name, ContentFile(buffer.getvalue())), width, height
+
+
+def process(path):
+    """Đọc kích thước ảnh gốc, tạo bản thu nhỏ nếu rộng hơn RICH_TEXT_IMAGE_MAX_WIDTH."""
+    image = UploadedImage(path=path)
+    max_width = get_max_width()
+    try:
+        with storage.open(path) as file, Image.open(file) as original:
+            image_format = original.format
+            # Ảnh chụp điện thoại: xoay theo EXIF trước khi lấy kích thước
+            oriented = ImageOps.exif_transpose(original)
+            oriented.format = image_format
+            image.width, image.height = oriented.size
+            if oriented.width > max_width and not getattr(original, 'is_animated', False):
+                image.variant_path, image.variant_width, image.variant_height = \
+                    _make_variant(path, oriented, max_width)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning('Cannot process uploaded image %s: %s', path, e)
+    return image
+
+
+def get_image(path):
+    image = UploadedImage.objects.filter(path=path).first()
+    if image is None:
+        image = process(path)
+        # Không lưu ảnh đọc lỗi (file chưa upload xong, lỗi storage tạm thời): lần render sau đọc lại
+        if image.width is not None:
+            # Hai lần render đồng thời cùng một ảnh: giữ bản ghi đến trước
+            UploadedImage.objects.bulk_create([image], ignore_conflicts=True)
+    return image
+
+
+def resolve(src):
+    """
+    Dùng khi render rich text: (đường dẫn upload, url hiển thị, rộng, cao) của ảnh,
+    None nếu không phải ảnh upload đọc được.
+    """
+    path = upload_path(src)
+    if path is None:
+        return None
+    image = get_image(path)
+    if image.width is None:
+        return None
+    if image.variant_path:
+        return path, storage.url(image.variant_path), image.variant_width, image.variant_height
+    return path, storage.url(path), image.width, image.height
+
+
+def update_references(paths_by_rendered):
+    """Thay danh sách ảnh của các RenderedText: {rendered_id: tập đường dẫn}."""
+    if not paths_by_rendered:
+        return
+    existing = set(ImageReference.objects.filter(rendered_id__in=paths_by_rendered)
+                   .values_list('rendered_id', 'path'))
+    wanted = {(rendered_id, path) for rendered_id, paths in paths_by_rendered.items() for path in paths}
+    for rendered_id, path in existing - wanted:
+        ImageReference.objects.filter(rendered_id=rendered_id, path=path).delete()
+    ImageReference.objects.bulk_create(
+        [ImageReference(rendered_id=rendered_id, path=path) for rendered_id, path in wanted - existing],
+        ignore_conflicts=True,
+    )
+
+
+def uploaded_files(directory=None):
+    """Duyệt đệ quy các file ảnh gốc đã upload (bỏ qua ảnh _thumb)."""
+    directory = directory or get_upload_prefix().rstrip('/')
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in sorted(files):
+        if not posixpath.splitext(name)[0].endswith('_thumb'):
+            yield posixpath.join(directory, name)
+    for name in sorted(directories):
+        yield from uploaded_files(posixpath.join(directory, name))
+
+
+def _delete_upload(path):
+    image = UploadedImage.objects.filter(path=path).first()
+    for name in (path, thumb_path(path), image.variant_path if image else ''):
+        if name and storage.exists(name):
+            storage.delete(name)
+    if image is not None:
+        image.delete()
+
+
+def sweep_orphans(batch_size=SWEEP_BATCH_SIZE, grace_hours=None, dry_run=False):
+    """
+    Xóa các ảnh upload không còn nội dung nào tham chiếu, kiểm tra theo từng lô file.
+
+    Trả về danh sách đường dẫn đã xóa (hoặc sẽ xóa nếu dry_run).
+    """
+    if grace_hours is None:
+        grace_hours = getattr(settings, 'RICH_TEXT_ORPHAN_GRACE_HOURS', DEFAULT_ORPHAN_GRACE_HOURS)
+    cutoff = timezone.now() - timezone.timedelta(hours=grace_hours)
+    deleted = []
+
+    def flush(batch):
+        referenced = set(ImageReference.objects.filter(path__in=batch).values_list('path', flat=True))
+        for path in batch:
+            if path in referenced or storage.get_modified_time(path) > cutoff:
+                continue
+            if not dry_run:
+                _delete_upload(path)
+            deleted.append(path)
+
+    batch = []
+    for path in uploaded_files():
+        batch.append(path)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    logger.info('%s orphan uploads %s', len(deleted), 'found' if dry_run else 'deleted')
+    return deleted
@@ -0,0 +1,197 @@
+"""
+Periodic jobs run by "manage.py runjobs".
+
+Jobs are registered here with a default cron schedule; the Job table holds the
+editable definition (schedule, enabled) and timing metrics, and JobLease is a
+per-job lock with an expiry so several workers can poll the same database
+without running a job twice.
+"""
+import logging
+import os
+import socket
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import (
+    directory, idempotency, images, notifications, purge, reminders, retention, suggestions, surveys, sync, uploads
+)
+from .cron import CronSchedule
+from .models import User, Job, JobLease, JobRun
+
+logger = logging.getLogger(__name__)
+
+JobSpec = namedtuple('JobSpec', 'func schedule lease_seconds')
+
+REGISTRY = {}
+
+
+def register(name, schedule, lease_seconds=600):
+    def decorator(func):
+        REGISTRY[name] = JobSpec(func, schedule, lease_seconds)
+        return func
+    return decorator
+
+
+@register('deactivate_expired_lecturers', '*/15 * * * *')
+def deactivate_expired_lecturers():
+    """Khóa tài khoản giảng viên quá hạn đổi mật khẩu (change_password xóa hạn, User.save chỉ đặt hạn khi tạo)."""
+    with transaction.atomic():
+        lecturers = User.objects.filter(
+            role=User.Role.LECTURER,
+            is_active=True,
+            deleted_at__isnull=True,
+            password_change_deadline__lt=timezone.now(),
+        )
+        # Khóa các dòng sẽ bị cập nhật để số đếm facet của danh bạ khớp với UPDATE bên dưới
+        rows = list(lecturers.select_for_update().values_list('pk', 'graduation_year'))
+        years = Counter(year for _, year in rows)
+        count = lecturers.update(is_active=False)
+        deltas = Counter({('graduation_year', str(year)): -n for year, n in years.items() if year is not None})
+        deltas[('role', User.Role.LECTURER)] = -count
+        directory.apply_deltas(deltas)
+        surveys.update_user_eligibility([pk for pk, _ in rows])
+    return '%d lecturers deactivated' % count
+
+
+@register('send_deadline_reminders', '*/5 * * * *', lease_seconds=30 * 60)
+def send_deadline_reminders():
+    return '%d survey reminders sent, %d password change reminders sent, %d old reminder records deleted' % (
+        reminders.remind_surveys(), reminders.remind_password_changes(), reminders.prune())
+
+
+@register('purge_deleted', '*/5 * * * *', lease_seconds=30 * 60)
+def purge_deleted():
+    tasks = [purge.run_purge(task) for task in purge.pending_tasks()]
+    failed = sum(task.status == task.Status.FAILED for task in tasks)
+    return '%d purge tasks run, %d failed' % (len(tasks), failed)
+
+
+@register('send_notification_digest', '0 7 * * *', lease_seconds=60 * 60)
+def send_notification_digest():
+    return '%d digest emails sent' % notifications.send_digests()
+
+
+@register('compute_suggestions', '0 2 * * *', lease_seconds=3 * 60 * 60)
+def compute_suggestions():
+    return 'suggestions computed for %d users' % suggestions.compute_suggestions()
+
+
+@register('prune_change_log', '30 3 * * *', lease_seconds=60 * 60)
+def prune_change_log():
+    return '%d change log rows pruned' % sync.prune()
+
+
+@register('archive_activity', '0 3 * * *', lease_seconds=2 * 60 * 60)
+def archive_activity():
+    return '%d notifications archived, %d survey responses archived, %d archived notifications deleted' % (
+        retention.archive_notifications(), retention.archive_survey_responses(), retention.prune_archive())
+
+
+@register('sweep_orphan_images', '0 4 * * *', lease_seconds=60 * 60)
+def sweep_orphan_images():
+    # Ảnh upload trước khi có ImageReference chưa được ghi nhận cho tới khi chạy backfill
+    if not getattr(settings, 'RICH_TEXT_ORPHAN_SWEEP_ENABLED', False):
+        return 'disabled (RICH_TEXT_ORPHAN_SWEEP_ENABLED is off)'
+    return '%d orphan uploads deleted' % len(images.sweep_orphans())
+
+
+@register('prune_idempotency_keys', '15 * * * *')
+def prune_idempotency_keys():
+    return '%d expired idempotency keys deleted' % idempotency.prune()
+
+
+@register('expire_upload_sessions', '*/30 * * * *')
+def expire_upload_sessions():
+    return '%d upload sessions expired' % uploads.expire_sessions()
+
+
+def worker_id():
+    return '%s:%s' % (socket.gethostname(), os.getpid())
+
+
+def next_run(schedule, after):
+    # Lịch cron tính theo giờ địa phương (TIME_ZONE)
+    return CronSchedule(schedule).next_after(timezone.localtime(after))
+
+
+def sync_jobs():
+    """Tạo Job/JobLease cho các job mới đăng ký; lịch đã sửa trong admin được giữ nguyên."""
+    now = timezone.now()
+    for name, spec in REGISTRY.items():
+        job, _ = Job.objects.get_or_create(name=name, defaults={
+            'schedule': spec.schedule,
+            'lease_seconds': spec.lease_seconds,
+        })
+        if job.next_run_at is None:
+            job.next_run_at = next_run(job.schedule, now)
+            job.save(update_fields=['next_run_at'])
+        JobLease.objects.get_or_create(job=job)
+
+
+def acquire(job, worker, now):
+    # UPDATE có điều kiện: chỉ một worker lấy được khóa còn trống hoặc đã hết hạn
+    return JobLease.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lte=now),
+        job=job,
+    ).update(owner=worker, expires_at=now + timezone.timedelta(seconds=job.lease_seconds)) == 1
+
+
+def release(job, worker):
+    JobLease.objects.filter(job=job, owner=worker).update(owner='', expires_at=None)
+
+
+def run_job(job, worker):
+    """Chạy job (đã giữ khóa), ghi JobRun và cập nhật số liệu thời gian của Job."""
+    started_at = timezone.now()
+    start = time.perf_counter()
+    result, error = '', ''
+    try:
+        result = REGISTRY[job.name].func() or ''
+    except Exception as e:
+        logger.exception('Job %s failed', job.name)
+        error = '%s: %s' % (type(e).__name__, e)
+    duration_ms = int((time.perf_counter() - start) * 1000)
+    status = JobRun.Status.FAILED if error else JobRun.Status.SUCCESS
+
+    JobRun.objects.create(job=job, worker=worker, started_at=started_at, duration_ms=duration_ms,
+                          status=status, result=str(result)[:255], error=error)
+    Job.objects.filter(pk=job.pk).update(
+        last_run_at=started_at,
+        last_status=status,
+        last_duration_ms=duration_ms,
+        last_error=error,
+        run_count=F('run_count') + 1,
+        failure_count=F('failure_count') + int(bool(error)),
+        total_duration_ms=F('total_duration_ms') + duration_ms,
+        next_run_at=next_run(job.schedule, timezone.now()),
+    )
+    logger.info('Job %s %s in %s ms: %s', job.name, status, duration_ms, error or result)
+    return status
+
+
+def run_due_jobs(worker, names=None, force=False):
+    """Chạy các job đến hạn (hoặc các job trong names nếu force). Trả về [(tên, trạng thái)]."""
+    now = timezone.now()
+    jobs = Job.objects.filter(name__in=names) if names else Job.objects.all()
+    if not force:
+        jobs = jobs.filter(enabled=True, next_run_at__lte=now)
+    ran = []
+    for job in jobs:
+        if job.name not in REGISTRY:
+            logger.warning('Job %s has no registered function, skipping', job.name)
+            continue
+        if not acquire(job, worker, now):
+            continue
+        try:
+            # Worker khác có thể vừa chạy xong và trả khóa trước khi ta lấy được
+            job.refresh_from_db()
+            if force or (job.enabled and job.next_run_at and job.next_run_at <= now):
+                ran.append((job.name, run_job(job, worker)))
+        finally:
+            release(job, worker)
+    return ran
@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from alumniapp import richtext
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def rich_text_models():
+    return {model._meta.model_name: model
+            for model in apps.get_app_config('alumniapp').get_models()
+            if getattr(model, 'rich_text_fields', None)}
+
+
+class Command(BaseCommand):
+    help = 'Render sanitized HTML and excerpts for existing rich-text rows in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--model', action='append', choices=sorted(rich_text_models()),
+                            help='Only backfill this model (may be repeated)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render unchanged rows too (after changing the sanitizer or image variants)')
+
+    def handle(self, *args, **options):
+        models = rich_text_models()
+        for name in options['model'] or sorted(models):
+            model = models[name]
+            scanned, written = self.backfill(model, options['batch_size'], options['force'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label}: {scanned} rows scanned, {written} renders written'))
+
+    def backfill(self, model, batch_size, force=False):
+        # Duyệt theo khóa chính (keyset), mỗi lô chỉ tải pk và các trường rich text
+        queryset = model._base_manager.only('pk', *model.rich_text_fields).order_by('pk')
+        last_pk, scanned, written = 0, 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return scanned, written
+            written += richtext.store_rendered(model, batch, force=force)
+            scanned += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from alumniapp import tags
+from alumniapp.models import Post, Comment
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Extract hashtags and @mentions from existing posts and comments in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--notify', action='store_true',
+                            help='Also notify mentioned users (off by default for old content)')
+
+    def handle(self, *args, **options):
+        for model, index in ((Post, tags.index_post), (Comment, tags.index_comment)):
+            count = 0
+            # Duyệt theo khóa chính (keyset), mỗi lô một truy vấn
+            queryset = model.objects.select_related('author').order_by('pk')
+            last_pk = 0
+            while True:
+                batch = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                for obj in batch:
+                    index(obj, notify=options['notify'])
+                count += len(batch)
+                last_pk = batch[-1].pk
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.label}: {count} rows indexed'))
@@ -0,0 +1,147 @@
+import asyncio
+import io
+import secrets
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+
+from alumniapp.models import User
+
+# Endpoint đồng bộ (DRF, WSGI) và bản async tương ứng
+ENDPOINTS = {
+    'posts': ('/posts/', '/async/posts/'),
+    'notifications': ('/notifications/', '/async/notifications/'),
+}
+
+# Địa chỉ ngoài INTERNAL_IPS để debug toolbar không can thiệp vào kết quả
+CLIENT_ADDR = '10.0.0.1'
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput of the sync endpoints behind the WSGI handler and '
+            'the async endpoints behind the ASGI handler under concurrency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='posts')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist' % options['username'])
+
+        token = get_access_token_model().objects.create(
+            user=user,
+            token=secrets.token_urlsafe(30),
+            expires=timezone.now() + timezone.timedelta(hours=1),
+            scope='read write',
+        )
+        self.auth = 'Bearer %s' % token.token
+        self.host = options['host']
+        sync_path, async_path = ENDPOINTS[options['endpoint']]
+        try:
+            sync_times = self.run_wsgi(sync_path, options['requests'], options['concurrency'])
+            async_times = async_to_sync(self.run_asgi)(async_path, options['requests'], options['concurrency'])
+        finally:
+            token.delete()
+
+        self.stdout.write('%-6s %-26s %8s %8s %8s %8s' % ('mode', 'path', 'total_s', 'req/s', 'p50_ms', 'p95_ms'))
+        self.report('wsgi', sync_path, *sync_times)
+        self.report('asgi', async_path, *async_times)
+
+    def run_wsgi(self, path, total, concurrency):
+        application = get_wsgi_application()
+
+        def fetch(_):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': self.host,
+                'SERVER_PORT': '80',
+                'HTTP_HOST': self.host,
+                'HTTP_AUTHORIZATION': self.auth,
+                'REMOTE_ADDR': CLIENT_ADDR,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.url_scheme': 'http',
+            }
+            result = {}
+
+            def start_response(status, headers):
+                result['status'] = int(status.split()[0])
+
+            start = time.perf_counter()
+            response = application(environ, start_response)
+            b''.join(response)
+            response.close()
+            self.check_status(path, result['status'])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(fetch, range(total)))
+        return time.perf_counter() - start, latencies
+
+    async def run_asgi(self, path, total, concurrency):
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': b'',
+                'root_path': '',
+                'headers': [(b'host', self.host.encode()), (b'authorization', self.auth.encode())],
+                'client': (CLIENT_ADDR, 0),
+                'server': (self.host, 80),
+            }
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            result = {}
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # Client không ngắt kết nối; Django tự hủy tác vụ chờ khi trả response xong
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    result['status'] = message['status']
+
+            async with semaphore:
+                start = time.perf_counter()
+                await application(scope, receive, send)
+                self.check_status(path, result['status'])
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch() for _ in range(total)))
+        return time.perf_counter() - start, latencies
+
+    def check_status(self, path, status):
+        if status != 200:
+            raise CommandError('%s returned HTTP %s' % (path, status))
+
+    def report(self, mode, path, elapsed, latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write('%-6s %-26s %8.2f %8.1f %8.1f %8.1f' % (
+            mode, path, elapsed, len(latencies) / elapsed,
+            statistics.median(latencies) * 1000, p95 * 1000))
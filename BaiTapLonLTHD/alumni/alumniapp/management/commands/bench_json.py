@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from alumniapp import compression, renderers
+from alumniapp.models import User, Post, Survey, Group
+
+
+class Command(BaseCommand):
+    help = ('Compare JSON encode/decode time of the stdlib and orjson renderers and the '
+            'response size with gzip/brotli for representative API payloads')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--path', action='append', default=[],
+                            help='Extra API path to benchmark (may be repeated)')
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist' % options['username'])
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed, "fast" uses the stdlib fallback'))
+        if compression.brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed, only gzip is measured'))
+
+        client = APIClient(HTTP_HOST=options['host'], REMOTE_ADDR='10.0.0.1')
+        client.force_authenticate(user)
+
+        self.stdout.write('%-28s %9s %9s %9s %9s %9s %9s %9s %9s' % (
+            'payload', 'bytes', 'gzip', 'br', 'std_enc', 'fast_enc', 'std_dec', 'fast_dec', 'comp_ms'))
+        for path in self.default_paths() + options['path']:
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError('%s returned HTTP %s' % (path, response.status_code))
+            self.report(path, response.json(), options['repeat'])
+
+    def default_paths(self):
+        # Bài viết nhiều bình luận nhất, khảo sát nhiều câu hỏi nhất, nhóm đông thành viên nhất
+        paths = ['/posts/', '/notifications/']
+        post = Post.objects.annotate(n=Count('comments')).order_by('-n').first()
+        if post:
+            paths.append('/posts/%d/' % post.pk)
+        survey = Survey.objects.annotate(n=Count('questions')).order_by('-n').first()
+        if survey:
+            paths.append('/surveys/%d/' % survey.pk)
+        group = Group.objects.annotate(n=Count('members')).order_by('-n').first()
+        if group:
+            paths.append('/groups/%d/' % group.pk)
+        return paths
+
+    def timed(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def report(self, path, data, repeat):
+        stdlib = JSONRenderer()
+        content = renderers.dumps(data)
+        gzip_size = len(compression.compress(content, 'gzip'))
+        br_size = len(compression.compress(content, 'br')) if compression.brotli else None
+        coding = compression.available_encodings()[0]
+
+        self.stdout.write('%-28s %9d %9d %9s %9.3f %9.3f %9.3f %9.3f %9.3f' % (
+            path, len(content), gzip_size, br_size if br_size is not None else '-',
+            self.timed(lambda: stdlib.render(data), repeat),
+            self.timed(lambda: renderers.dumps(data), repeat),
+            self.timed(lambda: json.loads(content), repeat),
+            self.timed(lambda: renderers.orjson.loads(content) if renderers.orjson else json.loads(content), repeat),
+            self.timed(lambda: compression.compress(content, coding), repeat),
+        ))
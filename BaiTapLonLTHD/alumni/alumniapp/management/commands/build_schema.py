@@ -0,0 +1,32 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+from alumni.schema import api_info, schema_path
+
+CODECS = {
+    '.json': OpenAPICodecJson,
+    '.yaml': OpenAPICodecYaml,
+}
+
+
+class Command(BaseCommand):
+    help = 'Prebuild the OpenAPI schema served at /swagger.json and /swagger.yaml'
+
+    def handle(self, *args, **options):
+        generator = OpenAPISchemaGenerator(info=api_info)
+        schema = generator.get_schema(request=None, public=True)
+
+        os.makedirs(settings.API_SCHEMA_DIR, exist_ok=True)
+        for format, codec_class in CODECS.items():
+            path = schema_path(format)
+            content = codec_class(validators=[]).encode(schema)
+            # Ghi ra file tạm rồi đổi tên để request đang đọc không thấy file dở dang
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {path} ({len(content)} bytes)'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alumniapp import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute "people you may know" suggestions for alumni (nightly batch job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=suggestions.TOP_K)
+        parser.add_argument('--batch-size', type=int, default=suggestions.WRITE_BATCH_SIZE)
+        parser.add_argument('--shard', default='0/1',
+                            help='Only process users with id %% N == I, given as I/N, to split the job across processes')
+
+    def handle(self, *args, **options):
+        try:
+            shard, shards = (int(part) for part in options['shard'].split('/'))
+        except ValueError:
+            raise CommandError('--shard must look like I/N, e.g. 0/4')
+        if not 0 <= shard < shards:
+            raise CommandError('--shard index must be between 0 and N-1')
+
+        start = time.perf_counter()
+        count = suggestions.compute_suggestions(shard=shard, shards=shards, top_k=options['top_k'],
+                                                batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Suggestions computed for {count} users in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,75 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Chạy trong process mới để đo từ lúc import Django đến request đầu tiên
+FIRST_REQUEST_SCRIPT = '''
+import io, json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+
+def request(path, host):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'REMOTE_ADDR': '10.0.0.1', 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    t = time.perf_counter()
+    response = application(environ, lambda s, h: status.append(s))
+    b''.join(response)
+    response.close()
+    return time.perf_counter() - t, status[0]
+
+first, status = request(sys.argv[1], sys.argv[2])
+second, _ = request(sys.argv[1], sys.argv[2])
+print(json.dumps({'setup': ready - start, 'first': first, 'second': second, 'status': status}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure "manage.py check" time and first-request latency for a settings profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settings-module', default=os.environ.get('DJANGO_SETTINGS_MODULE'),
+                            help='Settings profile to measure, e.g. alumni.settings_prod')
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--path', default='/swagger.json')
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=options['settings_module'])
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+
+        check_times, results = [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            self.run([sys.executable, manage_py, 'check'], env)
+            check_times.append(time.perf_counter() - start)
+
+            output = self.run([sys.executable, '-c', FIRST_REQUEST_SCRIPT, options['path'], options['host']], env)
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        self.stdout.write(f"Settings: {options['settings_module']}  ({options['runs']} runs, median)")
+        self.stdout.write('  manage.py check:       %7.1f ms' % (statistics.median(check_times) * 1000))
+        self.stdout.write('  django.setup + wsgi:   %7.1f ms' % (statistics.median(r['setup'] for r in results) * 1000))
+        self.stdout.write('  first  GET %-12s %7.1f ms (%s)' % (
+            options['path'], statistics.median(r['first'] for r in results) * 1000, results[-1]['status']))
+        self.stdout.write('  second GET %-12s %7.1f ms' % (
+            options['path'], statistics.median(r['second'] for r in results) * 1000))
+
+    def run(self, command, env):
+        process = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise CommandError(process.stderr)
+        return process.stdout
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from alumniapp import purge
+
+
+class Command(BaseCommand):
+    help = 'Purge soft-deleted posts, comments and users in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum number of purge tasks to process')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Also resume tasks that previously failed')
+
+    def handle(self, *args, **options):
+        tasks = purge.pending_tasks(include_failed=options['retry_failed'])
+        if options['limit']:
+            tasks = tasks[:options['limit']]
+
+        for task in tasks:
+            self.stdout.write(f'Purging {task.target_type} #{task.target_id} (task {task.pk})...')
+            task = purge.run_purge(task, batch_size=options['batch_size'])
+            if task.status == task.Status.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f'  done, {task.deleted_rows} rows deleted'))
+            elif task.status == task.Status.RUNNING:
+                self.stdout.write(f'  skipped, running on {task.owner}')
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'  failed at stage "{task.stage}": {task.error}'))
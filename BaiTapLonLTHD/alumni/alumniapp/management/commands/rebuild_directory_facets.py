@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from alumniapp import directory
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached directory facet totals (graduation year, role) from scratch'
+
+    def handle(self, *args, **options):
+        rows = directory.rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'{len(rows)} facet values recounted'))
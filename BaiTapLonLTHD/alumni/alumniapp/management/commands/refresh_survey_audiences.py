@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from alumniapp import surveys
+from alumniapp.models import Survey
+
+
+class Command(BaseCommand):
+    help = ('Recompute the eligible users of surveys. By default only surveys that have never been '
+            'computed (created before audiences existed) and are still open')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', default=[], help='Survey id (may be repeated)')
+        parser.add_argument('--all', action='store_true', help='Every open survey, not only the uncomputed ones')
+
+    def handle(self, *args, **options):
+        queryset = Survey.objects.filter(end_date__gt=timezone.now())
+        if options['survey']:
+            queryset = Survey.objects.filter(pk__in=options['survey'])
+        elif not options['all']:
+            queryset = queryset.filter(audience_computed_at__isnull=True)
+        for survey in queryset.order_by('pk'):
+            added, removed = surveys.refresh_audience(survey)
+            self.stdout.write(f'Survey {survey.pk}: {added} added, {removed} removed')
+        self.stdout.write(self.style.SUCCESS('Survey audiences refreshed'))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alumniapp import jobs
+from alumniapp.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Run periodic jobs on their cron schedules; several workers may run at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs that are due once and exit (e.g. from a system cron every minute)')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds between polls')
+        parser.add_argument('--run', action='append', metavar='NAME',
+                            help='Run this job now regardless of its schedule (may be repeated)')
+        parser.add_argument('--list', action='store_true', help='Show jobs and their timing metrics')
+
+    def handle(self, *args, **options):
+        jobs.sync_jobs()
+        if options['list']:
+            return self.list_jobs()
+
+        worker = jobs.worker_id()
+        if options['run']:
+            unknown = set(options['run']) - set(jobs.REGISTRY)
+            if unknown:
+                raise CommandError('Unknown jobs: %s' % ', '.join(sorted(unknown)))
+            ran = jobs.run_due_jobs(worker, names=options['run'], force=True)
+            self.report(ran)
+            for name in set(options['run']) - {name for name, _ in ran}:
+                self.stdout.write(self.style.WARNING(f'{name}: skipped, running on another worker'))
+            return
+
+        self.stdout.write(f'Worker {worker} started')
+        while True:
+            self.report(jobs.run_due_jobs(worker))
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
+
+    def report(self, ran):
+        for name, status in ran:
+            style = self.style.SUCCESS if status == 'SUCCESS' else self.style.ERROR
+            self.stdout.write(style(f'{name}: {status}'))
+
+    def list_jobs(self):
+        self.stdout.write('%-30s %-15s %-8s %6s %6s %9s %9s  %s' % (
+            'job', 'schedule', 'enabled', 'runs', 'fails', 'last_ms', 'avg_ms', 'next run'))
+        for job in Job.objects.all():
+            self.stdout.write('%-30s %-15s %-8s %6d %6d %9s %9s  %s' % (
+                job.name, job.schedule, job.enabled, job.run_count, job.failure_count,
+                job.last_duration_ms if job.last_duration_ms is not None else '-',
+                job.average_duration_ms if job.average_duration_ms is not None else '-',
+                job.next_run_at or '-'))
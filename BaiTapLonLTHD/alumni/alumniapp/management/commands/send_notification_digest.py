@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from alumniapp import notifications
+
+
+class Command(BaseCommand):
+    help = 'Email a daily digest of unread notifications to users who opted in (run once a day)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=notifications.DIGEST_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sent = notifications.send_digests(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{sent} digest emails sent'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from alumniapp import images
+
+
+class Command(BaseCommand):
+    help = 'Delete CKEditor uploads that no rich-text content references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=images.SWEEP_BATCH_SIZE)
+        parser.add_argument('--grace-hours', type=int, default=None,
+                            help='Keep unreferenced uploads younger than this (default RICH_TEXT_ORPHAN_GRACE_HOURS)')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be deleted')
+
+    def handle(self, *args, **options):
+        paths = images.sweep_orphans(options['batch_size'], options['grace_hours'], options['dry_run'])
+        for path in paths:
+            self.stdout.write(path)
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(f'{len(paths)} orphan uploads {verb}'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0006_event_eventattendee_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['post', 'reaction_type', 'created_at'], name='alumniapp_r_post_id_c589ff_idx'),
+        ),
+    ]
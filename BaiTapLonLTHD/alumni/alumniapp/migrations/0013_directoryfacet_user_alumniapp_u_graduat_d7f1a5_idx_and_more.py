@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0012_hashtag_alter_notification_notification_type_mention_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(max_length=30)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['graduation_year'], name='alumniapp_u_graduat_d7f1a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['first_name'], name='alumniapp_u_first_n_be2b88_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name'], name='alumniapp_u_last_na_fc6292_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['student_id'], name='alumniapp_u_student_81318b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='directoryfacet',
+            unique_together={('facet', 'value')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0013_directoryfacet_user_alumniapp_u_graduat_d7f1a5_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('same_year', models.BooleanField(default=False)),
+                ('shared_groups', models.PositiveIntegerField(default=0)),
+                ('shared_posts', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('suggested', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['user', '-score'], name='alumniapp_u_user_id_ef1012_idx')],
+                'unique_together': {('user', 'suggested')},
+            },
+        ),
+    ]
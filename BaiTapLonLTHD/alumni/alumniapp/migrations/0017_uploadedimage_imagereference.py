@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0016_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('variant_path', models.CharField(blank=True, max_length=255)),
+                ('variant_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('variant_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImageReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(db_index=True, max_length=255)),
+                ('rendered', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_references', to='alumniapp.renderedtext')),
+            ],
+            options={
+                'unique_together': {('rendered', 'path')},
+            },
+        ),
+    ]
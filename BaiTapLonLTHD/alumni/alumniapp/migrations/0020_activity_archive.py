@@ -0,0 +1,52 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0019_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(choices=[('POST', 'Post Notification'), ('COMMENT', 'Comment Notification'), ('EVENT', 'Event Notification'), ('SYSTEM', 'System Notification'), ('REACTION', 'Reaction Notification'), ('MENTION', 'Mention Notification')], max_length=10)),
+                ('title', models.CharField(max_length=200)),
+                ('excerpt', models.CharField(blank=True, max_length=255)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('image_count', models.PositiveIntegerField(default=0)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('last_actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('related_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='alumniapp.post')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['recipient', 'created_at'], name='alumniapp_a_recipie_d3d234_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSurveyResponse',
+            fields=[
+                ('id', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('answer_text', models.TextField(blank=True, null=True)),
+                ('option_ids', models.JSONField(default=list)),
+                ('submitted_at', models.DateTimeField()),
+                ('question', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='alumniapp.surveyquestion')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='alumniapp.survey')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['survey', 'question'], name='alumniapp_a_survey__754788_idx')],
+            },
+        ),
+    ]
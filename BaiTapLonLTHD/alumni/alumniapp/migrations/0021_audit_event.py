@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0020_activity_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('actor_username', models.CharField(blank=True, max_length=150)),
+                ('action', models.CharField(choices=[('VERIFY_ALUMNI', 'Verify alumni'), ('CREATE_LECTURER', 'Create lecturer'), ('MANAGE_MEMBERS', 'Manage group members'), ('DELETE_USER', 'Delete user'), ('DELETE_POST', 'Delete post'), ('DELETE_COMMENT', 'Delete comment'), ('SEND_BULK', 'Send bulk notifications')], max_length=30)),
+                ('target_type', models.CharField(blank=True, max_length=30)),
+                ('target_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['action', 'id'], name='alumniapp_a_action_147177_idx'), models.Index(fields=['actor', 'id'], name='alumniapp_a_actor_i_ffda25_idx'), models.Index(fields=['target_type', 'target_id', 'id'], name='alumniapp_a_target__729368_idx')],
+            },
+        ),
+    ]
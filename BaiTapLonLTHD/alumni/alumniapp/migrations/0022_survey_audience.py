@@ -0,0 +1,53 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0021_audit_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='audience_computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='audience_groups',
+            field=models.ManyToManyField(blank=True, related_name='+', to='alumniapp.group'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='audience_max_graduation_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='audience_min_graduation_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='audience_roles',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='SurveyEligibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility', to='alumniapp.survey')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'responded_at'], name='alumniapp_s_user_id_d3d92a_idx'), models.Index(fields=['survey', 'responded_at'], name='alumniapp_s_survey__3cd88f_idx')],
+                'unique_together': {('survey', 'user')},
+            },
+        ),
+    ]
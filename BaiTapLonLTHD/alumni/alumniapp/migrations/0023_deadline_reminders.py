@@ -0,0 +1,52 @@
+# Generated by Django 5.1.5 on 2026-10-19 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0022_survey_audience'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SURVEY', 'Survey closing'), ('PASSWORD', 'Password change deadline')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deadline', models.DateTimeField()),
+                ('offset_minutes', models.PositiveIntegerField()),
+                ('recipient_count', models.PositiveIntegerField(default=0)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='archivednotification',
+            name='notification_type',
+            field=models.CharField(choices=[('POST', 'Post Notification'), ('COMMENT', 'Comment Notification'), ('EVENT', 'Event Notification'), ('SYSTEM', 'System Notification'), ('REACTION', 'Reaction Notification'), ('MENTION', 'Mention Notification'), ('REMINDER', 'Reminder Notification')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('POST', 'Post Notification'), ('COMMENT', 'Comment Notification'), ('EVENT', 'Event Notification'), ('SYSTEM', 'System Notification'), ('REACTION', 'Reaction Notification'), ('MENTION', 'Mention Notification'), ('REMINDER', 'Reminder Notification')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['end_date'], name='alumniapp_s_end_dat_1ab489_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['password_change_deadline'], name='alumniapp_u_passwor_bb3433_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deadlinereminder',
+            index=models.Index(fields=['deadline'], name='alumniapp_d_deadlin_e04621_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='deadlinereminder',
+            unique_together={('kind', 'object_id', 'deadline', 'offset_minutes')},
+        ),
+    ]
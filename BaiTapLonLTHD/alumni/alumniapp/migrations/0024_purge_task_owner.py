@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0023_deadline_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purgetask',
+            name='owner',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumniapp', '0025_idempotency_lease'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditevent',
+            name='alumniapp_a_actor_i_ffda25_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['actor_username', 'id'], name='alumniapp_a_actor_u_edca23_idx'),
+        ),
+    ]
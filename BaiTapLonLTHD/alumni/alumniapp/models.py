@@ -1,11 +1,21 @@
 from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 import uuid
 from ckeditor.fields import RichTextField
 
+from .cron import CronSchedule, CronError
+
+
+class ActiveManager(models.Manager):
+    # Ẩn các bản ghi đã bị xóa mềm, chờ tiến trình purge xóa hẳn
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class User(AbstractUser):
     class Role(models.TextChoices):
@@ -28,9 +38,40 @@ class User(AbstractUser):
     is_verified = models.BooleanField(default=False)
     password_change_deadline = models.DateTimeField(null=True, blank=True)
     graduation_year = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Nhận thông báo qua một email tổng hợp mỗi ngày thay vì từng email riêng
+    email_digest = models.BooleanField(default=False)
+    last_digest_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Giá trị lúc tải từ DB: khi lưu, signal so sánh với các giá trị này thay vì SELECT lại (directory.py)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Dữ liệu trong DB có thể đã đổi sau lần tải trước
+        self._loaded_values = None
+        self.__dict__.pop('_directory_facets', None)
+
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            models.Index(fields=['role', 'is_verified']),
+            models.Index(fields=['graduation_year']),
+            # Tìm kiếm theo tiền tố trong danh bạ (LIKE 'abc%')
+            models.Index(fields=['first_name']),
+            models.Index(fields=['last_name']),
+            models.Index(fields=['student_id']),
+            # Nhắc giảng viên sắp hết hạn đổi mật khẩu (reminders.py)
+            models.Index(fields=['password_change_deadline']),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.role == self.Role.LECTURER and not self.password_change_deadline:
+        # Chỉ đặt hạn khi tạo tài khoản: change_password xóa hạn và các lần lưu sau không được đặt lại
+        if self._state.adding and self.role == self.Role.LECTURER and not self.password_change_deadline:
             self.password_change_deadline = timezone.now() + timezone.timedelta(hours=24)
         super().save(*args, **kwargs)
 
@@ -53,9 +94,21 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     comments_locked = models.BooleanField(default=False)
     image = models.ImageField(upload_to='posts/%Y/%m', null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('content',)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # ActiveManager luôn lọc deleted_at IS NULL rồi sắp theo created_at
+            models.Index(fields=['deleted_at', 'created_at']),
+            models.Index(fields=['post_type', 'created_at']),
+        ]
 
 
 class Comment(models.Model):
@@ -65,9 +118,17 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     parent_comment = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('content',)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['post', 'created_at'])]
 
 
 class Reaction(models.Model):
@@ -83,6 +144,7 @@ class Reaction(models.Model):
 
     class Meta:
         unique_together = ['post', 'user']
+        indexes = [models.Index(fields=['post', 'reaction_type', 'created_at'])]
 
 
 class Survey(models.Model):
@@ -91,6 +153,32 @@ class Survey(models.Model):
     description = RichTextField()
     end_date = models.DateTimeField()
     is_anonymous = models.BooleanField(default=False)
+    # Tăng mỗi khi khảo sát, câu hỏi hoặc lựa chọn thay đổi; dùng làm khóa cache và ETag (xem surveys.py)
+    version = models.PositiveIntegerField(default=1)
+    # Đối tượng khảo sát: điều kiện để trống thì không giới hạn theo điều kiện đó
+    audience_roles = models.JSONField(default=list, blank=True)
+    audience_min_graduation_year = models.IntegerField(null=True, blank=True)
+    audience_max_graduation_year = models.IntegerField(null=True, blank=True)
+    audience_groups = models.ManyToManyField('Group', blank=True, related_name='+')
+    # Lần cuối danh sách người được khảo sát (SurveyEligibility) được tính lại toàn bộ;
+    # None: khảo sát có trước khi có đối tượng, ai cũng trả lời được
+    audience_computed_at = models.DateTimeField(null=True, blank=True)
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('description',)
+
+    class Meta:
+        indexes = [
+            # Khảo sát sắp đóng cần nhắc (reminders.py)
+            models.Index(fields=['end_date']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # version chỉ tăng bằng UPDATE F() (surveys.bump_version): lưu cả bản ghi không ghi đè giá trị cũ trong bộ nhớ
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'version']
+        super().save(*args, **kwargs)
 
     @property
     def is_active(self):
@@ -108,6 +196,9 @@ class SurveyQuestion(models.Model):
     question_type = models.CharField(max_length=10, choices=QuestionType.choices)
     required = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('question_text',)
 
 
 class SurveyOption(models.Model):
@@ -124,6 +215,55 @@ class SurveyResponse(models.Model):
     selected_options = models.ManyToManyField(SurveyOption, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['survey', 'question'])]
+
+
+class SurveyEligibility(models.Model):
+    # Người thuộc đối tượng của khảo sát, tính sẵn khi đăng và cập nhật khi người dùng/nhóm thay đổi
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='eligibility')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # Lần đầu người dùng trả lời khảo sát
+    responded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['survey', 'user']
+        indexes = [
+            # "Khảo sát tôi chưa trả lời" và tỉ lệ trả lời của một khảo sát
+            models.Index(fields=['user', 'responded_at']),
+            models.Index(fields=['survey', 'responded_at']),
+        ]
+
+
+class Event(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='event')
+    title = models.CharField(max_length=200)
+    location = models.CharField(max_length=255, blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField(null=True, blank=True)
+    # None = không giới hạn số người tham dự
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    # Chỉ cập nhật bằng UPDATE có điều kiện (xem EventViewSet.rsvp)
+    attendee_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['start_time']
+        indexes = [models.Index(fields=['start_time'])]
+
+    @property
+    def is_full(self):
+        return self.capacity is not None and self.attendee_count >= self.capacity
+
+
+class EventAttendee(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='attendees')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='event_registrations')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        unique_together = ['event', 'user']
+
 
 class Group(models.Model):
     name = models.CharField(max_length=100)
@@ -132,6 +272,9 @@ class Group(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('description',)
 
 
 class Notification(models.Model):
@@ -140,6 +283,9 @@ class Notification(models.Model):
         COMMENT = 'COMMENT', 'Comment Notification'
         EVENT = 'EVENT', 'Event Notification'
         SYSTEM = 'SYSTEM', 'System Notification'
+        REACTION = 'REACTION', 'Reaction Notification'
+        MENTION = 'MENTION', 'Mention Notification'
+        REMINDER = 'REMINDER', 'Reminder Notification'
 
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     notification_type = models.CharField(max_length=10, choices=NotificationType.choices)
@@ -147,7 +293,378 @@ class Notification(models.Model):
     message = RichTextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     related_post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.CASCADE)
+    # Các sự kiện cùng loại trên cùng bài viết được gộp vào một thông báo (xem notifications.py)
+    actor_count = models.PositiveIntegerField(default=1)
+    last_actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    rendered = GenericRelation('RenderedText')
+
+    rich_text_fields = ('message',)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+            models.Index(fields=['recipient', 'notification_type', 'related_post', 'created_at']),
+        ]
+
+
+class NotificationActor(models.Model):
+    # Mỗi người gây ra sự kiện chỉ được đếm một lần trong actor_count
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['notification', 'user']
+
+
+class ArchivedNotification(models.Model):
+    # Thông báo cũ hoặc đã đọc được chuyển khỏi bảng Notification (xem retention.py), giữ nguyên id.
+    # Chỉ lưu phần tóm tắt thay cho nội dung rich text và bản render
+    id = models.PositiveBigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    notification_type = models.CharField(max_length=10, choices=Notification.NotificationType.choices)
+    title = models.CharField(max_length=200)
+    excerpt = models.CharField(max_length=255, blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    image_count = models.PositiveIntegerField(default=0)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    related_post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    actor_count = models.PositiveIntegerField(default=1)
+    last_actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['recipient', 'created_at'])]
+
+
+class ArchivedSurveyResponse(models.Model):
+    # Câu trả lời của khảo sát đã đóng lâu, các lựa chọn lưu thành danh sách id thay cho bảng nối
+    id = models.PositiveBigIntegerField(primary_key=True)
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='+')
+    question = models.ForeignKey(SurveyQuestion, on_delete=models.CASCADE, related_name='+', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    answer_text = models.TextField(null=True, blank=True)
+    option_ids = models.JSONField(default=list)
+    submitted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['survey', 'question'])]
+
+
+class DeadlineReminder(models.Model):
+    # Lần nhắc đã gửi cho một hạn chót ở một mốc (số phút trước hạn); hạn chót bị đổi thì được nhắc lại
+    class Kind(models.TextChoices):
+        SURVEY = 'SURVEY', 'Survey closing'
+        PASSWORD = 'PASSWORD', 'Password change deadline'
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    deadline = models.DateTimeField()
+    offset_minutes = models.PositiveIntegerField()
+    recipient_count = models.PositiveIntegerField(default=0)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id', 'deadline', 'offset_minutes']
+        indexes = [models.Index(fields=['deadline'])]
+
+
+class PurgeTask(models.Model):
+    class TargetType(models.TextChoices):
+        POST = 'POST', 'Post'
+        COMMENT = 'COMMENT', 'Comment'
+        USER = 'USER', 'User'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    target_type = models.CharField(max_length=10, choices=TargetType.choices)
+    target_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    # Giai đoạn đang chạy, có tiền tố theo đối tượng (vd. "post:12:comments", "user:comments")
+    stage = models.CharField(max_length=50, blank=True)
+    # Worker đang chạy task; updated_at được cập nhật sau mỗi lô nên cũng là nhịp sống của worker
+    owner = models.CharField(max_length=100, blank=True)
+    deleted_rows = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+
+class Hashtag(models.Model):
+    # Tên đã chuẩn hóa về chữ thường, không có dấu #
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+
+class PostHashtag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='hashtags')
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_links')
+    # Sao chép Post.created_at để trang tag chỉ cần quét index (hashtag, created_at)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['post', 'hashtag']
+        indexes = [models.Index(fields=['hashtag', 'created_at'])]
+
+
+class Mention(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mentions')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='mentions')
+    # None nếu được nhắc trong chính bài viết
+    comment = models.ForeignKey(Comment, null=True, blank=True, on_delete=models.CASCADE, related_name='mentions')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+
+class UserSuggestion(models.Model):
+    # "Có thể bạn biết": top-K do lệnh compute_suggestions tính lại hằng đêm (xem suggestions.py)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    same_year = models.BooleanField(default=False)
+    shared_groups = models.PositiveIntegerField(default=0)
+    shared_posts = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+        unique_together = ['user', 'suggested']
+        indexes = [models.Index(fields=['user', '-score'])]
+
+
+class DirectoryFacet(models.Model):
+    # Tổng số người dùng trong danh bạ theo từng giá trị (năm tốt nghiệp, vai trò), cập nhật dần (xem directory.py)
+    facet = models.CharField(max_length=30)
+    value = models.CharField(max_length=30)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['facet', 'value']
+
+
+class RenderedText(models.Model):
+    # Bản render sẵn của một RichTextField (xem richtext.py), cập nhật khi lưu đối tượng gốc
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=50)
+    source_hash = models.CharField(max_length=40)
+    html = models.TextField(blank=True)
+    excerpt = models.CharField(max_length=255, blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    image_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['content_type', 'object_id', 'field_name']
+
+
+class UploadedImage(models.Model):
+    # Ảnh upload qua CKEditor: kích thước gốc và bản thu nhỏ dùng khi render (xem images.py)
+    path = models.CharField(max_length=255, unique=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variant_path = models.CharField(max_length=255, blank=True)
+    variant_width = models.PositiveIntegerField(null=True, blank=True)
+    variant_height = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ImageReference(models.Model):
+    # Ảnh upload đang được dùng trong một trường rich text; xóa theo RenderedText khi nội dung bị xóa
+    rendered = models.ForeignKey(RenderedText, on_delete=models.CASCADE, related_name='image_references')
+    path = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        unique_together = ['rendered', 'path']
+
+
+class Job(models.Model):
+    # Định nghĩa tác vụ định kỳ; hàm thực thi được đăng ký trong jobs.py theo name
+    name = models.CharField(max_length=100, unique=True)
+    # Cú pháp cron 5 trường: phút giờ ngày tháng thứ (theo TIME_ZONE)
+    schedule = models.CharField(max_length=100)
+    enabled = models.BooleanField(default=True)
+    lease_seconds = models.PositiveIntegerField(default=600)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=10, blank=True)
+    last_duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    run_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    total_duration_ms = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [models.Index(fields=['enabled', 'next_run_at'])]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        try:
+            CronSchedule(self.schedule)
+        except CronError as e:
+            raise ValidationError({'schedule': str(e)})
+
+    @property
+    def average_duration_ms(self):
+        return self.total_duration_ms // self.run_count if self.run_count else None
+
+
+class JobLease(models.Model):
+    # Khóa theo thời hạn: worker nào UPDATE được dòng này thì được chạy job, hết hạn thì worker khác lấy lại
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, primary_key=True, related_name='lease')
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+
+class JobRun(models.Model):
+    class Status(models.TextChoices):
+        SUCCESS = 'SUCCESS', 'Success'
+        FAILED = 'FAILED', 'Failed'
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='runs')
+    worker = models.CharField(max_length=100)
+    started_at = models.DateTimeField()
+    duration_ms = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices)
+    result = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['job', 'started_at'])]
+
+
+class ChangeLog(models.Model):
+    """
+    Nhật ký thay đổi cho API /sync/: id tăng dần chính là con trỏ đồng bộ của client.
+
+    recipient = NULL: thay đổi ai cũng thấy (bài viết, nhóm); ngược lại chỉ người nhận đó thấy (thông báo).
+    """
+    class Entity(models.TextChoices):
+        POST = 'POST', 'Post'
+        GROUP = 'GROUP', 'Group'
+        NOTIFICATION = 'NOTIFICATION', 'Notification'
+
+    entity = models.CharField(max_length=20, choices=Entity.choices)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    recipient = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    # Kết quả của một request có header Idempotency-Key, phát lại khi client gửi lại cùng key (xem idempotency.py)
+    class Status(models.TextChoices):
+        IN_PROGRESS = 'IN_PROGRESS', 'In progress'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.TextField(blank=True)
+    # Request đang chạy giữ key tới thời điểm này; quá hạn mà vẫn IN_PROGRESS (worker chết) thì lần gửi lại chạy tiếp
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+
+class UploadSession(models.Model):
+    # Upload ảnh theo từng phần, tiếp tục được khi mất kết nối (xem uploads.py)
+    class Target(models.TextChoices):
+        POST_IMAGE = 'POST_IMAGE', 'Post image'
+        AVATAR = 'AVATAR', 'Avatar'
+        COVER_IMAGE = 'COVER_IMAGE', 'Cover image'
+
+    class Status(models.TextChoices):
+        ACTIVE = 'ACTIVE', 'Active'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    target = models.CharField(max_length=20, choices=Target.choices)
+    # Bài viết nhận ảnh khi target là POST_IMAGE
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # SHA-256 (hex) của cả file nếu client gửi, kiểm tra khi hoàn tất
+    checksum = models.CharField(max_length=64, blank=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    # Một request đang ghi phần tiếp theo giữ phiên tới thời điểm này
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class AuditEvent(models.Model):
+    # Nhật ký thao tác quản trị/kiểm duyệt, chỉ ghi thêm (xem audit.py). Không dùng khóa ngoại có ràng buộc
+    # để việc xóa người dùng không sửa hay xóa dòng nhật ký
+    class Action(models.TextChoices):
+        VERIFY_ALUMNI = 'VERIFY_ALUMNI', 'Verify alumni'
+        CREATE_LECTURER = 'CREATE_LECTURER', 'Create lecturer'
+        MANAGE_MEMBERS = 'MANAGE_MEMBERS', 'Manage group members'
+        DELETE_USER = 'DELETE_USER', 'Delete user'
+        DELETE_POST = 'DELETE_POST', 'Delete post'
+        DELETE_COMMENT = 'DELETE_COMMENT', 'Delete comment'
+        SEND_BULK = 'SEND_BULK', 'Send bulk notifications'
+
+    created_at = models.DateTimeField(db_index=True)
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                              db_index=False, related_name='+')
+    actor_username = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=30, choices=Action.choices)
+    target_type = models.CharField(max_length=30, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Trang nhật ký lọc theo một điều kiện rồi duyệt theo id giảm dần
+            models.Index(fields=['action', 'id']),
+            models.Index(fields=['actor_username', 'id']),
+            models.Index(fields=['target_type', 'target_id', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Audit events are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Audit events are append-only')
@@ -0,0 +1,166 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import richtext, sync
+from .models import User, Notification, NotificationActor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_SECONDS = 60 * 60
+DIGEST_BATCH_SIZE = 200
+DIGEST_MAX_ITEMS = 20
+
+VERBS = {
+    Notification.NotificationType.COMMENT: 'commented on your post',
+    Notification.NotificationType.REACTION: 'reacted to your post',
+    Notification.NotificationType.MENTION: 'mentioned you',
+}
+
+
+def get_coalesce_window():
+    return timezone.timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_SECONDS', DEFAULT_COALESCE_SECONDS))
+
+
+def describe(notification, actor):
+    name = actor.get_full_name() or actor.username
+    verb = VERBS.get(notification.notification_type, 'interacted with your post')
+    others = notification.actor_count - 1
+    if others <= 0:
+        return '%s %s' % (name, verb)
+    return '%s and %d other%s %s' % (name, others, '' if others == 1 else 's', verb)
+
+
+def _coalesce(notification, actor):
+    # UPDATE trước để giữ khóa dòng tới hết transaction, actor_count đọc lại bên dưới là nhất quán
+    updated = Notification.objects.filter(pk=notification.pk, is_read=False) \
+        .update(last_actor=actor, updated_at=timezone.now())
+    if not updated:
+        # Người nhận vừa đọc thông báo này
+        return None
+    try:
+        with transaction.atomic():
+            NotificationActor.objects.create(notification=notification, user=actor)
+    except IntegrityError:
+        pass  # Cùng một người lặp lại sự kiện: không tăng actor_count
+    else:
+        Notification.objects.filter(pk=notification.pk).update(actor_count=F('actor_count') + 1)
+
+    notification.refresh_from_db(fields=['actor_count', 'last_actor', 'updated_at'])
+    notification.title = notification.message = describe(notification, actor)
+    notification.save(update_fields=['title', 'message'])
+    return notification
+
+
+def notify(recipient, notification_type, actor, related_post=None):
+    """
+    Ghi một sự kiện (bình luận, reaction...) vào hộp thư của recipient.
+
+    Nếu đã có thông báo chưa đọc cùng loại trên cùng bài viết trong khoảng
+    NOTIFICATION_COALESCE_SECONDS thì gộp vào đó ("X and 24 others ..."),
+    ngược lại tạo thông báo mới.
+    """
+    if recipient.pk == actor.pk:
+        return None
+    with transaction.atomic():
+        # Khóa dòng người nhận: hai sự kiện đồng thời không cùng thấy "chưa có thông báo" rồi tạo hai thông báo.
+        # SELECT ... FOR UPDATE trên chính thông báo không khóa được gì khi chưa có dòng nào
+        list(User.objects.select_for_update().filter(pk=recipient.pk).values_list('pk', flat=True))
+        since = timezone.now() - get_coalesce_window()
+        notification = Notification.objects.filter(
+            recipient=recipient,
+            notification_type=notification_type,
+            related_post=related_post,
+            is_read=False,
+            created_at__gte=since,
+        ).order_by('-created_at').first()
+        if notification is not None:
+            notification = _coalesce(notification, actor)
+        if notification is None:
+            notification = Notification(
+                recipient=recipient,
+                notification_type=notification_type,
+                related_post=related_post,
+                last_actor=actor,
+            )
+            notification.title = notification.message = describe(notification, actor)
+            notification.save()
+            NotificationActor.objects.create(notification=notification, user=actor)
+    return notification
+
+
+def create_bulk(notifications):
+    """
+    Lưu nhiều thông báo mới bằng một INSERT. bulk_create không gửi post_save nên bản render
+    rich text và nhật ký sync được ghi theo lô ở đây. Trả về các thông báo đã có pk.
+    """
+    if not notifications:
+        return []
+    last_pk = Notification.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    created = Notification.objects.bulk_create(notifications)
+    if created[0].pk is None:
+        # MySQL không trả về id của các dòng vừa INSERT: đọc lại theo người nhận và tiêu đề
+        keys = {(n.recipient_id, n.notification_type, n.title) for n in created}
+        created = [
+            n for n in Notification.objects.filter(pk__gt=last_pk, recipient_id__in={k[0] for k in keys})
+            if (n.recipient_id, n.notification_type, n.title) in keys
+        ]
+    richtext.store_rendered(Notification, created, created=True)
+    sync.record(Notification, [n.pk for n in created], recipient_ids=[n.recipient_id for n in created])
+    return created
+
+
+def _digest_message(user, notifications):
+    lines = ['Xin chào %s,' % (user.get_full_name() or user.username), '',
+             'Bạn có %d thông báo mới chưa đọc:' % len(notifications), '']
+    lines += ['- %s' % notification.title for notification in notifications[:DIGEST_MAX_ITEMS]]
+    if len(notifications) > DIGEST_MAX_ITEMS:
+        lines.append('... và %d thông báo khác.' % (len(notifications) - DIGEST_MAX_ITEMS))
+    return EmailMessage(
+        'Tổng hợp thông báo hằng ngày',
+        '\n'.join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+def send_digests(batch_size=DIGEST_BATCH_SIZE):
+    """
+    Gửi email tổng hợp cho những người dùng bật email_digest.
+
+    Mỗi người nhận các thông báo chưa đọc có cập nhật kể từ lần gửi trước
+    (lần đầu: trong 24 giờ qua). Trả về số email đã gửi.
+    """
+    now = timezone.now()
+    users = User.objects.filter(email_digest=True, is_active=True, deleted_at__isnull=True) \
+        .exclude(email='').order_by('pk')
+    connection = get_connection()
+    last_pk, sent = 0, 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return sent
+        last_pk = batch[-1].pk
+
+        # Một truy vấn cho cả lô người dùng
+        notifications = Notification.objects.filter(
+            Q(recipient__last_digest_at__isnull=True, updated_at__gt=now - timezone.timedelta(days=1)) |
+            Q(updated_at__gt=F('recipient__last_digest_at')),
+            recipient__in=batch,
+            is_read=False,
+            updated_at__lte=now,
+        ).only('recipient_id', 'title').order_by('recipient_id', '-updated_at')
+        by_user = {}
+        for notification in notifications:
+            by_user.setdefault(notification.recipient_id, []).append(notification)
+
+        recipients = [user for user in batch if user.pk in by_user]
+        messages = [_digest_message(user, by_user[user.pk]) for user in recipients]
+        if messages:
+            sent += connection.send_messages(messages) or 0
+        User.objects.filter(pk__in=[user.pk for user in batch]).update(last_digest_at=now)
+        logger.info('Sent %s notification digests (users up to #%s)', len(messages), last_pk)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class ReactionCursorPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+
+class FeedCursorPagination(CursorPagination):
+    # Trang tag và danh sách lượt nhắc, duyệt theo index (..., created_at)
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+
+def estimated_row_count(model, using='default'):
+    """Số dòng ước lượng của bảng theo thống kê của CSDL (không quét bảng), None nếu không có."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator cho changelist của bảng rất lớn: khi không lọc/tìm kiếm, tổng số
+    dòng lấy từ thống kê của CSDL thay vì COUNT(*) trên toàn bảng.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Chỉ có điều kiện mặc định của manager (vd. deleted_at IS NULL) thì coi như chưa lọc
+        if queryset.query.where != queryset.model._default_manager.all().query.where:
+            return super().count
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < getattr(settings, 'ADMIN_ESTIMATED_COUNT_MIN_ROWS', 100000):
+            return super().count
+        return estimate
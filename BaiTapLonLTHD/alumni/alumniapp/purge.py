@@ -0,0 +1,235 @@
+import logging
+import os
+import socket
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import directory, surveys, sync
+from .models import (
+    User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption,
+    SurveyResponse, Group, Notification, Event, EventAttendee, PurgeTask, ArchivedNotification,
+    ArchivedSurveyResponse, SurveyEligibility, Mention, PostHashtag, RenderedText, ImageReference
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+# Task RUNNING không cập nhật trong khoảng này (giây) được coi là worker đã chết, worker khác lấy lại
+DEFAULT_STALE_SECONDS = 10 * 60
+
+
+class ClaimLost(Exception):
+    """Worker khác đã lấy lại task (task bị coi là treo), worker hiện tại phải dừng."""
+
+
+def get_batch_size():
+    return getattr(settings, 'PURGE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def worker_id():
+    return '%s:%s' % (socket.gethostname(), os.getpid())
+
+
+def soft_delete_post(post):
+    """Ẩn bài viết ngay lập tức, phần dữ liệu liên quan sẽ được purge sau."""
+    with transaction.atomic():
+        Post.objects.filter(pk=post.pk).update(deleted_at=timezone.now())
+        task = PurgeTask.objects.create(target_type=PurgeTask.TargetType.POST, target_id=post.pk)
+        sync.record(Post, [post.pk], deleted=True)
+    return task
+
+
+def soft_delete_comment(comment):
+    with transaction.atomic():
+        Comment.objects.filter(pk=comment.pk).update(deleted_at=timezone.now())
+        task = PurgeTask.objects.create(target_type=PurgeTask.TargetType.COMMENT, target_id=comment.pk)
+        sync.record(Post, [comment.post_id])
+    return task
+
+
+def soft_delete_user(user):
+    now = timezone.now()
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(deleted_at=now, is_active=False)
+        # UPDATE không phát signal nên tự trừ số đếm facet của danh bạ
+        directory.apply_change(directory.stored_facet_values(user), set())
+        directory.remember_facet_values(user, set())
+        post_ids = list(Post.objects.filter(author=user).values_list('pk', flat=True))
+        commented_ids = list(Comment.objects.filter(author=user).exclude(post__author=user)
+                             .values_list('post_id', flat=True).distinct())
+        group_ids = list(Group.objects.filter(members=user).values_list('pk', flat=True))
+        # Mỗi bảng chỉ một câu UPDATE để ẩn nội dung của người dùng
+        Post.objects.filter(author=user).update(deleted_at=now)
+        Comment.objects.filter(author=user).update(deleted_at=now)
+        # Trả lại chỗ ở các sự kiện người dùng đã đăng ký
+        Event.objects.filter(attendees__user=user).update(attendee_count=F('attendee_count') - 1)
+        EventAttendee.objects.filter(user=user).delete()
+        # Không còn thuộc đối tượng của các khảo sát đang mở
+        surveys.update_user_eligibility([user.pk])
+        task = PurgeTask.objects.create(target_type=PurgeTask.TargetType.USER, target_id=user.pk)
+        # UPDATE không phát signal nên tự ghi nhật ký đồng bộ cho client, là câu lệnh cuối trước commit:
+        # id nhật ký được cấp lúc INSERT, càng gần commit thì client càng ít phải chờ (xem sync.py)
+        sync.record(Post, post_ids, deleted=True)
+        sync.record(Post, commented_ids)
+        sync.record(Group, group_ids)
+    return task
+
+
+def _delete_in_batches(queryset, batch_size):
+    """Xóa queryset theo từng lô nhỏ, mỗi lô một transaction ngắn."""
+    model = queryset.model
+    while True:
+        pks = list(queryset.order_by('-pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            count, _ = model._base_manager.filter(pk__in=pks).delete()
+        yield count
+
+
+def _post_stages(post_id):
+    through = SurveyResponse.selected_options.through
+    # Tiền tố theo bài viết: purge người dùng chạy lần lượt nhiều bài viết rồi tới các giai đoạn của người dùng
+    # trong cùng một task, tên trùng nhau ("comments", "reactions"...) sẽ làm bỏ qua giai đoạn khi chạy tiếp
+    prefix = 'post:%s:' % post_id
+    # Bản render của bài viết và các bình luận: xóa theo lô thay vì để cascade khi xóa bài viết/bình luận
+    rendered = RenderedText.objects.filter(
+        Q(content_type=ContentType.objects.get_for_model(Post), object_id=post_id) |
+        Q(content_type=ContentType.objects.get_for_model(Comment),
+          object_id__in=Comment.all_objects.filter(post_id=post_id).values('pk'))
+    )
+    stages = [
+        ('survey_response_options', through.objects.filter(surveyresponse__survey__post_id=post_id)),
+        ('survey_responses', SurveyResponse.objects.filter(survey__post_id=post_id)),
+        ('archived_survey_responses', ArchivedSurveyResponse.objects.filter(survey__post_id=post_id)),
+        ('survey_eligibility', SurveyEligibility.objects.filter(survey__post_id=post_id)),
+        ('survey_options', SurveyOption.objects.filter(question__survey__post_id=post_id)),
+        ('survey_questions', SurveyQuestion.objects.filter(survey__post_id=post_id)),
+        ('survey', Survey.objects.filter(post_id=post_id)),
+        ('event_attendees', EventAttendee.objects.filter(event__post_id=post_id)),
+        ('event', Event.objects.filter(post_id=post_id)),
+        ('notifications', Notification.objects.filter(related_post_id=post_id)),
+        ('archived_notifications', ArchivedNotification.objects.filter(related_post_id=post_id)),
+        ('mentions', Mention.objects.filter(post_id=post_id)),
+        ('hashtags', PostHashtag.objects.filter(post_id=post_id)),
+        ('image_references', ImageReference.objects.filter(rendered__in=rendered)),
+        ('rendered', rendered),
+        ('reactions', Reaction.objects.filter(post_id=post_id)),
+        ('comments', Comment.all_objects.filter(post_id=post_id)),
+        ('post', Post.all_objects.filter(pk=post_id)),
+    ]
+    return [(prefix + name, queryset) for name, queryset in stages]
+
+
+def _comment_stages(comment_id):
+    # Gom toàn bộ các phản hồi con theo từng tầng
+    descendant_ids = []
+    level = [comment_id]
+    while level:
+        level = list(Comment.all_objects.filter(parent_comment_id__in=level).values_list('pk', flat=True))
+        descendant_ids.extend(level)
+    return [
+        ('comment:replies', Comment.all_objects.filter(pk__in=descendant_ids)),
+        ('comment:comment', Comment.all_objects.filter(pk=comment_id)),
+    ]
+
+
+def _user_stages(user_id):
+    through = SurveyResponse.selected_options.through
+    return [
+        ('user:comments', Comment.all_objects.filter(author_id=user_id)),
+        ('user:reactions', Reaction.objects.filter(user_id=user_id)),
+        ('user:survey_response_options', through.objects.filter(surveyresponse__user_id=user_id)),
+        ('user:survey_responses', SurveyResponse.objects.filter(user_id=user_id)),
+        ('user:archived_survey_responses', ArchivedSurveyResponse.objects.filter(user_id=user_id)),
+        ('user:survey_eligibility', SurveyEligibility.objects.filter(user_id=user_id)),
+        ('user:notifications', Notification.objects.filter(recipient_id=user_id)),
+        ('user:archived_notifications', ArchivedNotification.objects.filter(recipient_id=user_id)),
+        ('user:group_memberships', Group.members.through.objects.filter(user_id=user_id)),
+        ('user:created_groups', Group.objects.filter(created_by_id=user_id)),
+        ('user:user', User.objects.filter(pk=user_id)),
+    ]
+
+
+STAGE_BUILDERS = {
+    PurgeTask.TargetType.POST: _post_stages,
+    PurgeTask.TargetType.COMMENT: _comment_stages,
+    PurgeTask.TargetType.USER: _user_stages,
+}
+
+
+def _save(task, *fields):
+    """Lưu tiến độ nếu worker hiện tại vẫn giữ task (UPDATE có điều kiện theo owner)."""
+    task.updated_at = timezone.now()
+    values = {field: getattr(task, field) for field in fields + ('updated_at',)}
+    if not PurgeTask.objects.filter(pk=task.pk, owner=task.owner).update(**values):
+        raise ClaimLost
+
+
+def _claim(task, owner):
+    """Giữ task cho worker hiện tại: chỉ một worker UPDATE được task đang chờ, lỗi hoặc treo quá lâu."""
+    now = timezone.now()
+    stale = now - timezone.timedelta(seconds=getattr(settings, 'PURGE_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+    claimed = PurgeTask.objects.filter(
+        Q(status__in=[PurgeTask.Status.PENDING, PurgeTask.Status.FAILED]) |
+        Q(status=PurgeTask.Status.RUNNING, updated_at__lt=stale),
+        pk=task.pk,
+    ).update(status=PurgeTask.Status.RUNNING, owner=owner, error='', updated_at=now)
+    if claimed:
+        # Đọc lại giai đoạn và số dòng worker trước đã lưu
+        task.refresh_from_db()
+    return claimed == 1
+
+
+def _run_stages(task, stages, batch_size):
+    names = [name for name, _ in stages]
+    # Tiếp tục từ giai đoạn đã lưu nếu tiến trình trước bị dừng giữa chừng
+    start = names.index(task.stage) if task.stage in names else 0
+    for name, queryset in stages[start:]:
+        task.stage = name
+        _save(task, 'stage')
+        for count in _delete_in_batches(queryset, batch_size):
+            task.deleted_rows += count
+            _save(task, 'deleted_rows')
+
+
+def run_purge(task, batch_size=None):
+    """Chạy task nếu giữ được nó; task đang do worker khác chạy được trả về nguyên trạng."""
+    batch_size = batch_size or get_batch_size()
+    if not _claim(task, worker_id()):
+        logger.info('Purge task %s is being run by another worker', task.pk)
+        task.refresh_from_db()
+        return task
+    try:
+        if task.target_type == PurgeTask.TargetType.USER:
+            # Bài viết của người dùng được purge từng bài một trước
+            post_ids = Post.all_objects.filter(author_id=task.target_id).values_list('pk', flat=True)
+            for post_id in list(post_ids):
+                _run_stages(task, _post_stages(post_id), batch_size)
+        _run_stages(task, STAGE_BUILDERS[task.target_type](task.target_id), batch_size)
+        task.status = PurgeTask.Status.DONE
+        task.finished_at = timezone.now()
+        _save(task, 'status', 'finished_at')
+    except ClaimLost:
+        logger.warning('Purge task %s was taken over by another worker', task.pk)
+        return task
+    except Exception as e:
+        logger.exception('Purge task %s failed', task.pk)
+        task.status = PurgeTask.Status.FAILED
+        task.error = str(e)
+        PurgeTask.objects.filter(pk=task.pk, owner=task.owner).update(
+            status=task.status, error=task.error, updated_at=timezone.now())
+        return task
+    logger.info('Purge task %s finished, %s rows deleted', task.pk, task.deleted_rows)
+    return task
+
+
+def pending_tasks(include_failed=False):
+    statuses = [PurgeTask.Status.PENDING, PurgeTask.Status.RUNNING]
+    if include_failed:
+        statuses.append(PurgeTask.Status.FAILED)
+    return PurgeTask.objects.filter(status__in=statuses)
@@ -0,0 +1,175 @@
+"""
+Reminders before a survey closes (Survey.end_date) and before a lecturer's
+password change deadline (User.password_change_deadline).
+
+The send_deadline_reminders job runs every few minutes and only reads the
+deadlines that fall within the largest reminder offset from now, through the
+indexes on end_date and password_change_deadline. Each deadline belongs to
+the nearest offset it has already passed (a survey closing in 50 minutes gets
+the 1-hour reminder, not the 24-hour one), and a DeadlineReminder row per
+(deadline, offset) makes every reminder go out once even if the job runs late
+or twice. Users who have already acted (answered the survey, changed the
+password) are skipped; the others get a REMINDER notification, created in
+bulk, and an email.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import notifications, surveys
+from .models import User, Survey, Notification, DeadlineReminder
+
+logger = logging.getLogger(__name__)
+
+# Số phút trước hạn chót
+DEFAULT_OFFSETS = {
+    DeadlineReminder.Kind.SURVEY: [24 * 60, 60],
+    DeadlineReminder.Kind.PASSWORD: [6 * 60, 60],
+}
+BATCH_SIZE = 500
+# Bản ghi của hạn chót đã qua được giữ thêm khoảng này rồi xóa
+KEEP_DAYS = 7
+
+
+def get_offsets(kind):
+    offsets = getattr(settings, 'DEADLINE_REMINDER_OFFSETS', {}).get(kind, DEFAULT_OFFSETS[kind])
+    return sorted(set(offsets))
+
+
+def describe_remaining(deadline, now):
+    """Thời gian thực còn lại tới hạn chót: "45 minutes", "3 hours" (làm tròn theo giờ khi từ 1 giờ trở lên)."""
+    minutes = max(1, -(-int((deadline - now).total_seconds()) // 60))
+    if minutes < 60:
+        return '%d minute%s' % (minutes, '' if minutes == 1 else 's')
+    hours = round(minutes / 60)
+    return '%d hour%s' % (hours, '' if hours == 1 else 's')
+
+
+def current_offset(deadline, now, offsets):
+    """Mốc nhắc gần hạn nhất mà thời điểm now đã vượt qua (offsets tăng dần), None nếu chưa tới mốc nào."""
+    for offset in offsets:
+        if deadline - now <= timezone.timedelta(minutes=offset):
+            return offset
+    return None
+
+
+def due(kind, deadlines, now):
+    """deadlines: [(object_id, hạn chót)] sắp tới. Trả về [(object_id, hạn chót, mốc)] chưa được nhắc."""
+    offsets = get_offsets(kind)
+    sent = set(DeadlineReminder.objects.filter(kind=kind, object_id__in=[object_id for object_id, _ in deadlines])
+               .values_list('object_id', 'deadline', 'offset_minutes'))
+    result = []
+    for object_id, deadline in deadlines:
+        offset = current_offset(deadline, now, offsets)
+        # Đã nhắc ở mốc này hoặc mốc gần hạn hơn (job chạy trễ)
+        if offset is None or any((object_id, deadline, o) in sent for o in offsets if o <= offset):
+            continue
+        result.append((object_id, deadline, offset))
+    return result
+
+
+def _claim(kind, object_id, deadline, offset):
+    # unique_together: nếu hai worker cùng xử lý một mốc thì chỉ một bên gửi
+    try:
+        with transaction.atomic():
+            return DeadlineReminder.objects.create(kind=kind, object_id=object_id, deadline=deadline,
+                                                   offset_minutes=offset)
+    except IntegrityError:
+        return None
+
+
+def _email(user, subject, lines):
+    return EmailMessage(subject, '\n'.join(['Xin chào %s,' % (user.get_full_name() or user.username), ''] + lines),
+                        settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def _send(reminder, recipients, build_notification, build_email):
+    """Tạo thông báo cho các người dùng trong recipients theo lô, rồi gửi email. Trả về số người được nhắc."""
+    send_email = getattr(settings, 'DEADLINE_REMINDER_EMAIL', True)
+    connection = get_connection()
+    recipients = recipients.order_by('pk').only('pk', 'username', 'first_name', 'last_name', 'email')
+    last_pk, count = 0, 0
+    while True:
+        batch = list(recipients.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        with transaction.atomic():
+            notifications.create_bulk([build_notification(user) for user in batch])
+        if send_email:
+            messages = [build_email(user) for user in batch if user.email]
+            try:
+                connection.send_messages(messages)
+            except Exception:
+                # Thông báo đã được tạo; không gửi lại để tránh nhắc trùng
+                logger.exception('Cannot send %d reminder emails (%s)', len(messages), reminder)
+        count += len(batch)
+    DeadlineReminder.objects.filter(pk=reminder.pk).update(recipient_count=count)
+    return count
+
+
+def remind_surveys(now=None):
+    """Nhắc những người chưa trả lời các khảo sát sắp đóng. Trả về số lời nhắc đã gửi."""
+    now = now or timezone.now()
+    kind = DeadlineReminder.Kind.SURVEY
+    horizon = now + timezone.timedelta(minutes=max(get_offsets(kind), default=0))
+    # Bài viết của khảo sát đã bị xóa mềm thì không nhắc
+    deadlines = list(Survey.objects.filter(end_date__gt=now, end_date__lte=horizon, post__deleted_at__isnull=True)
+                     .values_list('pk', 'end_date'))
+    sent = 0
+    for survey_id, end_date, offset in due(kind, deadlines, now):
+        reminder = _claim(kind, survey_id, end_date, offset)
+        if reminder is None:
+            continue
+        survey = Survey.objects.select_related('post').get(pk=survey_id)
+        title = ('Survey "%s" closes in %s' % (survey.title, describe_remaining(end_date, now)))[:200]
+        closes_at = timezone.localtime(survey.end_date).strftime('%H:%M %d/%m/%Y')
+        sent += _send(
+            reminder, surveys.pending_users(survey),
+            lambda user: Notification(
+                recipient=user, notification_type=Notification.NotificationType.REMINDER, title=title,
+                message='<p>You have not answered this survey yet. It closes at %s.</p>' % closes_at,
+                related_post=survey.post,
+            ),
+            lambda user: _email(user, 'Nhắc trả lời khảo sát', [
+                'Khảo sát "%s" sẽ đóng lúc %s, bạn chưa trả lời khảo sát này.' % (survey.title, closes_at),
+            ]),
+        )
+    return sent
+
+
+def remind_password_changes(now=None):
+    """Nhắc giảng viên chưa đổi mật khẩu trước khi tài khoản bị khóa. Trả về số lời nhắc đã gửi."""
+    now = now or timezone.now()
+    kind = DeadlineReminder.Kind.PASSWORD
+    horizon = now + timezone.timedelta(minutes=max(get_offsets(kind), default=0))
+    # change_password xóa hạn chót khi đã đổi nên chỉ còn những người chưa đổi
+    lecturers = User.objects.filter(role=User.Role.LECTURER, is_active=True, deleted_at__isnull=True)
+    deadlines = list(lecturers.filter(password_change_deadline__gt=now, password_change_deadline__lte=horizon)
+                     .values_list('pk', 'password_change_deadline'))
+    sent = 0
+    for user_id, deadline, offset in due(kind, deadlines, now):
+        reminder = _claim(kind, user_id, deadline, offset)
+        if reminder is None:
+            continue
+        deadline_text = timezone.localtime(deadline).strftime('%H:%M %d/%m/%Y')
+        sent += _send(
+            reminder, lecturers.filter(pk=user_id, password_change_deadline=deadline),
+            lambda user: Notification(
+                recipient=user, notification_type=Notification.NotificationType.REMINDER,
+                title='Change your password within %s' % describe_remaining(deadline, now),
+                message='<p>Your account will be locked if the password is not changed by %s.</p>' % deadline_text,
+            ),
+            lambda user: _email(user, 'Nhắc đổi mật khẩu', [
+                'Vui lòng đổi mật khẩu trước %s, sau thời điểm này tài khoản sẽ bị khóa.' % deadline_text,
+            ]),
+        )
+    return sent
+
+
+def prune(now=None):
+    cutoff = (now or timezone.now()) - timezone.timedelta(days=KEEP_DAYS)
+    return DeadlineReminder.objects.filter(deadline__lt=cutoff).delete()[0]
@@ -0,0 +1,201 @@
+"""
+Retention for notifications and survey responses.
+
+Read notifications that have not changed for `read_days`, and any notification
+older than `max_days` (NOTIFICATION_RETENTION, per notification type), are
+copied into ArchivedNotification in batches and deleted from Notification, so
+the inbox index only holds the active rows. Responses of surveys closed for
+SURVEY_RESPONSE_ARCHIVE_AFTER_DAYS move to ArchivedSurveyResponse the same way.
+
+Reads fall back to the archive: the inbox lists the remaining notifications
+first and continues with the archived ones on later pages (InboxList).
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import sync
+from .models import (
+    Notification, NotificationActor, RenderedText, SurveyResponse, ArchivedNotification, ArchivedSurveyResponse
+)
+from .richtext import get_rendered
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {'read_days': 30, 'max_days': 180}
+BATCH_SIZE = 1000
+
+
+def get_policy(notification_type):
+    policies = getattr(settings, 'NOTIFICATION_RETENTION', {})
+    return {**DEFAULT_POLICY, **policies.get('default', {}), **policies.get(notification_type, {})}
+
+
+def expired_notifications(now=None):
+    """Các thông báo đã hết hạn giữ trong bảng chính theo chính sách của từng loại."""
+    now = now or timezone.now()
+    condition = Q()
+    for notification_type in Notification.NotificationType.values:
+        policy = get_policy(notification_type)
+        condition |= Q(notification_type=notification_type) & (
+            Q(is_read=True, updated_at__lt=now - timezone.timedelta(days=policy['read_days'])) |
+            Q(created_at__lt=now - timezone.timedelta(days=policy['max_days']))
+        )
+    return Notification.objects.filter(condition)
+
+
+def _archived_copy(notification):
+    rendered = get_rendered(notification, 'message')
+    return ArchivedNotification(
+        id=notification.pk,
+        recipient_id=notification.recipient_id,
+        notification_type=notification.notification_type,
+        title=notification.title,
+        excerpt=rendered.excerpt,
+        word_count=rendered.word_count,
+        image_count=rendered.image_count,
+        is_read=notification.is_read,
+        created_at=notification.created_at,
+        updated_at=notification.updated_at,
+        related_post_id=notification.related_post_id,
+        actor_count=notification.actor_count,
+        last_actor_id=notification.last_actor_id,
+    )
+
+
+def _delete_notifications(pks):
+    # DELETE trực tiếp thay cho QuerySet.delete(): không tải lại từng dòng và không gửi post_delete
+    # cho từng thông báo, tombstone cho delta sync được ghi theo lô ở nơi gọi
+    NotificationActor.objects.filter(notification_id__in=pks).delete()
+    RenderedText.objects.filter(content_type=ContentType.objects.get_for_model(Notification),
+                                object_id__in=pks).delete()
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+            quote_name(Notification._meta.db_table), quote_name(Notification._meta.pk.column),
+            ', '.join(['%s'] * len(pks))), pks)
+
+
+def archive_notifications(batch_size=BATCH_SIZE, now=None):
+    """Chuyển các thông báo hết hạn sang bảng lưu trữ theo từng lô; trả về số thông báo đã chuyển."""
+    queryset = expired_notifications(now).prefetch_related('rendered').order_by('pk')
+    last_pk, archived = 0, 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        pks = [notification.pk for notification in batch]
+        with transaction.atomic():
+            ArchivedNotification.objects.bulk_create([_archived_copy(n) for n in batch], ignore_conflicts=True)
+            _delete_notifications(pks)
+            sync.record(Notification, pks, deleted=True, recipient_ids=[n.recipient_id for n in batch])
+        archived += len(batch)
+    logger.info('%s notifications archived', archived)
+    return archived
+
+
+def archive_survey_responses(batch_size=BATCH_SIZE, now=None):
+    """Chuyển câu trả lời của các khảo sát đã đóng đủ lâu sang bảng lưu trữ; trả về số câu trả lời."""
+    days = getattr(settings, 'SURVEY_RESPONSE_ARCHIVE_AFTER_DAYS', None)
+    if days is None:
+        return 0
+    cutoff = (now or timezone.now()) - timezone.timedelta(days=days)
+    queryset = SurveyResponse.objects.filter(survey__end_date__lt=cutoff).order_by('pk')
+    through = SurveyResponse.selected_options.through
+    last_pk, archived = 0, 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        pks = [response.pk for response in batch]
+        option_ids = {}
+        for response_id, option_id in through.objects.filter(surveyresponse_id__in=pks) \
+                .order_by('pk').values_list('surveyresponse_id', 'surveyoption_id'):
+            option_ids.setdefault(response_id, []).append(option_id)
+        with transaction.atomic():
+            ArchivedSurveyResponse.objects.bulk_create([
+                ArchivedSurveyResponse(
+                    id=response.pk, survey_id=response.survey_id, question_id=response.question_id,
+                    user_id=response.user_id, answer_text=response.answer_text,
+                    option_ids=option_ids.get(response.pk, []), submitted_at=response.submitted_at,
+                ) for response in batch
+            ], ignore_conflicts=True)
+            SurveyResponse.objects.filter(pk__in=pks).delete()
+        archived += len(batch)
+    logger.info('%s survey responses archived', archived)
+    return archived
+
+
+def prune_archive(batch_size=BATCH_SIZE, now=None):
+    """Xóa hẳn thông báo lưu trữ cũ hơn NOTIFICATION_ARCHIVE_RETENTION_DAYS (None: giữ mãi)."""
+    days = getattr(settings, 'NOTIFICATION_ARCHIVE_RETENTION_DAYS', None)
+    if days is None:
+        return 0
+    cutoff = (now or timezone.now()) - timezone.timedelta(days=days)
+    deleted = 0
+    while True:
+        pks = list(ArchivedNotification.objects.filter(created_at__lt=cutoff).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += ArchivedNotification.objects.filter(pk__in=pks).delete()[0]
+
+
+class InboxList:
+    """
+    Hộp thư cho Paginator: các thông báo còn trong bảng chính trước, sau đó là thông báo đã lưu trữ.
+
+    Bảng lưu trữ chỉ được truy vấn khi trang cần đi quá số thông báo trong bảng chính.
+    """
+
+    def __init__(self, queryset, archived):
+        self.queryset = queryset
+        self.archived = archived
+        self._hot_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def _split(self, start, stop):
+        # Phần [start:stop] nằm trong bảng chính và phần nằm trong bảng lưu trữ (None nếu không cần đọc)
+        hot_count = self.hot_count
+        hot = slice(start, stop) if start < hot_count else None
+        archived = slice(max(start - hot_count, 0), stop - hot_count) if stop > hot_count else None
+        return hot, archived
+
+    def __getitem__(self, key):
+        # Paginator chỉ cắt theo slice
+        hot, archived = self._split(key.start or 0, key.stop)
+        items = list(self.queryset[hot]) if hot else []
+        if archived:
+            items.extend(self.archived[archived])
+        return items
+
+    async def acount(self):
+        if self._hot_count is None:
+            self._hot_count = await self.queryset.acount()
+        return self._hot_count + await self.archived.acount()
+
+    async def aslice(self, start, stop):
+        """Bản async của self[start:stop] cho async_views, gọi sau acount()."""
+        hot, archived = self._split(start, stop)
+        # chunk_size: aiterator chỉ chạy prefetch_related khi có chunk_size
+        items = [obj async for obj in self.queryset[hot].aiterator(chunk_size=stop - start)] if hot else []
+        if archived:
+            items.extend([obj async for obj in self.archived[archived].aiterator(chunk_size=stop - start)])
+        return items
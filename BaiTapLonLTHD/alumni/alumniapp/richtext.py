@@ -0,0 +1,235 @@
+import hashlib
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from django.contrib.contenttypes.models import ContentType
+
+from . import images
+from .models import RenderedText
+
+EXCERPT_LENGTH = 200
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strong', 'sub', 'sup',
+    'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+# Bỏ cả thẻ lẫn nội dung bên trong
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'head', 'title'}
+VOID_TAGS = {'br', 'hr', 'img'}
+BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'blockquote', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr'}
+
+Rendered = namedtuple('Rendered', 'html text excerpt word_count image_count image_paths')
+
+
+def source_hash(source):
+    return hashlib.sha1((source or '').encode('utf-8')).hexdigest()
+
+
+def _safe_url(value):
+    try:
+        scheme = urlparse(value.strip()).scheme.lower()
+    except ValueError:
+        return False
+    return scheme in ALLOWED_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self, image_resolver=None):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0
+        self.image_count = 0
+        self.image_resolver = image_resolver
+        self.image_paths = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in ALLOWED_TAGS:
+            return
+        if tag == 'img':
+            self.image_count += 1
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        values = {}
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            values[name] = value
+        if tag == 'a':
+            values['rel'] = 'noopener nofollow'
+        if tag == 'img':
+            self.rewrite_image(values)
+        parts = [tag] + ['%s="%s"' % (name, escape(str(value))) for name, value in values.items()]
+        self.html.append('<%s>' % ' '.join(parts))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def rewrite_image(self, values):
+        # Ảnh upload: dùng bản thu nhỏ kèm kích thước thật để trang không bị nhảy khi ảnh tải xong
+        resolved = self.image_resolver(values['src']) if self.image_resolver and values.get('src') else None
+        if resolved is not None:
+            path, values['src'], values['width'], values['height'] = resolved
+            self.image_paths.add(path)
+        values['loading'] = 'lazy'
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        # Đóng luôn các thẻ con chưa đóng
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append('</%s>' % open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        self.close()
+        while self.open_tags:
+            self.html.append('</%s>' % self.open_tags.pop())
+        return ''.join(self.html), ' '.join(''.join(self.text).split())
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:') + '…'
+
+
+def render(source, image_resolver=None):
+    """
+    Làm sạch HTML từ CKEditor, trích văn bản thuần, đoạn tóm tắt, số từ và số ảnh.
+
+    image_resolver(src) -> (đường dẫn upload, src mới, rộng, cao) hoặc None, xem images.resolve.
+    """
+    parser = _Sanitizer(image_resolver)
+    parser.feed(source or '')
+    html, text = parser.result()
+    return Rendered(
+        html=html,
+        text=text,
+        excerpt=make_excerpt(text),
+        word_count=len(text.split()),
+        image_count=parser.image_count,
+        image_paths=parser.image_paths,
+    )
+
+
+def _values(result, digest):
+    return {
+        'source_hash': digest,
+        'html': result.html,
+        'excerpt': result.excerpt,
+        'word_count': result.word_count,
+        'image_count': result.image_count,
+    }
+
+
+def store_rendered(model, objects, created=False, force=False):
+    """
+    Render lại các trường rich text của một lô đối tượng cùng model.
+
+    Chỉ các trường có nội dung thay đổi (so theo source_hash) mới được render
+    và ghi lại, trừ khi force. Danh sách ảnh upload được dùng (ImageReference)
+    cập nhật theo. Trả về số bản ghi RenderedText đã tạo hoặc cập nhật.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    fields = model.rich_text_fields
+    existing = {}
+    if not created:
+        rows = RenderedText.objects.filter(
+            content_type=content_type,
+            object_id__in=[obj.pk for obj in objects],
+            field_name__in=fields,
+        )
+        existing = {(row.object_id, row.field_name): row for row in rows}
+
+    to_create, to_update = [], []
+    image_paths = {}
+    for obj in objects:
+        for field in fields:
+            source = getattr(obj, field) or ''
+            digest = source_hash(source)
+            row = existing.get((obj.pk, field))
+            if row is not None and row.source_hash == digest and not force:
+                continue
+            result = render(source, images.resolve)
+            values = _values(result, digest)
+            if row is None:
+                to_create.append(RenderedText(
+                    content_type=content_type, object_id=obj.pk, field_name=field, **values))
+            else:
+                for name, value in values.items():
+                    setattr(row, name, value)
+                to_update.append(row)
+            image_paths[(obj.pk, field)] = result.image_paths
+        # Bỏ cache prefetch cũ của đối tượng vừa lưu
+        getattr(obj, '_prefetched_objects_cache', {}).pop('rendered', None)
+
+    # Hai lần lưu đồng thời cùng một đối tượng: bản ghi đến sau bị bỏ qua
+    RenderedText.objects.bulk_create(to_create, ignore_conflicts=True)
+    RenderedText.objects.bulk_update(to_update, ['source_hash', 'html', 'excerpt', 'word_count', 'image_count'])
+
+    paths_by_rendered = {row.pk: image_paths[(row.object_id, row.field_name)] for row in to_update}
+    # bulk_create với ignore_conflicts không trả về pk: chỉ đọc lại các dòng mới có ảnh
+    created_keys = {(row.object_id, row.field_name) for row in to_create if image_paths[(row.object_id, row.field_name)]}
+    if created_keys:
+        rows = RenderedText.objects.filter(
+            content_type=content_type,
+            object_id__in={object_id for object_id, _ in created_keys},
+            field_name__in={field for _, field in created_keys},
+        ).values_list('pk', 'object_id', 'field_name')
+        for pk, object_id, field in rows:
+            if (object_id, field) in created_keys:
+                paths_by_rendered[pk] = image_paths[(object_id, field)]
+    images.update_references(paths_by_rendered)
+    return len(to_create) + len(to_update)
+
+
+def get_rendered(obj, field):
+    """Lấy bản render của obj.<field>, ưu tiên dữ liệu đã prefetch qua `rendered`."""
+    for row in obj.rendered.all():
+        if row.field_name == field:
+            return row
+    if field in obj.get_deferred_fields():
+        # Danh sách không tải nội dung gốc: đọc trường bị defer là thêm một truy vấn mỗi dòng (và lỗi trong
+        # view async), nên trả về excerpt rỗng cho tới khi backfill_rendered_text ghi bản render
+        return RenderedText(field_name=field, **_values(render(''), source_hash('')))
+    # Chưa được backfill: render tại chỗ, không ghi lại
+    source = getattr(obj, field) or ''
+    return RenderedText(field_name=field, **_values(render(source), source_hash(source)))
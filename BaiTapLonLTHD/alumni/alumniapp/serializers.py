@@ -1,15 +1,41 @@
 # serializers.py
 
+from django.db.models import Count
 from rest_framework import serializers
-from .models import User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption, SurveyResponse, Group, Notification
+from .models import User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption, SurveyResponse, Group, Notification, \
+    Event, EventAttendee, Hashtag, Mention, UserSuggestion, UploadSession, ArchivedNotification
+from .richtext import get_rendered
+from . import uploads
+
+
+class RenderedTextField(serializers.Field):
+    """Bản render sẵn của một RichTextField: HTML đã làm sạch hoặc đoạn tóm tắt."""
+
+    def __init__(self, rich_field, part='excerpt', **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        self.rich_field = rich_field
+        self.part = part
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        rendered = get_rendered(obj, self.rich_field)
+        if self.part == 'html':
+            return rendered.html
+        return {
+            'text': rendered.excerpt,
+            'word_count': rendered.word_count,
+            'image_count': rendered.image_count,
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'password',
-                  'avatar', 'student_id')
+                  'avatar', 'student_id', 'email_digest')
         read_only_fields = ('is_verified', 'role')
+        extra_kwargs = {'password': {'write_only': True}}
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -31,14 +57,46 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 class CommentSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
+    content_html = RenderedTextField('content', part='html')
 
     class Meta:
         model = Comment
-        fields = ('id', 'post', 'author', 'content', 'created_at', 'updated_at',
-                  'parent_comment')
+        fields = ('id', 'post', 'author', 'content', 'content_html', 'created_at',
+                  'updated_at', 'parent_comment')
         read_only_fields = ('author', 'created_at', 'updated_at')
 
 
+class CommentListSerializer(CommentSerializer):
+    # Danh sách chỉ trả về đoạn tóm tắt, không trả HTML gốc
+    excerpt = RenderedTextField('content')
+
+    class Meta(CommentSerializer.Meta):
+        fields = ('id', 'post', 'author', 'excerpt', 'created_at', 'updated_at',
+                  'parent_comment')
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'avatar')
+
+
+class DirectoryUserSerializer(serializers.ModelSerializer):
+    # Chỉ các trường công khai của danh bạ, không có mật khẩu, email, mã số sinh viên
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'avatar', 'role',
+                  'graduation_year', 'is_verified')
+
+
+class UserSuggestionSerializer(serializers.ModelSerializer):
+    suggested = DirectoryUserSerializer(read_only=True)
+
+    class Meta:
+        model = UserSuggestion
+        fields = ('suggested', 'score', 'same_year', 'shared_groups', 'shared_posts', 'computed_at')
+
+
 class ReactionSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
@@ -48,25 +106,72 @@ class ReactionSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at')
 
 
+class ReactionUserSerializer(serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Reaction
+        fields = ('id', 'user', 'reaction_type', 'created_at')
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
-    reactions = ReactionSerializer(many=True, read_only=True)
+    content_html = RenderedTextField('content', part='html')
     reaction_counts = serializers.SerializerMethodField()
+    my_reaction = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ('id', 'author', 'content', 'post_type', 'created_at',
+        fields = ('id', 'author', 'content', 'content_html', 'post_type', 'created_at',
                   'updated_at', 'comments_locked', 'image', 'comments',
-                  'reactions', 'reaction_counts')
+                  'reaction_counts', 'my_reaction')
         read_only_fields = ('author', 'created_at', 'updated_at')
 
     def get_reaction_counts(self, obj):
-        counts = {}
-        for reaction_type in Reaction.ReactionType.choices:
-            counts[reaction_type[0]] = obj.reactions.filter(reaction_type=reaction_type[0]).count()
+        # Danh sách bài viết truyền sẵn số reaction của cả trang (views.get_reaction_counts)
+        reaction_counts = self.context.get('reaction_counts')
+        if reaction_counts is not None and obj.pk in reaction_counts:
+            return reaction_counts[obj.pk]
+        counts = dict.fromkeys(Reaction.ReactionType.values, 0)
+        for row in obj.reactions.values('reaction_type').annotate(count=Count('id')):
+            counts[row['reaction_type']] = row['count']
         return counts
 
+    def get_my_reaction(self, obj):
+        # Danh sách bài viết truyền sẵn {post_id: reaction_type} của người xem (1 truy vấn cho cả trang)
+        my_reactions = self.context.get('my_reactions')
+        if my_reactions is not None:
+            return my_reactions.get(obj.pk)
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return None
+        return obj.reactions.filter(user=request.user).values_list('reaction_type', flat=True).first()
+
+
+class PostListSerializer(PostSerializer):
+    comments = CommentListSerializer(many=True, read_only=True)
+    excerpt = RenderedTextField('content')
+
+    class Meta(PostSerializer.Meta):
+        fields = ('id', 'author', 'excerpt', 'post_type', 'created_at',
+                  'updated_at', 'comments_locked', 'image', 'comments',
+                  'reaction_counts', 'my_reaction')
+
+
+class HashtagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Hashtag
+        fields = ('id', 'name', 'created_at')
+
+
+class MentionSerializer(serializers.ModelSerializer):
+    author = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Mention
+        fields = ('id', 'author', 'post', 'comment', 'created_at')
+
 
 class SurveyOptionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -76,10 +181,19 @@ class SurveyOptionSerializer(serializers.ModelSerializer):
 
 class SurveyQuestionSerializer(serializers.ModelSerializer):
     options = SurveyOptionSerializer(many=True, read_only=True)
+    question_text_html = RenderedTextField('question_text', part='html')
 
     class Meta:
         model = SurveyQuestion
-        fields = ('id', 'survey', 'question_text', 'question_type', 'required',
+        fields = ('id', 'survey', 'question_text', 'question_text_html', 'question_type',
+                  'required', 'order', 'options')
+
+
+class SurveyQuestionListSerializer(SurveyQuestionSerializer):
+    excerpt = RenderedTextField('question_text')
+
+    class Meta(SurveyQuestionSerializer.Meta):
+        fields = ('id', 'survey', 'excerpt', 'question_type', 'required',
                   'order', 'options')
 
 
@@ -94,20 +208,126 @@ class SurveyResponseSerializer(serializers.ModelSerializer):
 class SurveySerializer(serializers.ModelSerializer):
     questions = SurveyQuestionSerializer(many=True, read_only=True)
     post = PostSerializer(read_only=True)
+    description_html = RenderedTextField('description', part='html')
+    audience_roles = serializers.ListField(child=serializers.ChoiceField(choices=User.Role.choices),
+                                           required=False)
+
+    class Meta:
+        model = Survey
+        fields = ('id', 'post', 'title', 'description', 'description_html', 'end_date',
+                  'is_anonymous', 'questions', 'audience_roles', 'audience_min_graduation_year',
+                  'audience_max_graduation_year', 'audience_groups')
+
+    def validate(self, attrs):
+        low = attrs.get('audience_min_graduation_year', getattr(self.instance, 'audience_min_graduation_year', None))
+        high = attrs.get('audience_max_graduation_year', getattr(self.instance, 'audience_max_graduation_year', None))
+        if low is not None and high is not None and low > high:
+            raise serializers.ValidationError(
+                {'audience_max_graduation_year': 'Must not be earlier than audience_min_graduation_year'})
+        return attrs
+
+
+class SurveyDefinitionQuestionSerializer(serializers.ModelSerializer):
+    question_text_html = RenderedTextField('question_text', part='html')
+    options = SurveyOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = SurveyQuestion
+        fields = ('id', 'question_text_html', 'question_type', 'required', 'order', 'options')
+
+
+class SurveyDefinitionSerializer(serializers.ModelSerializer):
+    # Tài liệu định nghĩa khảo sát được cache theo version (xem surveys.py), không kèm bình luận/reaction
+    description_html = RenderedTextField('description', part='html')
+    questions = SurveyDefinitionQuestionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Survey
-        fields = ('id', 'post', 'title', 'description', 'end_date',
+        fields = ('id', 'post', 'version', 'title', 'description_html', 'end_date',
+                  'is_anonymous', 'questions')
+
+
+class SurveyAnswerSerializer(serializers.Serializer):
+    """Kiểm tra câu trả lời dựa trên định nghĩa khảo sát đã cache (context['definition'])."""
+    question = serializers.IntegerField()
+    answer_text = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    selected_options = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        questions = {question['id']: question for question in self.context['definition']['questions']}
+        question = questions.get(attrs['question'])
+        if question is None:
+            raise serializers.ValidationError({'question': 'Question does not belong to this survey'})
+
+        selected = attrs.get('selected_options') or []
+        if len(set(selected)) != len(selected):
+            raise serializers.ValidationError({'selected_options': 'Duplicate options'})
+        option_ids = {option['id'] for option in question['options']}
+        if not set(selected) <= option_ids:
+            raise serializers.ValidationError({'selected_options': 'Some options do not belong to this question'})
+
+        question_type = question['question_type']
+        if question_type == SurveyQuestion.QuestionType.TEXT:
+            if selected:
+                raise serializers.ValidationError({'selected_options': 'Text questions do not take options'})
+            if question['required'] and not attrs.get('answer_text'):
+                raise serializers.ValidationError({'answer_text': 'This question is required'})
+        else:
+            if question_type == SurveyQuestion.QuestionType.SINGLE_CHOICE and len(selected) > 1:
+                raise serializers.ValidationError({'selected_options': 'Only one option can be selected'})
+            if question['required'] and not selected:
+                raise serializers.ValidationError({'selected_options': 'This question is required'})
+        return attrs
+
+    def create(self, validated_data):
+        # Dùng id trực tiếp, không truy vấn lại câu hỏi và lựa chọn
+        response = SurveyResponse.objects.create(
+            survey_id=self.context['definition']['id'],
+            question_id=validated_data['question'],
+            user=self.context['request'].user,
+            answer_text=validated_data.get('answer_text'),
+        )
+        if validated_data.get('selected_options'):
+            response.selected_options.set(validated_data['selected_options'])
+        return response
+
+
+class SurveyListSerializer(SurveySerializer):
+    questions = SurveyQuestionListSerializer(many=True, read_only=True)
+    post = PostListSerializer(read_only=True)
+    excerpt = RenderedTextField('description')
+
+    class Meta(SurveySerializer.Meta):
+        fields = ('id', 'post', 'title', 'excerpt', 'end_date',
                   'is_anonymous', 'questions')
 
+class EventSerializer(serializers.ModelSerializer):
+    is_full = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Event
+        fields = ('id', 'post', 'title', 'location', 'start_time', 'end_time',
+                  'capacity', 'attendee_count', 'is_full')
+        read_only_fields = ('post', 'attendee_count')
+
+
+class EventAttendeeSerializer(serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = EventAttendee
+        fields = ('id', 'user', 'created_at')
+
+
 class GroupSerializer(serializers.ModelSerializer):
     members = UserSerializer(many=True, read_only=True)
     created_by = UserSerializer(read_only=True)
     member_count = serializers.SerializerMethodField()
+    description_html = RenderedTextField('description', part='html')
 
     class Meta:
         model = Group
-        fields = ('id', 'name', 'description', 'members', 'created_by',
+        fields = ('id', 'name', 'description', 'description_html', 'members', 'created_by',
                   'created_at', 'updated_at', 'member_count')
         read_only_fields = ('created_by', 'created_at', 'updated_at')
 
@@ -125,15 +345,24 @@ class GroupSerializer(serializers.ModelSerializer):
         return group
 
 
+class GroupListSerializer(GroupSerializer):
+    excerpt = RenderedTextField('description')
+
+    class Meta(GroupSerializer.Meta):
+        fields = ('id', 'name', 'excerpt', 'members', 'created_by',
+                  'created_at', 'updated_at', 'member_count')
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     recipient = UserSerializer(read_only=True)
     related_post = serializers.PrimaryKeyRelatedField(read_only=True)
+    message_html = RenderedTextField('message', part='html')
 
     class Meta:
         model = Notification
-        fields = ('id', 'recipient', 'notification_type', 'title', 'message',
-                  'is_read', 'created_at', 'related_post')
-        read_only_fields = ('recipient', 'created_at')
+        fields = ('id', 'recipient', 'notification_type', 'title', 'message', 'message_html',
+                  'is_read', 'created_at', 'updated_at', 'related_post', 'actor_count', 'last_actor')
+        read_only_fields = ('recipient', 'created_at', 'updated_at', 'actor_count', 'last_actor')
 
     def create(self, validated_data):
         # Tự động đặt người nhận là người dùng hiện tại nếu không có chỉ định khác
@@ -142,6 +371,27 @@ class NotificationSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class NotificationListSerializer(NotificationSerializer):
+    excerpt = RenderedTextField('message')
+
+    class Meta(NotificationSerializer.Meta):
+        fields = ('id', 'recipient', 'notification_type', 'title', 'excerpt',
+                  'is_read', 'created_at', 'updated_at', 'related_post', 'actor_count', 'last_actor')
+
+
+class ArchivedNotificationSerializer(serializers.ModelSerializer):
+    # Cùng dạng với NotificationListSerializer để client không phân biệt thông báo đã lưu trữ
+    recipient = UserSerializer(read_only=True)
+    excerpt = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedNotification
+        fields = NotificationListSerializer.Meta.fields
+
+    def get_excerpt(self, obj):
+        return {'text': obj.excerpt, 'word_count': obj.word_count, 'image_count': obj.image_count}
+
+
 class GroupMembershipSerializer(serializers.Serializer):
     user_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -195,7 +445,8 @@ class NotificationBulkCreateSerializer(serializers.Serializer):
             )
             notifications.append(notification)
 
-            if send_email and recipient.email:
+            # Người bật email_digest sẽ nhận trong email tổng hợp hằng ngày
+            if send_email and recipient.email and not recipient.email_digest:
                 # Gửi email thông báo
                 from django.core.mail import send_mail
                 send_mail(
@@ -205,4 +456,43 @@ class NotificationBulkCreateSerializer(serializers.Serializer):
                     [recipient.email],
                 )
 
-        return notifications
\ No newline at end of file
+        return notifications
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    post = serializers.PrimaryKeyRelatedField(queryset=Post.objects.all(), required=False, allow_null=True)
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+    expires_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'target', 'post', 'filename', 'size', 'checksum', 'offset', 'status',
+                  'created_at', 'expires_at')
+        read_only_fields = ('offset', 'status', 'created_at')
+
+    def get_expires_at(self, obj):
+        return obj.updated_at + uploads.get_session_ttl() if obj.status == UploadSession.Status.ACTIVE else None
+
+    def validate_filename(self, value):
+        if not uploads.has_image_extension(value):
+            raise serializers.ValidationError("Only image files can be uploaded")
+        return value
+
+    def validate_size(self, value):
+        max_size = uploads.get_max_size()
+        if not 0 < value <= max_size:
+            raise serializers.ValidationError("Size must be between 1 and %d bytes" % max_size)
+        return value
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        post = attrs.get('post')
+        if attrs['target'] == UploadSession.Target.POST_IMAGE:
+            if post is None:
+                raise serializers.ValidationError({'post': 'This field is required for post images'})
+            if not (post.author_id == user.pk or user.role == User.Role.ADMIN):
+                raise serializers.ValidationError({'post': "You don't have permission to edit this post"})
+        elif post is not None:
+            raise serializers.ValidationError({'post': 'Only post images are attached to a post'})
+        attrs['checksum'] = attrs.get('checksum', '').lower()
+        return attrs
@@ -0,0 +1,175 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.utils import timezone
+
+from . import directory, notifications, richtext, surveys, sync, tags
+from .models import User, Post, Comment, Notification, Reaction, Survey, SurveyQuestion, SurveyOption, Group
+
+
+def render_rich_text(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Bỏ qua loaddata và các lần lưu không đụng tới trường rich text
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(sender.rich_text_fields):
+        return
+    richtext.store_rendered(sender, [instance], created=created)
+
+
+def notify_comment(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    post = instance.post
+    notifications.notify(post.author, Notification.NotificationType.COMMENT, instance.author, post)
+
+
+def notify_reaction(sender, instance, created, raw=False, **kwargs):
+    # Đổi loại reaction không tạo thông báo mới
+    if raw or not created:
+        return
+    post = instance.post
+    notifications.notify(post.author, Notification.NotificationType.REACTION, instance.user, post)
+
+
+def index_tags(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'content' not in update_fields):
+        return
+    if sender is Post:
+        tags.index_post(instance)
+    else:
+        tags.index_comment(instance)
+
+
+def bump_survey_version(sender, instance, raw=False, **kwargs):
+    # Làm mất hiệu lực định nghĩa khảo sát đã cache
+    if raw:
+        return
+    if sender is Survey:
+        surveys.bump_version(instance.pk)
+    elif sender is SurveyQuestion:
+        surveys.bump_version(instance.survey_id)
+    else:
+        surveys.bump_version(SurveyQuestion.objects.filter(pk=instance.question_id).values('survey_id')[:1])
+
+
+def snapshot_survey_audience(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = Survey.objects.filter(pk=instance.pk).values(*surveys.AUDIENCE_FIELDS).first() if instance.pk else None
+    instance._audience = old
+
+
+def refresh_survey_audience(sender, instance, created, raw=False, **kwargs):
+    # Chỉ tính lại khi điều kiện đối tượng đổi (hoặc chưa từng tính), sửa tiêu đề không cần
+    if raw:
+        return
+    current = {field: getattr(instance, field) for field in surveys.AUDIENCE_FIELDS}
+    if created or instance.audience_computed_at is None or getattr(instance, '_audience', None) != current:
+        surveys.refresh_audience_on_commit(instance)
+    instance._audience = current
+
+
+def refresh_survey_audience_groups(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        surveys.refresh_audience_on_commit(instance)
+
+
+def update_user_eligibility(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Lưu last_login khi đăng nhập không ảnh hưởng tới đối tượng khảo sát
+    if raw or (update_fields is not None and not set(update_fields) & surveys.USER_AUDIENCE_FIELDS):
+        return
+    surveys.update_user_eligibility([instance.pk])
+
+
+def update_member_eligibility(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # user.groups_custom.add(...)/remove(...)/clear()
+        surveys.update_user_eligibility([instance.pk])
+    elif pk_set is not None:
+        surveys.update_user_eligibility(pk_set, Survey.objects.filter(audience_groups=instance))
+    else:
+        # group.members.clear(): không biết những ai vừa ra khỏi nhóm
+        for survey in Survey.objects.filter(audience_groups=instance, end_date__gt=timezone.now()):
+            surveys.refresh_audience(survey)
+
+
+def snapshot_directory_facets(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Giữ lại giá trị cũ trong DB để post_save chỉ cập nhật phần chênh lệch của số đếm facet
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(directory.SOURCE_FIELDS):
+        return
+    directory.remember_facet_values(instance, directory.stored_facet_values(instance))
+
+
+def update_directory_facets(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(directory.SOURCE_FIELDS):
+        return
+    old_values = getattr(instance, '_directory_facets', set())
+    # Đọc trường bị defer sẽ gọi refresh_from_db và xóa giá trị cũ đã giữ, nên lấy giá trị cũ trước
+    new_values = directory.facet_values(instance)
+    directory.apply_change(old_values, new_values)
+    directory.remember_facet_values(instance, new_values)
+
+
+def remove_directory_facets(sender, instance, **kwargs):
+    directory.apply_change(directory.facet_values(instance), set())
+
+
+def record_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync.record_instance(instance)
+
+
+def record_deletion(sender, instance, **kwargs):
+    sync.record_instance(instance, deleted=True)
+
+
+def record_post_change(sender, instance, raw=False, **kwargs):
+    # Bình luận và số reaction nằm trong dữ liệu bài viết trả cho client
+    if not raw:
+        sync.record(Post, [instance.post_id])
+
+
+def record_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # user.groups_custom.clear() không có pk_set: lấy danh sách nhóm trước khi xóa
+        instance._sync_group_ids = list(Group.objects.filter(members=instance).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sync.record(Group, [instance.pk])
+    else:
+        sync.record(Group, sorted(pk_set) if pk_set is not None else instance.__dict__.pop('_sync_group_ids', []))
+
+
+def connect(app_config):
+    for model in app_config.get_models():
+        if getattr(model, 'rich_text_fields', None):
+            post_save.connect(render_rich_text, sender=model,
+                              dispatch_uid='render_rich_text_%s' % model._meta.label_lower)
+    post_save.connect(notify_comment, sender=Comment, dispatch_uid='notify_comment')
+    post_save.connect(notify_reaction, sender=Reaction, dispatch_uid='notify_reaction')
+    post_save.connect(index_tags, sender=Post, dispatch_uid='index_tags')
+    post_save.connect(index_tags, sender=Comment, dispatch_uid='index_tags')
+    for model in (Survey, SurveyQuestion, SurveyOption):
+        post_save.connect(bump_survey_version, sender=model, dispatch_uid='bump_survey_version')
+        post_delete.connect(bump_survey_version, sender=model, dispatch_uid='bump_survey_version')
+    pre_save.connect(snapshot_directory_facets, sender=User, dispatch_uid='snapshot_directory_facets')
+    post_save.connect(update_directory_facets, sender=User, dispatch_uid='update_directory_facets')
+    post_delete.connect(remove_directory_facets, sender=User, dispatch_uid='remove_directory_facets')
+    for model in sync.MODEL_ENTITIES:
+        post_save.connect(record_change, sender=model, dispatch_uid='record_change')
+        post_delete.connect(record_deletion, sender=model, dispatch_uid='record_deletion')
+    for model in (Comment, Reaction):
+        post_save.connect(record_post_change, sender=model, dispatch_uid='record_post_change')
+    m2m_changed.connect(record_group_members, sender=Group.members.through, dispatch_uid='record_group_members')
+    pre_save.connect(snapshot_survey_audience, sender=Survey, dispatch_uid='snapshot_survey_audience')
+    post_save.connect(refresh_survey_audience, sender=Survey, dispatch_uid='refresh_survey_audience')
+    m2m_changed.connect(refresh_survey_audience_groups, sender=Survey.audience_groups.through,
+                        dispatch_uid='refresh_survey_audience_groups')
+    post_save.connect(update_user_eligibility, sender=User, dispatch_uid='update_user_eligibility')
+    m2m_changed.connect(update_member_eligibility, sender=Group.members.through,
+                        dispatch_uid='update_member_eligibility')
@@ -0,0 +1,129 @@
+"""
+Precomputed "people you may know" suggestions.
+
+The batch job loads memberships and interactions once into compact id arrays
+(a handful of streaming queries for the whole site), then scores every user
+in memory: the size of the intersection between two users' groups / posts is
+obtained by counting ids over the arrays of their groups and posts.
+"""
+import heapq
+import logging
+from array import array
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import User, Group, Comment, Reaction, UserSuggestion
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20
+WRITE_BATCH_SIZE = 1000
+INTERACTION_DAYS = 365
+# Nhóm/bài viết quá đông không nói lên quan hệ quen biết, bỏ qua khi sinh ứng viên
+MAX_FANOUT = 500
+
+WEIGHT_SAME_YEAR = 3.0
+WEIGHT_GROUP = 2.0
+WEIGHT_POST = 1.0
+
+
+def _id_arrays(pairs, max_size=None):
+    """Gom các cặp (khóa, id) thành {khóa: array các id không trùng}."""
+    grouped = defaultdict(set)
+    for key, value in pairs:
+        grouped[key].add(value)
+    return {key: array('q', sorted(values)) for key, values in grouped.items()
+            if max_size is None or len(values) <= max_size}
+
+
+def _invert(mapping):
+    inverted = defaultdict(list)
+    for key, values in mapping.items():
+        for value in values:
+            inverted[value].append(key)
+    return {key: array('q', values) for key, values in inverted.items()}
+
+
+class SuggestionData:
+    def __init__(self, since):
+        # Chỉ cựu sinh viên đang hoạt động
+        users = User.objects.filter(role=User.Role.ALUMNI, is_active=True, deleted_at__isnull=True)
+        self.years = dict(users.values_list('pk', 'graduation_year').iterator(chunk_size=10000))
+
+        memberships = Group.members.through.objects.filter(user_id__in=users.values('pk')) \
+            .values_list('group_id', 'user_id').iterator(chunk_size=10000)
+        self.group_members = _id_arrays(memberships, MAX_FANOUT)
+        self.user_groups = _invert(self.group_members)
+
+        interactions = (
+            Comment.objects.filter(created_at__gte=since).values_list('post_id', 'author_id').iterator(chunk_size=10000),
+            Reaction.objects.filter(created_at__gte=since).values_list('post_id', 'user_id').iterator(chunk_size=10000),
+        )
+        self.post_users = _id_arrays(
+            ((post_id, user_id) for rows in interactions for post_id, user_id in rows if user_id in self.years),
+            MAX_FANOUT)
+        self.user_posts = _invert(self.post_users)
+
+        # Bạn cùng khóa, người tương tác nhiều đứng trước; dùng để bổ sung khi thiếu ứng viên
+        cohorts = defaultdict(list)
+        for user_id, year in self.years.items():
+            if year is not None:
+                cohorts[year].append(user_id)
+        self.cohorts = {
+            year: sorted(members, key=lambda pk: -len(self.user_posts.get(pk, ())))[:TOP_K * 2]
+            for year, members in cohorts.items()
+        }
+
+    def score(self, user_id, top_k=TOP_K):
+        shared_groups = Counter()
+        for group_id in self.user_groups.get(user_id, ()):
+            shared_groups.update(self.group_members[group_id])
+        shared_posts = Counter()
+        for post_id in self.user_posts.get(user_id, ()):
+            shared_posts.update(self.post_users[post_id])
+
+        year = self.years.get(user_id)
+        candidates = set(shared_groups) | set(shared_posts)
+        if year is not None and len(candidates) <= top_k:
+            candidates.update(self.cohorts.get(year, ()))
+        candidates.discard(user_id)
+
+        scored = []
+        for candidate in candidates:
+            same_year = year is not None and self.years[candidate] == year
+            score = (WEIGHT_SAME_YEAR * same_year + WEIGHT_GROUP * shared_groups[candidate] +
+                     WEIGHT_POST * shared_posts[candidate])
+            scored.append((score, -candidate, same_year, shared_groups[candidate], shared_posts[candidate]))
+        return heapq.nlargest(top_k, scored)
+
+
+def compute_suggestions(shard=0, shards=1, top_k=TOP_K, batch_size=WRITE_BATCH_SIZE):
+    """
+    Tính lại gợi ý cho mọi cựu sinh viên (hoặc một phần: user_id % shards == shard).
+
+    Trả về số người dùng đã được tính.
+    """
+    started = timezone.now()
+    data = SuggestionData(since=started - timezone.timedelta(days=INTERACTION_DAYS))
+    user_ids = sorted(pk for pk in data.years if pk % shards == shard)
+    logger.info('Computing suggestions for %s users (%s groups, %s posts)',
+                len(user_ids), len(data.group_members), len(data.post_users))
+
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        rows = [
+            UserSuggestion(user_id=user_id, suggested_id=-negative_id, score=score, same_year=same_year,
+                           shared_groups=groups, shared_posts=posts, computed_at=started)
+            for user_id in batch
+            for score, negative_id, same_year, groups, posts in data.score(user_id, top_k)
+        ]
+        with transaction.atomic():
+            UserSuggestion.objects.filter(user_id__in=batch).delete()
+            UserSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+
+    if shards == 1:
+        # Người dùng không còn là cựu sinh viên đang hoạt động
+        UserSuggestion.objects.filter(computed_at__lt=started).delete()
+    return len(user_ids)
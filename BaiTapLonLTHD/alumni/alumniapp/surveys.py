@@ -0,0 +1,221 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Prefetch, Q
+from django.utils import timezone
+
+from .models import (
+    User, Group, Survey, SurveyQuestion, SurveyOption, SurveyResponse, ArchivedSurveyResponse, SurveyEligibility
+)
+
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24
+ELIGIBILITY_BATCH_SIZE = 1000
+AUDIENCE_FIELDS = ('audience_roles', 'audience_min_graduation_year', 'audience_max_graduation_year')
+# Thay đổi các trường này của User có thể làm người dùng vào/ra khỏi đối tượng khảo sát
+USER_AUDIENCE_FIELDS = {'role', 'graduation_year', 'is_active', 'deleted_at'}
+
+
+def cache_key(survey_id, version):
+    return 'survey-definition:%s:%s' % (survey_id, version)
+
+
+def etag(survey_id, version):
+    return '"survey-%s-v%s"' % (survey_id, version)
+
+
+def get_version(survey_id):
+    return Survey.objects.filter(pk=survey_id).values_list('version', flat=True).first()
+
+
+def bump_version(survey_id):
+    # Khóa cache cũ không cần xóa, nó hết hạn theo timeout
+    Survey.objects.filter(pk=survey_id).update(version=F('version') + 1)
+
+
+def build_definition(survey_id):
+    from .serializers import SurveyDefinitionSerializer
+
+    options = SurveyOption.objects.order_by('order', 'pk')
+    questions = SurveyQuestion.objects.order_by('order', 'pk') \
+        .prefetch_related('rendered', Prefetch('options', queryset=options))
+    survey = Survey.objects.prefetch_related('rendered', Prefetch('questions', queryset=questions)) \
+        .filter(pk=survey_id).first()
+    if survey is None:
+        return None
+    return dict(SurveyDefinitionSerializer(survey).data)
+
+
+def get_definition(survey_id, version=None):
+    """
+    Trả về định nghĩa khảo sát (câu hỏi, lựa chọn) đã cache theo version.
+
+    Chỉ tốn một truy vấn lấy version khi cache còn; trả về None nếu khảo sát không tồn tại.
+    """
+    if version is None:
+        version = get_version(survey_id)
+        if version is None:
+            return None
+    key = cache_key(survey_id, version)
+    definition = cache.get(key)
+    if definition is None:
+        definition = build_definition(survey_id)
+        if definition is None:
+            return None
+        cache.set(key, definition, getattr(settings, 'SURVEY_DEFINITION_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return definition
+
+
+def response_statistics(survey_id):
+    """
+    Tổng số câu trả lời và số câu trả lời theo từng câu hỏi, lựa chọn.
+
+    Gồm cả câu trả lời đã chuyển sang bảng lưu trữ (xem retention.py).
+    """
+    by_question = Counter(dict(
+        SurveyResponse.objects.filter(survey_id=survey_id).order_by()
+        .values_list('question').annotate(n=Count('pk'))
+    ))
+    by_option = Counter(dict(
+        SurveyResponse.selected_options.through.objects.filter(surveyresponse__survey_id=survey_id).order_by()
+        .values_list('surveyoption').annotate(n=Count('pk'))
+    ))
+    for question_id, option_ids in ArchivedSurveyResponse.objects.filter(survey_id=survey_id) \
+            .values_list('question_id', 'option_ids').iterator():
+        by_question[question_id] += 1
+        by_option.update(option_ids)
+
+    questions = SurveyQuestion.objects.filter(survey_id=survey_id).order_by('order', 'pk') \
+        .prefetch_related(Prefetch('options', queryset=SurveyOption.objects.order_by('order', 'pk')))
+    return sum(by_question.values()), [
+        {
+            'question': question.pk,
+            'responses': by_question[question.pk],
+            'options': [{'option': option.pk, 'count': by_option[option.pk]} for option in question.options.all()],
+        }
+        for question in questions
+    ]
+
+
+def audience_users(survey, group_ids=None):
+    """Người dùng thuộc đối tượng của khảo sát; group_ids: id các nhóm đối tượng nếu đã có sẵn."""
+    users = User.objects.filter(is_active=True, deleted_at__isnull=True)
+    if survey.audience_roles:
+        users = users.filter(role__in=survey.audience_roles)
+    if survey.audience_min_graduation_year is not None:
+        users = users.filter(graduation_year__gte=survey.audience_min_graduation_year)
+    if survey.audience_max_graduation_year is not None:
+        users = users.filter(graduation_year__lte=survey.audience_max_graduation_year)
+    if group_ids is None:
+        group_ids = list(survey.audience_groups.values_list('pk', flat=True))
+    if group_ids:
+        users = users.filter(pk__in=Group.members.through.objects.filter(group_id__in=group_ids).values('user_id'))
+    return users
+
+
+def _apply_eligibility(survey_id, added, removed):
+    SurveyEligibility.objects.bulk_create(
+        [SurveyEligibility(survey_id=survey_id, user_id=user_id) for user_id in sorted(added)],
+        batch_size=ELIGIBILITY_BATCH_SIZE, ignore_conflicts=True,
+    )
+    removed = sorted(removed)
+    for start in range(0, len(removed), ELIGIBILITY_BATCH_SIZE):
+        SurveyEligibility.objects.filter(survey_id=survey_id,
+                                         user_id__in=removed[start:start + ELIGIBILITY_BATCH_SIZE]).delete()
+
+
+def refresh_audience(survey):
+    """Tính lại toàn bộ danh sách người được khảo sát, chỉ ghi phần chênh lệch. Trả về (số thêm, số bớt)."""
+    wanted = set(audience_users(survey).values_list('pk', flat=True))
+    existing = set(SurveyEligibility.objects.filter(survey=survey).values_list('user_id', flat=True))
+    added, removed = wanted - existing, existing - wanted
+    now = timezone.now()
+    with transaction.atomic():
+        _apply_eligibility(survey.pk, added, removed)
+        if survey.audience_computed_at is None:
+            # Khảo sát có trước khi có đối tượng: ghi nhận những người đã trả lời
+            first_responses = SurveyResponse.objects.filter(survey=survey, user_id__in=wanted).order_by() \
+                .values_list('user_id').annotate(first=Min('submitted_at'))
+            for user_id, responded_at in first_responses:
+                SurveyEligibility.objects.filter(survey=survey, user_id=user_id, responded_at__isnull=True) \
+                    .update(responded_at=responded_at)
+        # UPDATE thay cho save() để không phát lại signal của Survey
+        Survey.objects.filter(pk=survey.pk).update(audience_computed_at=now)
+    survey.audience_computed_at = now
+    return len(added), len(removed)
+
+
+def refresh_audience_on_commit(survey):
+    """
+    Tính lại đối tượng sau khi transaction hiện tại commit, mỗi instance một lần.
+
+    Tạo khảo sát rồi gán audience_groups (admin, serializer) nằm trong cùng transaction: tính ngay lúc
+    post_save sẽ thêm mọi người dùng rồi lại xóa đi khi nhóm được gán.
+    """
+    if getattr(survey, '_audience_refresh_pending', False):
+        return
+    survey._audience_refresh_pending = True
+
+    def refresh():
+        survey._audience_refresh_pending = False
+        refresh_audience(survey)
+    transaction.on_commit(refresh)
+
+
+def update_user_eligibility(user_ids, surveys=None):
+    """
+    Cập nhật tư cách của một số người dùng với các khảo sát còn mở (mặc định: tất cả).
+
+    Khảo sát đã đóng giữ nguyên danh sách lúc đóng, làm mẫu số cho tỉ lệ trả lời.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    surveys = (surveys if surveys is not None else Survey.objects.all()) \
+        .filter(end_date__gt=timezone.now(), audience_computed_at__isnull=False) \
+        .prefetch_related(Prefetch('audience_groups', queryset=Group.objects.only('pk')))
+    for survey in surveys:
+        group_ids = [group.pk for group in survey.audience_groups.all()]
+        wanted = set(audience_users(survey, group_ids).filter(pk__in=user_ids).values_list('pk', flat=True))
+        existing = set(SurveyEligibility.objects.filter(survey=survey, user_id__in=user_ids)
+                       .values_list('user_id', flat=True))
+        _apply_eligibility(survey.pk, wanted - existing, existing - wanted)
+
+
+def visible_to(queryset, user):
+    """Lọc khảo sát user được thấy: quản trị viên/giảng viên thấy hết, người khác chỉ khảo sát mình thuộc đối tượng
+    (khảo sát chưa có đối tượng: mọi người)."""
+    if getattr(user, 'role', None) in (User.Role.ADMIN, User.Role.LECTURER):
+        return queryset
+    eligible = SurveyEligibility.objects.filter(survey=OuterRef('pk'), user_id=user.pk)
+    return queryset.filter(Q(audience_computed_at__isnull=True) | Q(Exists(eligible)))
+
+
+def can_respond(survey_id, user):
+    if SurveyEligibility.objects.filter(survey_id=survey_id, user=user).exists():
+        return True
+    return Survey.objects.filter(pk=survey_id, audience_computed_at__isnull=True).exists()
+
+
+def mark_responded(survey_id, user):
+    SurveyEligibility.objects.filter(survey_id=survey_id, user=user, responded_at__isnull=True) \
+        .update(responded_at=timezone.now())
+
+
+def pending_users(survey):
+    """Người thuộc đối tượng của khảo sát chưa trả lời."""
+    if survey.audience_computed_at is None:
+        return audience_users(survey).exclude(
+            pk__in=SurveyResponse.objects.filter(survey=survey).values('user_id'))
+    # Đi theo index (survey, responded_at) của SurveyEligibility
+    return User.objects.filter(is_active=True, deleted_at__isnull=True, pk__in=SurveyEligibility.objects.filter(
+        survey=survey, responded_at__isnull=True).values('user_id'))
+
+
+def response_rate(survey_id):
+    """Số người thuộc đối tượng, số người đã trả lời và tỉ lệ (None nếu chưa có đối tượng)."""
+    counts = SurveyEligibility.objects.filter(survey_id=survey_id) \
+        .aggregate(eligible=Count('pk'), responded=Count('responded_at'))
+    counts['rate'] = round(counts['responded'] / counts['eligible'], 4) if counts['eligible'] else None
+    return counts
@@ -0,0 +1,136 @@
+"""
+Delta sync for offline clients.
+
+Every create/update/delete of a post, group or notification appends a row to
+ChangeLog (signals, plus explicit calls where the change is a bulk UPDATE, e.g.
+soft deletes). A client keeps the id of the last row it has seen as its cursor
+and GET /sync/?since=<cursor> returns the current state of what changed after
+it, or a tombstone for what was deleted.
+
+Row ids are handed out at INSERT but become visible at COMMIT, so rows newer
+than the oldest transaction that is still writing are held back: a client
+must not move its cursor past a row that is about to appear. Writers append
+their ChangeLog rows as the last statement before commit to keep that gap short.
+"""
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Post, Group, Notification, ChangeLog
+
+logger = logging.getLogger(__name__)
+
+ENTITY_MODELS = {
+    ChangeLog.Entity.POST: Post,
+    ChangeLog.Entity.GROUP: Group,
+    ChangeLog.Entity.NOTIFICATION: Notification,
+}
+MODEL_ENTITIES = {model: entity for entity, model in ENTITY_MODELS.items()}
+
+DEFAULT_BATCH_SIZE = 200
+MAX_BATCH_SIZE = 1000
+# Dòng mới ghi trong khoảng này (giây) chưa được trả về: id được cấp lúc INSERT nhưng transaction
+# có thể commit sau một dòng có id lớn hơn, client đã vượt qua con trỏ sẽ bỏ sót dòng đó.
+# Transaction đang ghi chạy lâu hơn thì khoảng chờ tính từ lúc nó bắt đầu (xem in_flight_seconds)
+DEFAULT_SETTLE_SECONDS = 2
+# Tuổi (giây) của transaction đang ghi lâu nhất; MySQL cần quyền PROCESS để đọc information_schema.innodb_trx
+IN_FLIGHT_SQL = {
+    'mysql': 'SELECT TIMESTAMPDIFF(MICROSECOND, MIN(trx_started), NOW(6)) / 1000000 '
+             'FROM information_schema.innodb_trx WHERE trx_rows_modified > 0',
+    'postgresql': 'SELECT EXTRACT(EPOCH FROM now() - MIN(xact_start)) '
+                  'FROM pg_stat_activity WHERE backend_xid IS NOT NULL',
+}
+DEFAULT_RETENTION_DAYS = 30
+PRUNE_BATCH_SIZE = 5000
+
+
+def get_settle_seconds():
+    return getattr(settings, 'SYNC_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+
+
+def in_flight_seconds():
+    """Tuổi của transaction đang ghi lâu nhất (0 nếu không có hoặc CSDL không cho biết)."""
+    sql = IN_FLIGHT_SQL.get(connection.vendor)
+    if sql is None:
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            row = cursor.fetchone()
+    except DatabaseError:
+        logger.warning('Cannot read in-flight transactions, sync falls back to SYNC_SETTLE_SECONDS', exc_info=True)
+        return 0
+    return float(row[0]) if row and row[0] is not None else 0
+
+
+def get_cutoff():
+    """Chỉ trả về dòng ghi trước thời điểm này: mọi dòng chưa commit đều được ghi sau nó."""
+    return timezone.now() - timezone.timedelta(seconds=max(get_settle_seconds(), in_flight_seconds()))
+
+
+def record(model, object_ids, deleted=False, recipient_ids=None):
+    """Ghi thay đổi của các đối tượng; recipient_ids song song với object_ids nếu chỉ người nhận được thấy."""
+    entity = MODEL_ENTITIES[model]
+    recipient_ids = recipient_ids or [None] * len(object_ids)
+    ChangeLog.objects.bulk_create([
+        ChangeLog(entity=entity, object_id=object_id, deleted=deleted, recipient_id=recipient_id)
+        for object_id, recipient_id in zip(object_ids, recipient_ids)
+    ])
+
+
+def record_instance(instance, deleted=False):
+    recipient_id = instance.recipient_id if isinstance(instance, Notification) else None
+    record(type(instance), [instance.pk], deleted, [recipient_id])
+
+
+def current_cursor():
+    last = ChangeLog.objects.filter(created_at__lte=get_cutoff()).order_by('-pk').values_list('pk', flat=True).first()
+    return last or 0
+
+
+def is_expired(since):
+    """Con trỏ cũ hơn phần nhật ký còn giữ lại: client phải tải lại toàn bộ."""
+    first = ChangeLog.objects.aggregate(first=Min('pk'))['first']
+    return first is not None and since + 1 < first
+
+
+def changes_since(user, since, limit=DEFAULT_BATCH_SIZE):
+    """
+    Tối đa limit dòng nhật ký sau since mà user được thấy, theo thứ tự id, và cờ còn dữ liệu.
+
+    Hai truy vấn (thay đổi chung và của riêng user) đều đi theo index (recipient, id).
+    """
+    cutoff = get_cutoff()
+    rows = []
+    for recipient in (None, user.pk):
+        rows.extend(
+            ChangeLog.objects.filter(recipient_id=recipient, pk__gt=since, created_at__lte=cutoff)
+            .order_by('pk').values_list('pk', 'entity', 'object_id', 'deleted')[:limit + 1]
+        )
+    rows.sort()
+    # Lấy dư một dòng để biết còn thay đổi phía sau hay không
+    return rows[:limit], len(rows) > limit
+
+
+def collapse(rows):
+    """Mỗi đối tượng chỉ giữ thay đổi cuối cùng: {entity: {object_id: deleted}}."""
+    latest = {entity: {} for entity in ENTITY_MODELS}
+    for _, entity, object_id, deleted in rows:
+        latest[entity][object_id] = deleted
+    return latest
+
+
+def prune(days=None, batch_size=PRUNE_BATCH_SIZE):
+    """Xóa nhật ký cũ hơn SYNC_RETENTION_DAYS theo từng lô; trả về số dòng đã xóa."""
+    days = days or getattr(settings, 'SYNC_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    cutoff = timezone.now() - timezone.timedelta(days=days)
+    deleted = 0
+    while True:
+        pks = list(ChangeLog.objects.filter(created_at__lt=cutoff).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += ChangeLog.objects.filter(pk__in=pks).delete()[0]
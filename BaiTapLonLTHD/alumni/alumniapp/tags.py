@@ -0,0 +1,63 @@
+import re
+
+from django.db import transaction
+
+from . import notifications, richtext
+from .models import User, Post, Hashtag, PostHashtag, Mention, Notification
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w{1,100})')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]{1,150})')
+
+
+def extract(source):
+    """Trả về (tập hashtag đã chuẩn hóa, tập username) trong phần chữ của nội dung HTML."""
+    text = richtext.render(source).text
+    tags = {tag.lower() for tag in HASHTAG_RE.findall(text)}
+    # Bỏ dấu chấm cuối câu: "cảm ơn @trung." -> trung
+    usernames = {username.rstrip('.') for username in MENTION_RE.findall(text)}
+    return tags, usernames - {''}
+
+
+def _sync_hashtags(post, tags):
+    current = dict(PostHashtag.objects.filter(post=post).values_list('hashtag__name', 'pk'))
+    removed = [pk for name, pk in current.items() if name not in tags]
+    added = tags - set(current)
+    if removed:
+        PostHashtag.objects.filter(pk__in=removed).delete()
+    if added:
+        Hashtag.objects.bulk_create([Hashtag(name=name) for name in added], ignore_conflicts=True)
+        PostHashtag.objects.bulk_create([
+            PostHashtag(post=post, hashtag=hashtag, created_at=post.created_at)
+            for hashtag in Hashtag.objects.filter(name__in=added)
+        ], ignore_conflicts=True)
+
+
+def _sync_mentions(post, comment, author, usernames, notify):
+    mentions = Mention.objects.filter(post=post, comment=comment)
+    current = set(mentions.values_list('user_id', flat=True))
+    users = {user.pk: user for user in User.objects.filter(username__in=usernames, deleted_at__isnull=True)}
+    removed = current - set(users)
+    if removed:
+        mentions.filter(user_id__in=removed).delete()
+    added = [user for pk, user in users.items() if pk not in current]
+    Mention.objects.bulk_create([
+        Mention(user=user, author=author, post=post, comment=comment) for user in added
+    ])
+    if notify:
+        for user in added:
+            notifications.notify(user, Notification.NotificationType.MENTION, author, post)
+
+
+def index_post(post, notify=True):
+    """Cập nhật hashtag và lượt nhắc (@username) của một bài viết theo nội dung hiện tại."""
+    tags, usernames = extract(post.content)
+    with transaction.atomic():
+        _sync_hashtags(post, tags)
+        _sync_mentions(post, None, post.author, usernames, notify)
+
+
+def index_comment(comment, notify=True):
+    # Hashtag chỉ gắn với bài viết, bình luận chỉ tạo lượt nhắc
+    _, usernames = extract(comment.content)
+    with transaction.atomic():
+        _sync_mentions(Post(pk=comment.post_id), comment, comment.author, usernames, notify)
@@ -1,3 +1,1269 @@
-from django.test import TestCase
+import datetime
+import decimal
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import Http404, HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from alumni import schema
+
+from . import (
+    audit, compression, db_router, directory, images, jobs, notifications, paginators, purge, reminders, renderers, retention,
+    surveys, sync, throttling
+)
+
+from .admin import AuditEventAdmin
+from .cron import CronError, CronSchedule
+from .models import (
+    User, Post, Comment, Reaction, Survey, SurveyQuestion, SurveyOption, SurveyEligibility,
+    Notification, Event, EventAttendee, RenderedText, Group, PurgeTask, IdempotencyKey, ChangeLog,
+    UploadedImage, ImageReference, AuditEvent, ArchivedNotification, DeadlineReminder, Mention, PostHashtag
+)
+
+# SQLite: "SCAN alumniapp_post" (không kèm USING INDEX) là quét toàn bảng
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+
+
+def full_scans(sql):
+    """Chạy EXPLAIN cho một câu SQL, trả về tên các bảng bị quét toàn bộ."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            matches = [SQLITE_FULL_SCAN.match(row[-1]) for row in cursor.fetchall()]
+            # Bỏ qua bảng tạm của subquery (vd. SELECT COUNT(*) FROM (...) subquery)
+            tables = set(connection.introspection.table_names(cursor))
+            return [match.group('table') for match in matches if match and match.group('table') in tables]
+        cursor.execute('EXPLAIN ' + sql)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        # MySQL có thể chọn quét bảng nhỏ dù có index, nên chỉ tính khi không có index nào dùng được
+        return [row['table'] for row in rows if row['type'] == 'ALL' and not row['possible_keys']]
+
+
+def bearer_client(user):
+    """Client gửi access token OAuth2 thật: các view async tự xác thực, không dùng force_authenticate được."""
+    application = get_application_model().objects.create(
+        name='test', client_type='confidential', authorization_grant_type='password', user=user)
+    token = 'token-%s' % user.pk
+    get_access_token_model().objects.create(user=user, token=token, application=application, scope='read write',
+                                            expires=timezone.now() + timezone.timedelta(days=1))
+    return Client(HTTP_AUTHORIZATION='Bearer %s' % token)
+
+
+class QueryPlanTests(TestCase):
+    """Mỗi truy vấn của các endpoint chính phải dùng được index, không quét toàn bảng."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        cls.lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        for i in range(5):
+            post = Post.objects.create(author=cls.lecturer, content='<p>Post %d #K2015 @alumni</p>' % i,
+                                       post_type=Post.PostType.REGULAR)
+            Comment.objects.create(post=post, author=cls.user, content='<p>Comment</p>')
+            Reaction.objects.create(post=post, user=cls.user, reaction_type=Reaction.ReactionType.LIKE)
+            Notification.objects.create(recipient=cls.user, notification_type=Notification.NotificationType.SYSTEM,
+                                        title='Notification %d' % i, message='<p>Message</p>')
+        cls.post = post
+
+        survey_post = Post.objects.create(author=cls.lecturer, content='<p>Survey</p>',
+                                          post_type=Post.PostType.SURVEY)
+        cls.survey = Survey.objects.create(post=survey_post, title='Survey', description='<p>Survey</p>',
+                                           end_date=timezone.now() + timezone.timedelta(days=7))
+        question = SurveyQuestion.objects.create(survey=cls.survey, question_text='<p>Question</p>',
+                                                 question_type=SurveyQuestion.QuestionType.SINGLE_CHOICE)
+        SurveyOption.objects.create(question=question, option_text='Option')
+
+        event_post = Post.objects.create(author=cls.lecturer, content='<p>Event</p>',
+                                         post_type=Post.PostType.EVENT)
+        cls.event = Event.objects.create(post=event_post, title='Event', capacity=10, attendee_count=1,
+                                         start_time=timezone.now() + timezone.timedelta(days=1))
+        EventAttendee.objects.create(event=cls.event, user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoFullScan(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        self.assertTrue(queries.captured_queries, path)
+        for query in queries.captured_queries:
+            tables = full_scans(query['sql'])
+            self.assertFalse(tables, 'GET %s: full scan on %s\n%s' % (path, ', '.join(tables), query['sql']))
+
+    def test_post_list(self):
+        self.assertNoFullScan('/posts/')
+
+    def test_post_detail(self):
+        self.assertNoFullScan('/posts/%d/' % self.post.pk)
+
+    def test_post_reactions(self):
+        self.assertNoFullScan('/posts/%d/reactions/' % self.post.pk)
+        self.assertNoFullScan('/posts/%d/reactions/?type=LIKE' % self.post.pk)
+
+    def test_notification_list(self):
+        self.assertNoFullScan('/notifications/')
+
+    def test_survey_detail(self):
+        self.assertNoFullScan('/surveys/%d/' % self.survey.pk)
+
+    def test_upcoming_events(self):
+        self.assertNoFullScan('/events/upcoming/')
+
+    def test_event_attendees(self):
+        self.assertNoFullScan('/events/%d/attendees/' % self.event.pk)
+
+    def test_tag_feed(self):
+        self.assertNoFullScan('/tags/k2015/posts/')
+
+    def test_my_mentions(self):
+        self.assertNoFullScan('/users/me/mentions/')
+
+    def test_sync(self):
+        self.assertNoFullScan('/sync/?since=0')
+
+
+class RendererTests(SimpleTestCase):
+    def test_fast_renderer_matches_stdlib(self):
+        data = {
+            'created_at': timezone.now(), 'date': datetime.date(2025, 1, 31), 'price': decimal.Decimal('1.50'),
+            'text': 'Cựu sinh viên\u2028', 2015: [1, 2.5, None, True],
+        }
+        self.assertEqual(renderers.dumps(data), JSONRenderer().render(data))
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(compression.negotiate('gzip;q=0, identity'), None)
+        self.assertEqual(compression.negotiate('*'), compression.available_encodings()[0])
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.schema_dir)
+        overrides = override_settings(API_SCHEMA_DIR=self.schema_dir, API_SCHEMA_PREBUILT=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Cùng view mà alumni/urls.py gắn cho /swagger.json|yaml khi API_SCHEMA_PREBUILT=True
+        self.view = schema.schema_json_view()
+
+    def get(self, format='.json', **headers):
+        return self.view(RequestFactory().get('/swagger' + format, **headers), format=format)
+
+    def test_prebuilt_schema_etag(self):
+        with self.assertRaises(Http404):
+            self.get()
+        call_command('build_schema', stdout=io.StringIO())
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/posts/', json.loads(response.content)['paths'])
+        self.assertEqual(self.get('.yaml')['Content-Type'], 'application/yaml')
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Build lại với nội dung khác thì ETag đổi, client có ETag cũ nhận bản mới
+        path = schema.schema_path('.json')
+        with open(path, 'w') as f:
+            json.dump({'paths': {}}, f)
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class CronTests(SimpleTestCase):
+    def test_sunday_as_seven(self):
+        saturday = datetime.datetime(2026, 10, 17, 12, 0)
+        for expression in ('0 9 * * 0', '0 9 * * 7'):
+            self.assertEqual(CronSchedule(expression).next_after(saturday), datetime.datetime(2026, 10, 18, 9, 0))
+        # Thứ Sáu tới Chủ nhật
+        self.assertEqual(CronSchedule('0 9 * * 5-7').weekdays, {4, 5, 6})
+        self.assertEqual(CronSchedule('0 9 * * *').weekdays, set(range(7)))
+        with self.assertRaises(CronError):
+            CronSchedule('0 9 * * 8')
+
+
+class ThrottleTests(SimpleTestCase):
+    def test_bucket_allows_burst_then_waits(self):
+        for buckets in (throttling.LocalBuckets(), throttling.SharedBuckets('default')):
+            key = 'test:%s' % type(buckets).__name__
+            self.assertEqual([buckets.take(key, 3, 60) for _ in range(3)], [0, 0, 0])
+            # Hết token: chờ khoảng 20 giây (60 giây / 3 token) cho token tiếp theo
+            self.assertAlmostEqual(buckets.take(key, 3, 60), 20, delta=1)
+            self.assertEqual(buckets.take('other:%s' % key, 3, 60), 0)
+
+    def test_shared_bucket_across_workers(self):
+        workers = [throttling.SharedBuckets('default') for _ in range(16)]
+        now = [time.time()]
+        with mock.patch('alumniapp.throttling.time.time', lambda: now[0]):
+            with override_settings(THROTTLE_WORKERS=16):
+                allowed = [workers[i % 16].take('test:sized', 60, 60) == 0 for i in range(61)]
+                # Đủ 60 request dù được chia đều cho 16 worker, request thứ 61 bị chặn
+                self.assertEqual(allowed, [True] * 60 + [False])
+
+            with override_settings(THROTTLE_WORKERS=1):
+                # Mỗi worker lấy trước 6 token nhưng client chỉ gửi một request tới từng worker
+                allowed = sum(worker.take('test:stranded', 60, 60) == 0 for worker in workers)
+                self.assertLess(allowed, 16)
+                # Token chưa dùng được trả lại khi phần lấy trước hết hạn
+                now[0] += throttling.LEASE_SECONDS
+                for worker in workers:
+                    worker.take('test:other', 60, 60)
+                allowed += sum(workers[0].take('test:stranded', 60, 60) == 0 for _ in range(60))
+                self.assertGreaterEqual(allowed, 60)
+
+
+class LecturerPasswordTests(TestCase):
+    def test_changed_password_is_not_deactivated(self):
+        lecturer = User.objects.create_user(username='lecturer', password='ou@123', role=User.Role.LECTURER)
+        late = User.objects.create_user(username='late', password='ou@123', role=User.Role.LECTURER)
+        self.assertIsNotNone(lecturer.password_change_deadline)
+        client = APIClient()
+        client.force_authenticate(lecturer)
+        response = client.post('/auth/change_password/', {'old_password': 'ou@123', 'new_password': 'Kh0ng-de-doan'},
+                               format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        # Các lần lưu sau (sửa hồ sơ...) không đặt lại hạn
+        lecturer.refresh_from_db()
+        lecturer.first_name = 'Lan'
+        lecturer.save()
+        User.objects.filter(pk=late.pk).update(password_change_deadline=timezone.now() - timezone.timedelta(hours=1))
+        jobs.deactivate_expired_lecturers()
+
+        lecturer.refresh_from_db()
+        late.refresh_from_db()
+        self.assertIsNone(lecturer.password_change_deadline)
+        self.assertTrue(lecturer.check_password('Kh0ng-de-doan'))
+        self.assertTrue(lecturer.is_active)
+        self.assertFalse(late.is_active)
+
+
+class ReminderTests(TestCase):
+    def test_reminders(self):
+        admin = User.objects.create_user(username='admin', password='x', role=User.Role.ADMIN)
+        alumni = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        changed = User.objects.create_user(username='changed', password='ou@123', role=User.Role.LECTURER)
+        pending = User.objects.create_user(username='pending', password='ou@123', role=User.Role.LECTURER)
+        client = APIClient()
+        client.force_authenticate(changed)
+        client.post('/auth/change_password/', {'old_password': 'ou@123', 'new_password': 'Kh0ng-de-doan'},
+                    format='json')
+        User.objects.filter(pk=pending.pk).update(password_change_deadline=timezone.now() + timezone.timedelta(hours=5))
+        post = Post.objects.create(author=admin, content='<p>Survey</p>', post_type=Post.PostType.SURVEY)
+        Survey.objects.create(post=post, title='Cohort', description='<p>Survey</p>',
+                              audience_roles=[User.Role.ALUMNI],
+                              end_date=timezone.now() + timezone.timedelta(hours=3))
+
+        self.assertEqual(reminders.remind_surveys(), 1)
+        self.assertEqual(reminders.remind_password_changes(), 1)
+        titles = dict(Notification.objects.filter(notification_type=Notification.NotificationType.REMINDER)
+                      .values_list('recipient__username', 'title'))
+        # Tiêu đề theo thời gian thực còn lại, không theo mốc 24 giờ
+        self.assertEqual(titles, {'alumni': 'Survey "Cohort" closes in 3 hours',
+                                  'pending': 'Change your password within 5 hours'})
+        # Chạy lại không nhắc trùng
+        self.assertEqual(reminders.remind_surveys() + reminders.remind_password_changes(), 0)
+
+
+@override_settings(DEADLINE_REMINDER_OFFSETS={'SURVEY': [24 * 60, 60]}, DEADLINE_REMINDER_EMAIL=False)
+class SurveyReminderTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', password='x', role=User.Role.ADMIN)
+        User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.now = timezone.now()
+        self.post = Post.objects.create(author=admin, content='<p>Survey</p>', post_type=Post.PostType.SURVEY)
+        self.survey = Survey.objects.create(post=self.post, title='Cohort', description='<p>Survey</p>',
+                                            audience_roles=[User.Role.ALUMNI],
+                                            end_date=self.now + timezone.timedelta(hours=3))
+
+    def sent_offsets(self):
+        return list(DeadlineReminder.objects.filter(object_id=self.survey.pk).order_by('pk')
+                    .values_list('offset_minutes', flat=True))
+
+    def test_current_offset(self):
+        deadline = self.now + timezone.timedelta(minutes=50)
+        self.assertEqual(reminders.current_offset(deadline, self.now, [60, 24 * 60]), 60)
+        self.assertEqual(reminders.current_offset(deadline, self.now - timezone.timedelta(hours=2), [60, 24 * 60]),
+                         24 * 60)
+        self.assertIsNone(reminders.current_offset(deadline, self.now - timezone.timedelta(days=1), [60, 24 * 60]))
+
+    def test_each_offset_sent_once(self):
+        self.assertEqual(reminders.remind_surveys(self.now), 1)
+        self.assertEqual(reminders.remind_surveys(self.now + timezone.timedelta(hours=1)), 0)
+        # Còn 30 phút: sang mốc 1 giờ
+        self.assertEqual(reminders.remind_surveys(self.now + timezone.timedelta(minutes=150)), 1)
+        self.assertEqual(self.sent_offsets(), [24 * 60, 60])
+
+    def test_late_run_sends_only_nearest_offset(self):
+        # Job không chạy trong suốt mốc 24 giờ, lần chạy đầu tiên khi chỉ còn 50 phút
+        self.assertEqual(reminders.remind_surveys(self.now + timezone.timedelta(minutes=130)), 1)
+        self.assertEqual(self.sent_offsets(), [60])
+        title = Notification.objects.get(notification_type=Notification.NotificationType.REMINDER).title
+        self.assertEqual(title, 'Survey "Cohort" closes in 50 minutes')
+
+    def test_already_reminded_at_closer_offset(self):
+        DeadlineReminder.objects.create(kind=DeadlineReminder.Kind.SURVEY, object_id=self.survey.pk,
+                                        deadline=self.survey.end_date, offset_minutes=60)
+        self.assertEqual(reminders.due(DeadlineReminder.Kind.SURVEY, [(self.survey.pk, self.survey.end_date)],
+                                       self.now), [])
+        self.assertEqual(reminders.remind_surveys(self.now), 0)
+
+    def test_deleted_post_is_not_reminded(self):
+        purge.soft_delete_post(self.post)
+        self.assertEqual(reminders.remind_surveys(self.now), 0)
+        self.assertEqual(self.sent_offsets(), [])
+
+
+class SurveyAudienceTests(TestCase):
+    def test_create_with_groups_refreshes_once(self):
+        lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        member = User.objects.create_user(username='member', password='x', role=User.Role.ALUMNI)
+        User.objects.create_user(username='other', password='x', role=User.Role.ALUMNI)
+        group = Group.objects.create(name='K2015', description='<p>K2015</p>', created_by=lecturer)
+        group.members.add(member)
+        post = Post.objects.create(author=lecturer, content='<p>Survey</p>', post_type=Post.PostType.SURVEY)
+        with mock.patch.object(surveys, 'refresh_audience', wraps=surveys.refresh_audience) as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            # Như admin: lưu khảo sát rồi gán audience_groups trong cùng transaction
+            with transaction.atomic():
+                survey = Survey.objects.create(post=post, title='Cohort', description='<p>Survey</p>',
+                                               end_date=timezone.now() + timezone.timedelta(days=7))
+                survey.audience_groups.add(group)
+        # Tính một lần sau khi đã gán nhóm, không thêm rồi xóa mọi người dùng
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(list(SurveyEligibility.objects.values_list('user__username', flat=True)), ['member'])
+
+    def test_save_keeps_bumped_version(self):
+        lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        post = Post.objects.create(author=lecturer, content='<p>Survey</p>', post_type=Post.PostType.SURVEY)
+        survey = Survey.objects.create(post=post, title='Cohort', description='<p>Survey</p>',
+                                       end_date=timezone.now() + timezone.timedelta(days=7))
+        stale = Survey.objects.get(pk=survey.pk)
+        version = surveys.get_version(survey.pk)
+        SurveyQuestion.objects.create(survey=survey, question_text='<p>Question</p>')
+        # Bản trong bộ nhớ có version cũ: lưu lại không được làm version lùi về (cache/ETag cũ được dùng lại)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(surveys.get_version(survey.pk), version + 2)
+        self.assertEqual(Survey.objects.get(pk=survey.pk).title, 'Renamed')
+
+
+class DirectoryFacetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI,
+                                             graduation_year=2015)
+
+    def user_selects(self, queries):
+        return [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT "alumniapp_user"')]
+
+    def test_save_compares_with_loaded_values(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.graduation_year = 2016
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        # Giá trị cũ lấy từ lúc tải (User.from_db), không SELECT lại người dùng
+        self.assertEqual(self.user_selects(queries), [])
+        self.assertEqual(directory.get_facets()['graduation_year'], {'2016': 1})
+        user.graduation_year = 2017
+        user.save()
+        self.assertEqual(directory.get_facets()['graduation_year'], {'2017': 1})
+
+    def test_update_fields_without_facets_skips_counts(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'An'
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['first_name'])
+        self.assertFalse([q for q in queries.captured_queries if 'alumniapp_directoryfacet' in q['sql']])
+
+    def test_stale_values_are_reloaded(self):
+        User.objects.filter(pk=self.user.pk).update(graduation_year=2016)
+        directory.rebuild_facets()
+        partial = User.objects.only('pk', 'username').get(pk=self.user.pk)
+        partial.role = User.Role.LECTURER
+        partial.save(update_fields=['role'])
+        self.user.refresh_from_db()
+        self.user.graduation_year = 2018
+        self.user.save()
+        self.assertEqual(directory.get_facets(), {'graduation_year': {'2018': 1}, 'role': {'LECTURER': 1}})
+
+
+class DirectoryTests(TestCase):
+    def setUp(self):
+        self.an = User.objects.create_user(username='an', password='x', role=User.Role.ALUMNI, first_name='An',
+                                           graduation_year=2015, is_verified=True)
+        self.binh = User.objects.create_user(username='binh', password='x', role=User.Role.ALUMNI,
+                                             first_name='Binh', graduation_year=2016)
+        self.cuong = User.objects.create_user(username='cuong', password='x', role=User.Role.LECTURER,
+                                              first_name='Cuong')
+        self.client = APIClient()
+        self.client.force_authenticate(self.an)
+
+    def search(self, **params):
+        response = self.client.get('/users/directory/', params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.search(), ['an', 'binh', 'cuong'])
+        self.assertEqual(self.search(graduation_year=2015), ['an'])
+        self.assertEqual(self.search(role=User.Role.LECTURER), ['cuong'])
+        self.assertEqual(self.search(is_verified='false', role=User.Role.ALUMNI), ['binh'])
+        self.assertEqual(self.search(q='bi'), ['binh'])
+        group = Group.objects.create(name='K2015', description='<p>K2015</p>', created_by=self.cuong)
+        group.members.add(self.an, self.cuong)
+        self.assertEqual(self.search(group=group.pk), ['an', 'cuong'])
+        for params in ({'graduation_year': 'x'}, {'role': 'GUEST'}, {'is_verified': 'yes'}):
+            self.assertEqual(self.client.get('/users/directory/', params).status_code, 400)
+        # Chỉ trường công khai
+        self.assertNotIn('email', self.client.get('/users/directory/').data['results'][0])
+
+    def test_facets_follow_changes(self):
+        facets = self.client.get('/users/directory/').data['facets']
+        self.assertEqual(facets, {'graduation_year': {'2015': 1, '2016': 1}, 'role': {'ALUMNI': 2, 'LECTURER': 1}})
+        # Khóa học chỉ sửa được trong trang quản trị (lưu cả instance)
+        binh = User.objects.get(pk=self.binh.pk)
+        binh.graduation_year = 2015
+        binh.save()
+        self.assertEqual(self.client.get('/users/directory/').data['facets']['graduation_year'], {'2015': 2})
+        self.client.force_authenticate(self.binh)
+        self.assertEqual(self.client.delete('/users/%d/' % self.binh.pk).status_code, 204)
+        self.client.force_authenticate(self.an)
+        facets = self.client.get('/users/directory/').data['facets']
+        self.assertEqual(facets, {'graduation_year': {'2015': 1}, 'role': {'ALUMNI': 1, 'LECTURER': 1}})
+        self.assertEqual(self.search(), ['an', 'cuong'])
+        # Số đếm cộng dồn khớp với đếm lại toàn bộ
+        directory.rebuild_facets()
+        self.assertEqual(directory.get_facets(), facets)
+
+
+class SuggestionTests(TestCase):
+    def test_scores_and_order(self):
+        def alumni(username, year):
+            return User.objects.create_user(username=username, password='x', role=User.Role.ALUMNI,
+                                            graduation_year=year)
+
+        me, classmate = alumni('me', 2015), alumni('a', 2015)
+        groupmate, commenter = alumni('b', 2016), alumni('c', 2016)
+        alumni('d', 2016)
+        alumni('e', 2015)
+        lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        first = Group.objects.create(name='K2015', description='<p>K2015</p>', created_by=lecturer)
+        second = Group.objects.create(name='CNTT', description='<p>CNTT</p>', created_by=lecturer)
+        first.members.add(me, classmate, groupmate, lecturer)
+        second.members.add(me, groupmate)
+        post = Post.objects.create(author=lecturer, content='<p>Post</p>')
+        Comment.objects.create(post=post, author=me, content='<p>Hi</p>')
+        Comment.objects.create(post=post, author=classmate, content='<p>Hi</p>')
+        Reaction.objects.create(post=post, user=commenter, reaction_type=Reaction.ReactionType.LIKE)
+
+        call_command('compute_suggestions', stdout=io.StringIO())
+        client = APIClient()
+        client.force_authenticate(me)
+        rows = [(row['suggested']['username'], row['score'], row['same_year'], row['shared_groups'],
+                 row['shared_posts']) for row in client.get('/users/me/suggestions/').data]
+        # Cùng khóa 3 điểm, mỗi nhóm chung 2 điểm, mỗi bài viết cùng tương tác 1 điểm; giảng viên không được gợi ý,
+        # 'd' khác khóa và không có gì chung
+        self.assertEqual(rows, [
+            ('a', 6.0, True, 1, 1),
+            ('b', 4.0, False, 2, 0),
+            ('e', 3.0, True, 0, 0),
+            ('c', 1.0, False, 0, 1),
+        ])
+
+        # Người được gợi ý bị xóa thì không còn trong danh sách dù chưa chạy lại lệnh
+        purge.soft_delete_user(classmate)
+        self.assertEqual([row['suggested']['username'] for row in client.get('/users/me/suggestions/').data],
+                         ['b', 'e', 'c'])
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.post = Post.objects.create(author=self.user, content='<p>Post</p>')
+        Comment.objects.create(post=self.post, author=self.user, content='<p>Comment</p>')
+
+    def test_stage_names_do_not_collide(self):
+        # Purge người dùng chạy các giai đoạn của từng bài viết rồi của người dùng trong cùng task
+        post_stages = {name for name, _ in purge._post_stages(self.post.pk)}
+        user_stages = {name for name, _ in purge._user_stages(self.user.pk)}
+        self.assertFalse(post_stages & user_stages)
+
+    def test_post_dependents_deleted_in_stages(self):
+        post = Post.objects.create(author=self.user, content='<p>Hi @alumni #k2015</p>')
+        comment = Comment.objects.create(post=post, author=self.user, content='<p>Hi @alumni</p>')
+        rendered = RenderedText.objects.get(object_id=post.pk, field_name='content', content_type__model='post')
+        ImageReference.objects.create(rendered=rendered, path='ckeditor/images/a.png')
+        self.assertEqual(Mention.objects.filter(post=post).count(), 2)
+        self.assertTrue(PostHashtag.objects.filter(post=post).exists())
+        task = purge.soft_delete_post(post)
+        self.assertTrue(purge._claim(task, 'worker:1'))
+        stages = purge._post_stages(post.pk)
+        self.assertEqual(stages[-1][0], 'post:%d:post' % post.pk)
+        # Đến giai đoạn cuối không còn gì để cascade khi xóa bài viết
+        purge._run_stages(task, stages[:-1], 1)
+        self.assertFalse(Mention.objects.filter(post=post).exists())
+        self.assertFalse(PostHashtag.objects.filter(post=post).exists())
+        self.assertFalse(ImageReference.objects.exists())
+        self.assertFalse(RenderedText.objects.filter(content_type__model='post', object_id=post.pk).exists())
+        self.assertFalse(RenderedText.objects.filter(content_type__model='comment', object_id=comment.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=post.pk).exists())
+        # Bài viết khác không bị ảnh hưởng
+        self.assertEqual(RenderedText.objects.filter(object_id=self.post.pk, content_type__model='post').count(), 1)
+
+    def test_claim(self):
+        task = purge.soft_delete_user(self.user)
+        # Worker khác đang chạy task: không chạy lại
+        PurgeTask.objects.filter(pk=task.pk).update(status=PurgeTask.Status.RUNNING, owner='other:1',
+                                                    updated_at=timezone.now())
+        self.assertEqual(purge.run_purge(task).owner, 'other:1')
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+
+        # Worker đó đã chết: lấy lại và chạy tiếp
+        PurgeTask.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        task = purge.run_purge(PurgeTask.objects.get(pk=task.pk))
+        self.assertEqual(task.status, PurgeTask.Status.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_taken_over_worker_stops(self):
+        task = purge.soft_delete_post(self.post)
+        self.assertTrue(purge._claim(task, 'old:1'))
+        PurgeTask.objects.filter(pk=task.pk).update(owner='new:2')
+        with self.assertRaises(purge.ClaimLost):
+            purge._run_stages(task, purge._post_stages(self.post.pk), 10)
+
+
+class NotificationTests(TestCase):
+    def test_notify_coalesces(self):
+        author = User.objects.create_user(username='author', password='x', role=User.Role.ALUMNI)
+        first = User.objects.create_user(username='first', password='x', role=User.Role.ALUMNI)
+        second = User.objects.create_user(username='second', password='x', role=User.Role.ALUMNI)
+        post = Post.objects.create(author=author, content='<p>Post</p>')
+        notifications.notify(author, Notification.NotificationType.COMMENT, first, post)
+        with CaptureQueriesContext(connection) as queries:
+            notification = notifications.notify(author, Notification.NotificationType.COMMENT, second, post)
+        # Khóa người nhận trước khi tìm thông báo để gộp
+        lookup = [i for i, q in enumerate(queries.captured_queries) if 'FROM "alumniapp_notification"' in q['sql']]
+        lock = [i for i, q in enumerate(queries.captured_queries) if 'FROM "alumniapp_user"' in q['sql']]
+        self.assertLess(lock[0], lookup[0])
+        self.assertEqual(Notification.objects.filter(recipient=author).count(), 1)
+        self.assertEqual(notification.actor_count, 2)
+
+
+class NotificationArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        now = timezone.now()
+        self.ids = []
+        for i in range(25):
+            notification = Notification.objects.create(recipient=self.user, title='N%d' % i, message='<p>N%d</p>' % i,
+                                                       notification_type=Notification.NotificationType.SYSTEM)
+            # i càng lớn càng cũ; 12 thông báo cũ nhất đã đọc từ lâu nên được chuyển sang bảng lưu trữ
+            Notification.objects.filter(pk=notification.pk).update(
+                created_at=now - timezone.timedelta(hours=i), is_read=i >= 13,
+                updated_at=now - timezone.timedelta(days=100 if i >= 13 else 0))
+            self.ids.append(notification.pk)
+        retention.archive_notifications()
+        self.assertEqual(Notification.objects.count(), 13)
+        self.assertEqual(ArchivedNotification.objects.count(), 12)
+
+    def read_pages(self, client, path):
+        pages, url = [], path
+        while url:
+            data = client.get(url).json()
+            self.assertEqual(data['count'], 25)
+            pages.append([notification['id'] for notification in data['results']])
+            url = data['next']
+        return pages
+
+    def test_pages_continue_into_archive(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # PAGE_SIZE = 10: trang 2 gồm 3 thông báo còn lại của bảng chính và 7 thông báo lưu trữ
+        expected = [self.ids[:10], self.ids[10:20], self.ids[20:]]
+        async_client = bearer_client(self.user)
+        self.assertEqual(self.read_pages(client, '/notifications/'), expected)
+        self.assertEqual(self.read_pages(async_client, '/async/notifications/'), expected)
+        self.assertEqual(client.get('/notifications/', {'page': 4}).status_code, 404)
+        self.assertEqual(async_client.get('/async/notifications/', {'page': 4}).status_code, 404)
+
+    def test_async_list_without_archive(self):
+        ArchivedNotification.objects.all().delete()
+        data = bearer_client(self.user).get('/async/notifications/', {'page': 2}).json()
+        self.assertEqual((data['count'], data['next']), (13, None))
+        self.assertEqual([notification['id'] for notification in data['results']], self.ids[10:13])
+
+    def test_retrieve_and_delete_archived(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        archived_id = self.ids[20]
+        response = client.get('/notifications/%d/' % archived_id)
+        self.assertEqual((response.status_code, response.data['title']), (200, 'N20'))
+        self.assertEqual(client.get('/notifications/abc/').status_code, 404)
+        other = User.objects.create_user(username='other', password='x', role=User.Role.ALUMNI)
+        client.force_authenticate(other)
+        self.assertEqual(client.get('/notifications/%d/' % archived_id).status_code, 404)
+        self.assertEqual(client.delete('/notifications/%d/' % archived_id).status_code, 404)
+        client.force_authenticate(self.user)
+        self.assertEqual(client.delete('/notifications/%d/' % archived_id).status_code, 204)
+        self.assertFalse(ArchivedNotification.objects.filter(pk=archived_id).exists())
+        self.assertEqual(client.get('/notifications/').data['count'], 24)
+
+
+class IdempotencyTests(TestCase):
+    def test_stale_in_progress_key_is_taken_over(self):
+        user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        post = Post.objects.create(author=user, content='<p>Post</p>')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def react():
+            return client.post('/posts/%d/react/' % post.pk, {'reaction_type': Reaction.ReactionType.LIKE},
+                               format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        with mock.patch.object(Reaction.objects, 'get_or_create', side_effect=SystemExit):
+            # Worker chết giữa chừng: key vẫn IN_PROGRESS
+            with self.assertRaises(SystemExit):
+                react()
+        self.assertEqual(react().status_code, 409)
+
+        IdempotencyKey.objects.update(locked_until=timezone.now() - timezone.timedelta(seconds=1))
+        response = react()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Reaction.objects.filter(post=post, user=user).exists())
+        self.assertEqual(react()['Idempotent-Replayed'], 'true')
+
+    def test_multipart_retry_with_new_boundary_is_replayed(self):
+        user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        post = Post.objects.create(author=user, content='<p>Post</p>')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def react(boundary, reaction_type=Reaction.ReactionType.LIKE):
+            # Client gửi lại với boundary mới như trình duyệt/thư viện HTTP thường làm
+            body = encode_multipart(boundary, {'reaction_type': reaction_type})
+            return client.generic('POST', '/posts/%d/react/' % post.pk, body,
+                                  content_type='multipart/form-data; boundary=%s' % boundary,
+                                  HTTP_IDEMPOTENCY_KEY='multipart-1')
+
+        self.assertEqual(react('boundary-one').status_code, 200)
+        replay = react('boundary-two')
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(react('boundary-three', Reaction.ReactionType.HEART).status_code, 422)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.post = Post.objects.create(author=self.user, content='<p>Post</p>')
+
+    def test_soft_delete_user_records_changes_last(self):
+        with CaptureQueriesContext(connection) as queries:
+            purge.soft_delete_user(self.user)
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertIn('"alumniapp_changelog"', writes[-1])
+        self.assertNotIn('"alumniapp_changelog"', writes[0])
+
+    def test_cutoff_waits_for_in_flight_transaction(self):
+        ChangeLog.objects.update(created_at=timezone.now() - timezone.timedelta(seconds=5))
+        self.assertEqual(len(sync.changes_since(self.user, 0)[0]), 1)
+        # Một transaction đã ghi từ 10 giây trước chưa commit: dòng của nó có thể có id nhỏ hơn dòng 5 giây
+        with mock.patch.object(sync, 'in_flight_seconds', return_value=10):
+            self.assertEqual(sync.changes_since(self.user, 0)[0], [])
+            self.assertEqual(sync.current_cursor(), 0)
+
+
+class ReactionCountTests(TestCase):
+    def test_list_counts_reactions_per_page(self):
+        author = User.objects.create_user(username='author', password='x', role=User.Role.ALUMNI)
+        reader = User.objects.create_user(username='reader', password='x', role=User.Role.ALUMNI)
+        posts = [Post.objects.create(author=author, content='<p>Post %d</p>' % i) for i in range(3)]
+        Reaction.objects.create(post=posts[0], user=author, reaction_type=Reaction.ReactionType.LIKE)
+        Reaction.objects.create(post=posts[0], user=reader, reaction_type=Reaction.ReactionType.LIKE)
+        Reaction.objects.create(post=posts[1], user=reader, reaction_type=Reaction.ReactionType.HAHA)
+        client = APIClient()
+        client.force_authenticate(reader)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/posts/')
+        counts = {post['id']: post['reaction_counts'] for post in response.data['results']}
+        self.assertEqual(counts[posts[0].pk][Reaction.ReactionType.LIKE], 2)
+        self.assertEqual(counts[posts[1].pk][Reaction.ReactionType.HAHA], 1)
+        self.assertEqual(sum(counts[posts[2].pk].values()), 0)
+        # Đếm bằng một truy vấn trên bảng reaction theo id bài viết của trang, không GROUP BY bảng bài viết
+        grouped = [q['sql'] for q in queries.captured_queries if 'GROUP BY' in q['sql']]
+        self.assertEqual(len(grouped), 1)
+        self.assertNotIn('"alumniapp_post"', grouped[0])
+
+    def test_reactions_of_missing_post_is_404(self):
+        reader = User.objects.create_user(username='reader', password='x', role=User.Role.ALUMNI)
+        post = Post.objects.create(author=reader, content='<p>Post</p>')
+        Reaction.objects.create(post=post, user=reader, reaction_type=Reaction.ReactionType.LIKE)
+        client = APIClient()
+        client.force_authenticate(reader)
+        self.assertEqual(client.get('/posts/%d/reactions/' % post.pk).status_code, 200)
+        self.assertEqual(client.get('/posts/abc/reactions/').status_code, 404)
+        purge.soft_delete_post(post)
+        self.assertEqual(client.get('/posts/%d/reactions/' % post.pk).status_code, 404)
+
+
+class ImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/',
+                                     CKEDITOR_UPLOAD_PATH='ckeditor/images', RICH_TEXT_IMAGE_MAX_WIDTH=1080)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+
+    def upload(self, name, size=None, data=None, age_hours=48):
+        path = os.path.join(self.media_root, 'ckeditor', 'images', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if data is None:
+            buffer = io.BytesIO()
+            Image.new('RGB', size).save(buffer, format='PNG')
+            data = buffer.getvalue()
+        with open(path, 'wb') as file:
+            file.write(data)
+        modified = time.time() - age_hours * 3600
+        os.utime(path, (modified, modified))
+        return 'ckeditor/images/' + name
+
+    def rendered_html(self, post):
+        return RenderedText.objects.get(object_id=post.pk, field_name='content').html
+
+    def test_img_rewritten_to_resized_variant(self):
+        path = self.upload('wide.png', (2160, 1000))
+        post = Post.objects.create(author=self.user, content='<p><img src="/media/%s"></p>' % path)
+        html = self.rendered_html(post)
+        self.assertIn('src="/media/ckeditor/resized/1080/wide.png"', html)
+        self.assertIn('width="1080"', html)
+        self.assertIn('height="500"', html)
+        self.assertEqual(list(ImageReference.objects.values_list('path', flat=True)), [path])
+
+    def test_unreadable_image_is_not_persisted(self):
+        path = self.upload('broken.png', data=b'not an image')
+        post = Post.objects.create(author=self.user, content='<p><img src="/media/%s"></p>' % path)
+        self.assertIn('src="/media/%s"' % path, self.rendered_html(post))
+        self.assertFalse(UploadedImage.objects.filter(path=path).exists())
+        # Upload xong sau đó: lần render sau đọc lại được kích thước
+        self.upload('broken.png', (200, 100))
+        post.content = '<p>Edited <img src="/media/%s"></p>' % path
+        post.save()
+        self.assertEqual(UploadedImage.objects.get(path=path).width, 200)
+
+    def test_sweep_orphans(self):
+        used = self.upload('used.png', (2160, 1000))
+        orphan = self.upload('orphan.png', (2160, 1000))
+        recent = self.upload('recent.png', (100, 100), age_hours=1)
+        Post.objects.create(author=self.user, content='<p><img src="/media/%s"></p>' % used)
+        images.get_image(orphan)
+        variant = UploadedImage.objects.get(path=orphan).variant_path
+
+        self.assertEqual(images.sweep_orphans(dry_run=True), [orphan])
+        self.assertEqual(images.sweep_orphans(), [orphan])
+        # Ảnh gốc, ảnh thu nhỏ và bản ghi của ảnh mồ côi đều bị xóa; ảnh đang dùng và ảnh mới upload được giữ
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, orphan)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, variant)))
+        self.assertFalse(UploadedImage.objects.filter(path=orphan).exists())
+        for path in (used, recent):
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+
+
+class UploadTests(TestCase):
+    chunk_size = 400
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/',
+                                      UPLOAD_TEMP_DIR=os.path.join(self.media_root, 'tmp'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        buffer = io.BytesIO()
+        # Ảnh nhiễu khó nén: khoảng 1 KB, gửi thành 3 phần
+        Image.effect_noise((32, 32), 50).save(buffer, format='PNG')
+        self.data = buffer.getvalue()
+
+    def start(self, data=None, checksum=None):
+        data = self.data if data is None else data
+        response = self.client.post('/uploads/', {
+            'target': 'AVATAR', 'filename': 'me.png', 'size': len(data),
+            'checksum': hashlib.sha256(data).hexdigest() if checksum is None else checksum,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def put(self, session_id, offset, chunk, checksum=None):
+        return self.client.generic('PUT', '/uploads/%s/chunk/' % session_id, chunk,
+                                   content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+                                   HTTP_UPLOAD_CHECKSUM='sha256 ' + (checksum or hashlib.sha256(chunk).hexdigest()))
+
+    def upload_all(self, session_id, data, start=0):
+        for offset in range(start, len(data), self.chunk_size):
+            self.assertEqual(self.put(session_id, offset, data[offset:offset + self.chunk_size]).status_code, 200)
+
+    def test_resume_after_bad_chunk(self):
+        session_id = self.start()
+        first, second = self.data[:400], self.data[400:800]
+        self.assertEqual(self.put(session_id, 0, first).data['offset'], 400)
+        # Phần hỏng không được tính, client hỏi lại offset rồi gửi tiếp
+        response = self.put(session_id, 400, second, checksum='0' * 64)
+        self.assertEqual((response.status_code, response['Upload-Offset']), (422, '400'))
+        self.assertEqual(self.client.get('/uploads/%s/' % session_id)['Upload-Offset'], '400')
+        response = self.put(session_id, 0, first)
+        self.assertEqual((response.status_code, response['Upload-Offset']), (409, '400'))
+        self.assertEqual(self.client.post('/uploads/%s/complete/' % session_id).status_code, 409)
+
+        self.upload_all(session_id, self.data, start=400)
+        self.assertEqual(self.client.post('/uploads/%s/complete/' % session_id).status_code, 200)
+        self.user.refresh_from_db()
+        with self.user.avatar.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_assembles_chunks_into_target(self):
+        session_id = self.start()
+        self.upload_all(session_id, self.data)
+        response = self.client.post('/uploads/%s/complete/' % session_id)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(response.data['url'].endswith(self.user.avatar.url))
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'tmp')))
+        # Gửi lại lệnh hoàn tất (mất phản hồi lần trước) vẫn thành công
+        self.assertEqual(self.client.post('/uploads/%s/complete/' % session_id).status_code, 200)
+
+    def test_file_checksum_mismatch(self):
+        session_id = self.start(checksum=hashlib.sha256(b'other').hexdigest())
+        self.upload_all(session_id, self.data)
+        response = self.client.post('/uploads/%s/complete/' % session_id)
+        self.assertEqual(response.status_code, 422)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    def test_rejects_non_image(self):
+        session_id = self.start(data=b'not an image' * 50)
+        self.upload_all(session_id, b'not an image' * 50)
+        self.assertEqual(self.client.post('/uploads/%s/complete/' % session_id).status_code, 422)
+
+
+class RichTextTests(TestCase):
+    def test_list_without_rendered_text(self):
+        user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        for i in range(3):
+            Post.objects.create(author=user, content='<p>Post %d</p>' % i)
+        # Chưa backfill: danh sách không được đọc lại nội dung bị defer của từng bài viết
+        RenderedText.objects.all().delete()
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['excerpt']['text'], '')
+        self.assertFalse([q for q in queries.captured_queries if '"content"' in q['sql'] and 'WHERE' in q['sql']
+                          and '"alumniapp_post"."id" =' in q['sql']])
+
+
+# Ghi nhật ký thao tác ngay trong request: luồng ghi nền không dùng được CSDL test
+@override_settings(AUDIT_LOG_BUFFER_SIZE=0)
+class EventTests(TestCase):
+    def setUp(self):
+        self.lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        self.alumni = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.other = User.objects.create_user(username='other', password='x', role=User.Role.ALUMNI)
+        self.client = APIClient()
+        self.client.force_authenticate(self.lecturer)
+        response = self.client.post('/events/', {
+            'title': 'Reunion', 'content': '<p>Reunion</p>', 'capacity': 1,
+            'start_time': timezone.now() + timezone.timedelta(days=1),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.event = Event.objects.get(pk=response.data['id'])
+
+    def rsvp(self, user, cancel=False):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/events/%d/%s/' % (self.event.pk, 'cancel_rsvp' if cancel else 'rsvp'))
+
+    def test_rsvp(self):
+        self.assertEqual(self.rsvp(self.alumni).status_code, 201)
+        self.assertEqual(self.rsvp(self.alumni).data, {'error': 'Already registered'})
+        self.assertEqual(self.rsvp(self.other).status_code, 409)
+        self.assertEqual(self.rsvp(self.alumni, cancel=True).status_code, 200)
+        self.assertEqual(self.rsvp(self.alumni, cancel=True).status_code, 400)
+        # Chỗ vừa trả lại được người khác đăng ký
+        self.assertEqual(self.rsvp(self.other).status_code, 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+        self.assertEqual(list(EventAttendee.objects.values_list('user__username', flat=True)), ['other'])
+
+    def test_rsvp_past_event(self):
+        Event.objects.filter(pk=self.event.pk).update(start_time=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(self.rsvp(self.alumni).status_code, 400)
+        self.assertFalse(EventAttendee.objects.exists())
+
+    def test_rsvp_retries_deadlock(self):
+        create = EventAttendee.objects.create
+
+        def deadlock_once(**kwargs):
+            if attempts.call_count == 1:
+                raise OperationalError(1213, 'Deadlock found when trying to get lock')
+            return create(**kwargs)
+
+        with mock.patch.object(EventAttendee.objects, 'create', side_effect=deadlock_once) as attempts:
+            self.assertEqual(self.rsvp(self.alumni).status_code, 201)
+        self.assertEqual(attempts.call_count, 2)
+        # Lần đầu đã rollback cả phần tăng số đếm
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+
+    def test_only_author_or_admin_modifies(self):
+        other_lecturer = User.objects.create_user(username='lecturer2', password='x', role=User.Role.LECTURER)
+        client = APIClient()
+        client.force_authenticate(other_lecturer)
+        self.assertEqual(client.patch('/events/%d/' % self.event.pk, {'title': 'Mine'}, format='json').status_code,
+                         403)
+        self.assertEqual(client.delete('/events/%d/' % self.event.pk).status_code, 403)
+        self.assertEqual(self.client.patch('/events/%d/' % self.event.pk, {'title': 'Renamed'},
+                                           format='json').status_code, 200)
+
+    def test_destroy_soft_deletes_post(self):
+        self.assertEqual(self.client.delete('/events/%d/' % self.event.pk).status_code, 204)
+        # Bài viết của sự kiện không còn trong bảng tin, sự kiện được purge cùng bài viết
+        self.assertIsNotNone(Post.all_objects.get(pk=self.event.post_id).deleted_at)
+        self.assertEqual(self.client.get('/posts/').data['count'], 0)
+        self.assertEqual(self.client.get('/events/%d/' % self.event.pk).status_code, 404)
+        self.assertTrue(PurgeTask.objects.filter(target_type=PurgeTask.TargetType.POST,
+                                                 target_id=self.event.post_id).exists())
+        self.assertTrue(AuditEvent.objects.filter(action=AuditEvent.Action.DELETE_POST,
+                                                  target_id=self.event.post_id).exists())
+
+
+class AsyncPostTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.posts = [Post.objects.create(author=self.user, content='<p>Post %d</p>' % i) for i in range(12)]
+        Reaction.objects.create(post=self.posts[-1], user=self.user, reaction_type=Reaction.ReactionType.HAHA)
+        Comment.objects.create(post=self.posts[0], author=self.user, content='<p>Comment</p>')
+        self.drf = APIClient()
+        self.drf.force_authenticate(self.user)
+
+    def test_requires_token(self):
+        for path in ('/async/posts/', '/async/posts/%d/' % self.posts[0].pk, '/async/notifications/'):
+            response = Client().get(path)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(Client(HTTP_AUTHORIZATION='Bearer wrong').get(path).status_code, 401)
+
+    def test_same_response_as_drf(self):
+        client = bearer_client(self.user)
+        for query in ({}, {'page': 2}):
+            # Cùng count, next/previous và nội dung từng bài (kể cả số reaction) như PostViewSet
+            data = client.get('/async/posts/', query).json()
+            for key in ('next', 'previous'):
+                data[key] = data[key] and data[key].replace('/async/', '/')
+            self.assertEqual(data, self.drf.get('/posts/', query).json())
+        self.assertEqual(client.get('/async/posts/', {'page': 3}).status_code, 404)
+        self.assertEqual(client.get('/async/posts/', {'page': 'x'}).status_code, 404)
+        path = 'posts/%d/' % self.posts[0].pk
+        self.assertEqual(client.get('/async/' + path).json(), self.drf.get('/' + path).json())
+
+    def test_deleted_post_detail_is_404(self):
+        purge.soft_delete_post(self.posts[0])
+        self.assertEqual(bearer_client(self.user).get('/async/posts/%d/' % self.posts[0].pk).status_code, 404)
+
+
+class AsyncSurveyTests(TestCase):
+    def test_ineligible_user_gets_404(self):
+        lecturer = User.objects.create_user(username='lecturer', password='x', role=User.Role.LECTURER)
+        alumni = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        student = User.objects.create_user(username='student', password='x', role=User.Role.ALUMNI,
+                                            graduation_year=2024)
+        post = Post.objects.create(author=lecturer, content='<p>Survey</p>', post_type=Post.PostType.SURVEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            survey = Survey.objects.create(post=post, title='Cohort', description='<p>Survey</p>',
+                                           audience_min_graduation_year=2024,
+                                           end_date=timezone.now() + timezone.timedelta(days=7))
+        path = '/async/surveys/%d/' % survey.pk
+        self.assertEqual(bearer_client(student).get(path).status_code, 200)
+        self.assertEqual(bearer_client(lecturer).get(path).status_code, 200)
+        # Giống SurveyViewSet: khảo sát không dành cho người này thì như không tồn tại
+        self.assertEqual(bearer_client(alumni).get(path).status_code, 404)
+        client = APIClient()
+        client.force_authenticate(alumni)
+        self.assertEqual(client.get('/surveys/%d/' % survey.pk).status_code, 404)
+
+
+class ReplicaTestCase(TransactionTestCase):
+    """
+    Thêm alias 'replica' là một CSDL SQLite riêng, chỉ có schema (như replica bị trễ): đọc nhầm từ replica
+    sẽ không thấy dữ liệu vừa ghi vào primary. TransactionTestCase vì trong transaction mọi lần đọc đều về primary.
+    """
+    # '__all__' được tính lại sau khi setUpClass thêm alias (test runner chưa biết tới 'replica')
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'file:replica?mode=memory&cache=shared'}
+        connections.settings['replica'] = connections.configure_settings({'default': {}, 'replica': replica})['replica']
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alumni', password='x', role=User.Role.ALUMNI)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class SyncReplicaTests(ReplicaTestCase):
+    def test_sync_reads_primary(self):
+        post = Post.objects.create(author=self.user, content='<p>Post</p>')
+        ChangeLog.objects.update(created_at=timezone.now() - timezone.timedelta(minutes=1))
+        since = ChangeLog.objects.order_by('pk').first().pk - 1
+        # Không ghim: GET bình thường sẽ đọc replica (chưa có dữ liệu)
+        self.assertEqual(self.client.get('/posts/').data['count'], 0)
+        response = self.client.get('/sync/', {'since': since})
+        self.assertEqual([item['id'] for item in response.data['changes']['posts']], [post.pk])
+
+
+@override_settings(REPLICA_DATABASES=['replica'], AUDIT_LOG_BUFFER_SIZE=0)
+class ReplicaRoutingTests(ReplicaTestCase):
+    def routed_read(self, view, method='get'):
+        """Chạy một request qua middleware, trả về CSDL mà router chọn để đọc trong view."""
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(db_router.ReplicaRouter().db_for_read(Post))
+            return HttpResponse()
+
+        middleware = db_router.ReplicaRoutingMiddleware(get_response)
+        middleware(getattr(RequestFactory(), method)('/', HTTP_AUTHORIZATION='Bearer client'))
+        return seen[0]
+
+    def replicated_client(self):
+        client = bearer_client(self.user)
+        # Tài khoản và token đã có trên replica từ trước (xác thực đọc từ replica)
+        for model in (User, get_application_model(), get_access_token_model()):
+            model.objects.using('replica').bulk_create(model.objects.all())
+        return client
+
+    def test_get_reads_replica_until_write_pins_primary(self):
+        client = self.replicated_client()
+        Post.objects.create(author=self.user, content='<p>Old</p>')
+        # Replica chưa có dữ liệu vừa ghi vào primary
+        self.assertEqual(client.get('/posts/').json()['count'], 0)
+        response = client.post('/posts/', {'content': '<p>New</p>', 'post_type': Post.PostType.REGULAR})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.get('/posts/').json()['count'], 2)
+        # Hết ghim thì quay lại replica
+        cache.clear()
+        self.assertEqual(client.get('/posts/').json()['count'], 0)
+
+    def test_failed_write_does_not_pin(self):
+        client = self.replicated_client()
+        self.assertEqual(client.post('/posts/', {}).status_code, 400)
+        Post.objects.create(author=self.user, content='<p>Post</p>')
+        self.assertEqual(client.get('/posts/').json()['count'], 0)
+
+    def test_reads_inside_atomic_use_primary(self):
+        router = db_router.ReplicaRouter()
+        with db_router.use_database(db_router.REPLICA):
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), 'default')
+                Post.objects.create(author=self.user, content='<p>Post</p>')
+                self.assertEqual(Post.objects.count(), 1)
+            self.assertEqual(Post.objects.count(), 0)
+
+    def test_view_decorators(self):
+        def plain(request):
+            pass
+
+        primary = db_router.use_primary(lambda request: None)
+        replica = db_router.use_replica(lambda request: None)
+        self.assertEqual(self.routed_read(plain), 'replica')
+        self.assertEqual(self.routed_read(primary), 'default')
+        self.assertEqual(self.routed_read(plain, 'post'), 'default')
+        # Đã ghim vào primary nhưng view đánh dấu @use_replica vẫn đọc replica
+        self.assertEqual(self.routed_read(plain), 'default')
+        self.assertEqual(self.routed_read(replica), 'replica')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_reads_default(self):
+        with db_router.use_database(db_router.REPLICA):
+            self.assertEqual(db_router.ReplicaRouter().db_for_read(Post), 'default')
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_MIN_ROWS=1000)
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='x', role=User.Role.ADMIN)
+        self.post = Post.objects.create(author=self.admin, content='<p>Post</p>')
+        Comment.objects.create(post=self.post, author=self.admin, content='<p>Comment</p>')
+        Reaction.objects.create(post=self.post, user=self.admin, reaction_type=Reaction.ReactionType.LIKE)
+
+    def count(self, queryset, estimate):
+        with mock.patch.object(paginators, 'estimated_row_count', return_value=estimate) as estimated, \
+                CaptureQueriesContext(connection) as queries:
+            count = paginators.EstimatedCountPaginator(queryset, 20).count
+        counted = any('COUNT(' in q['sql'] for q in queries.captured_queries)
+        return count, counted, estimated.called
+
+    def test_estimated_count(self):
+        # Bảng lớn, không lọc: dùng số ước lượng, không COUNT(*)
+        self.assertEqual(self.count(Post.objects.all(), 5000000), (5000000, False, True))
+        # Dưới ngưỡng hoặc CSDL không có thống kê: đếm chính xác
+        self.assertEqual(self.count(Post.objects.all(), 50), (1, True, True))
+        self.assertEqual(self.count(Post.objects.all(), None), (1, True, True))
+        # Có lọc: luôn đếm chính xác
+        self.assertEqual(self.count(Post.objects.filter(author=self.admin), 5000000), (1, True, False))
+
+    def test_changelists_render(self):
+        self.client.force_login(self.admin)
+        for model in ('post', 'comment', 'reaction', 'surveyresponse', 'user', 'group'):
+            response = self.client.get('/admin/alumniapp/%s/' % model)
+            self.assertEqual(response.status_code, 200, model)
+        with mock.patch.object(paginators, 'estimated_row_count', return_value=5000000):
+            response = self.client.get('/admin/alumniapp/post/')
+        self.assertEqual(response.context['cl'].result_count, 5000000)
+        response = self.client.get('/admin/alumniapp/post/%d/change/' % self.post.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Comment')
+
+
+class StopFlusher(Exception):
+    pass
+
+
+class AuditTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='x', role=User.Role.ADMIN)
+        self.client.force_login(self.admin)
+
+    def make_event(self, username='admin', action=AuditEvent.Action.DELETE_POST):
+        return AuditEvent(created_at=timezone.now(), actor_username=username, action=action)
+
+    def test_filter_by_actor_username(self):
+        AuditEvent.objects.bulk_create([self.make_event('admin'), self.make_event('removed'), self.make_event('admin')])
+        # Tài khoản 'removed' không còn trong bảng người dùng nhưng nhật ký vẫn lọc được
+        response = self.client.get('/admin/alumniapp/auditevent/', {'actor': 'removed'})
+        self.assertEqual([event.actor_username for event in response.context['events']], ['removed'])
+        response = self.client.get('/admin/alumniapp/auditevent/', {'actor': 'admin'})
+        self.assertEqual(len(response.context['events']), 2)
+
+    @mock.patch.object(AuditEventAdmin, 'page_size', 2)
+    def test_before_cursor_pagination(self):
+        AuditEvent.objects.bulk_create([self.make_event() for _ in range(5)])
+        ids = list(AuditEvent.objects.order_by('-pk').values_list('pk', flat=True))
+        pages = []
+        query = ''
+        while query is not None:
+            response = self.client.get('/admin/alumniapp/auditevent/?' + query)
+            self.assertEqual(response.status_code, 200)
+            pages.append([event.pk for event in response.context['events']])
+            query = response.context['next_query']
+        self.assertEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+        # Con trỏ không hợp lệ: quay về trang mới nhất
+        response = self.client.get('/admin/alumniapp/auditevent/', {'before': 'abc'})
+        self.assertEqual([event.pk for event in response.context['events']], ids[:2])
+
+    @override_settings(AUDIT_LOG_BUFFER_SIZE=0)
+    def test_zero_buffer_writes_synchronously(self):
+        request = RequestFactory().post('/')
+        request.user = self.admin
+        with mock.patch.object(audit.buffer, 'add') as add:
+            event = audit.record(request, AuditEvent.Action.DELETE_USER, self.admin, reason='spam')
+        add.assert_not_called()
+        saved = AuditEvent.objects.get(pk=event.pk)
+        self.assertEqual((saved.actor_username, saved.target_type, saved.data), ('admin', 'user', {'reason': 'spam'}))
+
+    @override_settings(AUDIT_LOG_BUFFER_SIZE=3)
+    def test_full_buffer_wakes_flusher(self):
+        buffer = audit.AuditBuffer()
+        with mock.patch('threading.Thread') as thread:
+            buffer.add(self.make_event())
+            buffer.add(self.make_event())
+            self.assertFalse(buffer._wakeup.is_set())
+            buffer.add(self.make_event())
+        # Một luồng ghi cho mỗi tiến trình, request không tự INSERT
+        thread.assert_called_once()
+        self.assertTrue(buffer._wakeup.is_set())
+        self.assertEqual(AuditEvent.objects.count(), 0)
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(AuditEvent.objects.count(), 3)
+
+    @override_settings(AUDIT_LOG_FLUSH_SECONDS=7)
+    def test_flusher_writes_on_timer(self):
+        buffer = audit.AuditBuffer()
+        buffer._wakeup = mock.Mock()
+        buffer._wakeup.wait.return_value = False
+        with mock.patch('threading.Thread'):
+            buffer.add(self.make_event())
+        real_flush = buffer.flush
+
+        def flush_once():
+            if flush.call_count > 1:
+                raise StopFlusher  # Dừng vòng lặp vô hạn của luồng nền
+            return real_flush()
+
+        with mock.patch.object(buffer, 'flush', side_effect=flush_once) as flush, \
+                mock.patch.object(audit, 'close_old_connections'), self.assertRaises(StopFlusher):
+            buffer._run()
+        # Không ai đánh thức: luồng nền vẫn ghi sau mỗi AUDIT_LOG_FLUSH_SECONDS
+        buffer._wakeup.wait.assert_called_with(7)
+        self.assertEqual(AuditEvent.objects.count(), 1)
+
+    @override_settings(AUDIT_LOG_BUFFER_SIZE=1)
+    def test_failed_flush_keeps_events(self):
+        buffer = audit.AuditBuffer()
+        with mock.patch('threading.Thread'):
+            buffer.add(self.make_event('first'))
+            with mock.patch.object(AuditEvent.objects, 'bulk_create', side_effect=OperationalError('gone away')), \
+                    self.assertLogs('alumniapp.audit', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+            buffer.add(self.make_event('second'))
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(list(AuditEvent.objects.order_by('pk').values_list('actor_username', flat=True)),
+                         ['first', 'second'])
+        # Lỗi kéo dài: chỉ giữ AUDIT_LOG_BUFFER_SIZE * MAX_PENDING_FACTOR sự kiện mới nhất
+        with mock.patch('threading.Thread'):
+            for i in range(audit.MAX_PENDING_FACTOR + 2):
+                buffer.add(self.make_event('user%d' % i))
+        with mock.patch.object(AuditEvent.objects, 'bulk_create', side_effect=OperationalError('gone away')), \
+                self.assertLogs('alumniapp.audit', 'ERROR'):
+            buffer.flush()
+        self.assertEqual(len(buffer._events), audit.MAX_PENDING_FACTOR)
+        self.assertEqual(buffer._events[0].actor_username, 'user2')
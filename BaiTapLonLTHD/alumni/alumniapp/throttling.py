@@ -0,0 +1,262 @@
+"""
+Rate limiting with token buckets.
+
+Every scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] is a bucket of N
+tokens per identity (user id, or client IP before login) that refills at
+N per period ("30/min": bursts of up to 30 requests, then one every 2
+seconds). UserRateThrottle applies 'user'/'anon' to every endpoint;
+ScopedRateThrottle adds the limit of the view's throttle_scope (react,
+comment, statistics...). A rejected request gets 429 with Retry-After.
+
+Buckets are kept as GCRA "theoretical arrival times": one number per key.
+Without THROTTLE_CACHE they live in process memory, so each worker counts
+on its own. With THROTTLE_CACHE set to a shared cache alias, a worker takes
+THROTTLE_LEASE_FRACTION / THROTTLE_WORKERS of a bucket with a single atomic
+incr and serves the next requests of that key from its local lease. Leases
+shrink to one token when the bucket is nearly empty and unused tokens go
+back to the bucket after LEASE_SECONDS, so the configured limit holds however
+requests are spread over the workers. A key that is out of tokens
+is remembered locally until Retry-After, so rejected requests do not touch
+the cache either. A request therefore costs one cache round trip only when
+its worker's lease runs out (a key that is new, idle for a whole period, or
+just emptied needs one or two more).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+DEFAULT_LEASE_FRACTION = 0.1
+# Token lấy trước mà chưa dùng hết trong khoảng này (giây) được trả lại cho bucket dùng chung
+LEASE_SECONDS = 2
+# Khóa trong cache dùng chung: đủ lâu để bucket của client gửi liên tục không bị mất giữa chừng
+CACHE_KEY_TIMEOUT = 24 * 60 * 60
+# Xóa bớt trạng thái trong bộ nhớ khi vượt quá số khóa này
+MAX_LOCAL_KEYS = 10000
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 60): số token tối đa và số giây để hồi đầy, None nếu không giới hạn."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def get_rate(scope):
+    return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+
+
+class LocalBuckets:
+    """Bucket trong bộ nhớ của tiến trình (thời gian tính bằng giây, time.monotonic)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat = {}
+
+    def take(self, key, count, period):
+        """Lấy một token; trả về 0 nếu được phép, ngược lại số giây phải chờ."""
+        interval = period / count
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+            wait = tat + interval - period - now
+            if wait > 0:
+                return wait
+            self._tat[key] = tat + interval
+            if len(self._tat) > MAX_LOCAL_KEYS:
+                # Bucket đã hồi đầy không cần giữ lại
+                self._tat = {k: v for k, v in self._tat.items() if v > now}
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._tat.clear()
+
+
+class Lease:
+    __slots__ = ('tokens', 'blocked_until', 'expires_at', 'cache_key', 'interval_us')
+
+    def __init__(self, tokens, blocked_until, expires_at, cache_key, interval_us):
+        self.tokens = tokens
+        self.blocked_until = blocked_until
+        self.expires_at = expires_at
+        self.cache_key = cache_key
+        self.interval_us = interval_us
+
+
+class SharedBuckets:
+    """
+    Bucket trong cache dùng chung giữa các worker (thời gian tính bằng micro giây, time.time).
+
+    Mỗi worker lấy trước một phần token của bucket bằng một lần incr rồi dùng dần tại chỗ. Phần lấy trước
+    chia theo THROTTLE_WORKERS, chỉ còn một token khi bucket gần cạn, và phần chưa dùng được trả lại sau
+    LEASE_SECONDS: token nằm yên ở worker mà client không còn gửi tới không làm client bị chặn sớm.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        # khóa -> Lease
+        self._leases = {}
+        self._next_sweep = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _take_local(self, key, now):
+        """(số giây phải chờ hoặc None nếu phải hỏi cache, phần lấy trước đã hết hạn cần trả lại)."""
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None:
+                return None, None
+            if lease.blocked_until > now:
+                return lease.blocked_until - now, None
+            if lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                return 0, None
+            del self._leases[key]
+        return None, lease
+
+    def _store(self, key, lease):
+        with self._lock:
+            if len(self._leases) > MAX_LOCAL_KEYS:
+                now = time.time()
+                self._leases = {k: v for k, v in self._leases.items() if v.tokens > 0 or v.blocked_until > now}
+            self._leases[key] = lease
+
+    def _release(self, leases):
+        for lease in leases:
+            if lease is None or lease.tokens <= 0:
+                continue
+            try:
+                self.cache.decr(lease.cache_key, lease.tokens * lease.interval_us)
+            except ValueError:
+                pass
+
+    def _sweep(self, now):
+        # Trả lại token của các phần lấy trước đã hết hạn, tối đa một lần mỗi LEASE_SECONDS
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + LEASE_SECONDS
+            expired = [key for key, lease in self._leases.items() if lease.expires_at <= now]
+            leases = [self._leases.pop(key) for key in expired]
+        self._release(leases)
+
+    def _reserve(self, cache_key, cost, now_us):
+        # Một round trip trong trường hợp thường gặp; khóa chưa có hoặc đã lâu không dùng mới cần thêm
+        try:
+            tat = self.cache.incr(cache_key, cost)
+        except ValueError:
+            tat = now_us + cost
+            if not self.cache.add(cache_key, tat, CACHE_KEY_TIMEOUT):
+                tat = self.cache.incr(cache_key, cost)
+        if tat - cost < now_us:
+            # Bucket đã hồi đầy trong lúc không có request: tính lại từ thời điểm hiện tại
+            tat = now_us + cost
+            self.cache.set(cache_key, tat, CACHE_KEY_TIMEOUT)
+        return tat - cost
+
+    def take(self, key, count, period):
+        now = time.time()
+        wait, expired = self._take_local(key, now)
+        if wait is not None:
+            return wait
+        self._release([expired])
+        self._sweep(now)
+
+        workers = max(1, getattr(settings, 'THROTTLE_WORKERS', 1))
+        fraction = getattr(settings, 'THROTTLE_LEASE_FRACTION', DEFAULT_LEASE_FRACTION)
+        lease = max(1, int(count * fraction / workers))
+        interval_us = max(1, int(period * 1000000 / count))
+        period_us = interval_us * count
+        now_us = int(now * 1000000)
+        cache_key = 'throttle:%s' % key
+        previous = self._reserve(cache_key, lease * interval_us, now_us)
+
+        # Token thứ k được phép nếu previous + k * interval - now <= period
+        available = (period_us - (previous - now_us)) // interval_us
+        granted = min(lease, available)
+        if 0 < granted and available < 2 * workers * lease:
+            # Gần cạn: mỗi worker chỉ lấy đúng token cần dùng
+            granted = 1
+        if granted < lease:
+            try:
+                # Trả lại phần đã lấy mà không dùng
+                self.cache.decr(cache_key, (lease - max(granted, 0)) * interval_us)
+            except ValueError:
+                pass
+        if granted <= 0:
+            wait = (previous + interval_us - period_us - now_us) / 1000000
+            self._store(key, Lease(0, now + wait, now + wait, cache_key, interval_us))
+            return wait
+        self._store(key, Lease(granted - 1, 0, now + LEASE_SECONDS, cache_key, interval_us))
+        return 0
+
+
+_local_buckets = LocalBuckets()
+_shared_buckets = {}
+
+
+def get_buckets():
+    alias = getattr(settings, 'THROTTLE_CACHE', None)
+    if not alias:
+        return _local_buckets
+    if alias not in _shared_buckets:
+        _shared_buckets[alias] = SharedBuckets(alias)
+    return _shared_buckets[alias]
+
+
+def reset():
+    """Xóa trạng thái trong bộ nhớ của tiến trình (dùng trong test)."""
+    _local_buckets.clear()
+    _shared_buckets.clear()
+
+
+class UserRateThrottle(throttling.BaseThrottle):
+    """Giới hạn chung cho mọi endpoint: scope 'user' theo người dùng, 'anon' theo IP khi chưa đăng nhập."""
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        return 'user' if request.user and request.user.is_authenticated else 'anon'
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            return '%s:%s' % (scope, request.user.pk)
+        return '%s:ip:%s' % (scope, self.get_ident(request))
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = get_rate(scope) if scope else None
+        if rate is None:
+            return True
+        wait = get_buckets().take(self.get_cache_key(request, scope), *rate)
+        self.wait_seconds = wait
+        return wait <= 0
+
+    def wait(self):
+        # Throttled làm tròn lên thành số giây nguyên cho Retry-After
+        return self.wait_seconds
+
+
+class ScopedRateThrottle(UserRateThrottle):
+    """Giới hạn riêng của endpoint có throttle_scope, đếm riêng cho từng người dùng."""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+
+def throttle_scope(scope):
+    """Gán throttle_scope cho view dạng hàm; đặt phía trên @api_view."""
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
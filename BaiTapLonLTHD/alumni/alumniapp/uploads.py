@@ -0,0 +1,262 @@
+"""
+Resumable uploads for Post.image, User.avatar and User.cover_image.
+
+The client creates an UploadSession with the file size (and optionally its
+SHA-256), then sends the file in chunks: PUT /uploads/<id>/chunk/ with the
+byte offset in Upload-Offset and the chunk's SHA-256 in Upload-Checksum.
+Chunks are streamed straight into a temporary file; the session's offset only
+moves after the chunk is on disk and its checksum matched, so after a broken
+connection GET /uploads/<id>/ tells the client where to resume. POST
+/uploads/<id>/complete/ checks the whole file and attaches it to its target.
+Sessions untouched for UPLOAD_SESSION_TTL_HOURS are removed by a job.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.validators import get_available_image_extensions
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+
+from .models import UploadSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 20 * 1024 * 1024
+DEFAULT_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_SESSION_TTL_HOURS = 24
+DEFAULT_MAX_ACTIVE_SESSIONS = 5
+# Request ghi một phần bị ngắt giữa chừng (worker chết) không giữ phiên lâu hơn mức này
+LOCK_SECONDS = 5 * 60
+READ_BLOCK_SIZE = 64 * 1024
+CHECKSUM_ALGORITHM = 'sha256'
+
+TARGET_FIELDS = {
+    UploadSession.Target.POST_IMAGE: 'image',
+    UploadSession.Target.AVATAR: 'avatar',
+    UploadSession.Target.COVER_IMAGE: 'cover_image',
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def get_max_size():
+    return getattr(settings, 'UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', DEFAULT_MAX_CHUNK_SIZE)
+
+
+def get_session_ttl():
+    return timezone.timedelta(hours=getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', DEFAULT_SESSION_TTL_HOURS))
+
+
+def get_temp_dir():
+    return getattr(settings, 'UPLOAD_TEMP_DIR', None) or os.path.join(tempfile.gettempdir(), 'alumni-uploads')
+
+
+def temp_path(session):
+    return os.path.join(get_temp_dir(), '%s.part' % session.pk)
+
+
+def has_image_extension(filename):
+    return os.path.splitext(filename)[1][1:].lower() in get_available_image_extensions()
+
+
+def parse_checksum(header):
+    """Header Upload-Checksum dạng "sha256 <hex>": trả về chuỗi hex, None nếu không hợp lệ."""
+    algorithm, _, value = header.strip().partition(' ')
+    value = value.strip().lower()
+    if algorithm.lower() != CHECKSUM_ALGORITHM or len(value) != 64:
+        return None
+    try:
+        int(value, 16)
+    except ValueError:
+        return None
+    return value
+
+
+def create_session(user, **fields):
+    max_active = getattr(settings, 'UPLOAD_MAX_ACTIVE_SESSIONS', DEFAULT_MAX_ACTIVE_SESSIONS)
+    active = UploadSession.objects.filter(user=user, status=UploadSession.Status.ACTIVE,
+                                          updated_at__gte=timezone.now() - get_session_ttl())
+    if active.count() >= max_active:
+        raise UploadError('Too many unfinished uploads, complete or cancel one first',
+                          status.HTTP_429_TOO_MANY_REQUESTS)
+    session = UploadSession.objects.create(user=user, **fields)
+    os.makedirs(get_temp_dir(), exist_ok=True)
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def _lock(session, offset):
+    """Giữ phiên cho request hiện tại nếu phiên đang chờ đúng offset này (UPDATE có điều kiện)."""
+    now = timezone.now()
+    locked = UploadSession.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        pk=session.pk, status=UploadSession.Status.ACTIVE, offset=offset,
+    ).update(locked_until=now + timezone.timedelta(seconds=LOCK_SECONDS), updated_at=now)
+    if locked:
+        return
+    session.refresh_from_db()
+    if session.status != UploadSession.Status.ACTIVE:
+        raise UploadError('Upload is already completed', status.HTTP_409_CONFLICT, session.offset)
+    if session.offset != offset:
+        raise UploadError('Upload-Offset does not match the received size', status.HTTP_409_CONFLICT,
+                          session.offset)
+    raise UploadError('Another request is writing to this upload', status.HTTP_409_CONFLICT, session.offset)
+
+
+def _unlock(session, **changes):
+    UploadSession.objects.filter(pk=session.pk).update(locked_until=None, updated_at=timezone.now(), **changes)
+    for name, value in changes.items():
+        setattr(session, name, value)
+
+
+def write_chunk(session, offset, length, checksum, stream):
+    """
+    Ghi length byte đọc từ stream vào file tạm tại offset.
+
+    Offset của phiên chỉ tăng khi đã nhận đủ phần này, đúng checksum và đã ghi xuống đĩa;
+    nếu không, phần đã ghi dở bị cắt bỏ để client gửi lại từ offset cũ.
+    """
+    if length <= 0 or length > get_max_chunk_size():
+        raise UploadError('Chunk size must be between 1 and %d bytes' % get_max_chunk_size(),
+                          status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if offset + length > session.size:
+        raise UploadError('Chunk goes past the declared upload size', status.HTTP_400_BAD_REQUEST, session.offset)
+    _lock(session, offset)
+
+    received = 0
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path(session), 'r+b') as file:
+            # Bỏ phần thừa của lần ghi trước bị ngắt giữa chừng
+            file.truncate(offset)
+            file.seek(offset)
+            while received < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                digest.update(block)
+                file.write(block)
+                received += len(block)
+            if received != length or digest.hexdigest() != checksum:
+                file.truncate(offset)
+            else:
+                file.flush()
+                os.fsync(file.fileno())
+    except FileNotFoundError:
+        _unlock(session)
+        raise UploadError('Upload has expired', status.HTTP_410_GONE)
+    except BaseException:
+        _unlock(session)
+        raise
+
+    if received != length:
+        _unlock(session)
+        raise UploadError('Chunk is incomplete', status.HTTP_400_BAD_REQUEST, offset)
+    if digest.hexdigest() != checksum:
+        _unlock(session)
+        raise UploadError('Chunk checksum does not match', status.HTTP_422_UNPROCESSABLE_ENTITY, offset)
+    _unlock(session, offset=offset + length)
+    return session
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_image(path):
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        return False
+    return True
+
+
+def get_target(session):
+    if session.target == UploadSession.Target.POST_IMAGE:
+        return session.post
+    return session.user
+
+
+def complete(session):
+    """Kiểm tra file đã nhận đủ và gắn vào trường ảnh của bài viết hoặc người dùng."""
+    field_name = TARGET_FIELDS[session.target]
+    if session.status == UploadSession.Status.COMPLETED:
+        # Client gửi lại sau khi mất phản hồi của lần hoàn tất trước
+        return get_target(session), field_name
+    if session.offset != session.size:
+        raise UploadError('Upload is not finished yet', status.HTTP_409_CONFLICT, session.offset)
+    _lock(session, session.size)
+
+    path = temp_path(session)
+    try:
+        if not os.path.exists(path):
+            raise UploadError('Upload has expired', status.HTTP_410_GONE)
+        if session.checksum and file_checksum(path) != session.checksum:
+            raise UploadError('File checksum does not match', status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if not verify_image(path):
+            raise UploadError('Uploaded file is not a valid image', status.HTTP_422_UNPROCESSABLE_ENTITY)
+        target = get_target(session)
+        if getattr(target, 'deleted_at', None) is not None:
+            raise UploadError('The upload target no longer exists', status.HTTP_410_GONE)
+
+        with open(path, 'rb') as file:
+            getattr(target, field_name).save(session.filename, File(file), save=False)
+        target.save(update_fields=[field_name])
+    except BaseException:
+        _unlock(session)
+        raise
+
+    _unlock(session, status=UploadSession.Status.COMPLETED)
+    os.remove(path)
+    return target, field_name
+
+
+def discard(session):
+    try:
+        os.remove(temp_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def expire_sessions():
+    """Xóa các phiên không có thay đổi trong UPLOAD_SESSION_TTL_HOURS cùng file tạm của chúng."""
+    cutoff = timezone.now() - get_session_ttl()
+    expired = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).only('pk').iterator():
+        discard(session)
+        expired += 1
+
+    # File tạm không còn phiên nào (phiên bị xóa theo user/bài viết)
+    known = {'%s.part' % pk for pk in UploadSession.objects.values_list('pk', flat=True)}
+    try:
+        names = os.listdir(get_temp_dir())
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(get_temp_dir(), name)
+        if name.endswith('.part') and name not in known and \
+                os.path.getmtime(path) < cutoff.timestamp():
+            os.remove(path)
+    logger.info('%s upload sessions expired', expired)
+    return expired
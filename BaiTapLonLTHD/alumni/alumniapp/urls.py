@@ -1,19 +1,31 @@
 from django.contrib import admin
 from django.urls import path, include
-from . import views
+from . import views, async_views
 from .admin import admin_site
 from rest_framework.routers import DefaultRouter
-from .views import (UserViewSet, PostViewSet, CommentViewSet,
-                   SurveyViewSet, GroupViewSet)
+from .views import (AuthViewSet, UserViewSet, PostViewSet, CommentViewSet,
+                   SurveyViewSet, GroupViewSet, NotificationViewSet,
+                   EventViewSet, HashtagViewSet, UploadSessionViewSet)
 
 router = DefaultRouter()
+router.register('auth', AuthViewSet, basename='auth')
 router.register('users', UserViewSet)
 router.register('posts', PostViewSet)
 router.register('comments', CommentViewSet)
 router.register('surveys', SurveyViewSet)
+router.register('events', EventViewSet)
 router.register('groups', GroupViewSet)
+router.register('tags', HashtagViewSet)
+router.register('notifications', NotificationViewSet, basename='notification')
+router.register('uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('admin/', admin_site.urls)
+    path('admin/', admin_site.urls),
+    path('sync/', views.sync_changes, name='sync'),
+    # Các endpoint đọc chạy async khi deploy bằng ASGI (uvicorn/daphne)
+    path('async/posts/', async_views.post_list, name='async-post-list'),
+    path('async/posts/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    path('async/notifications/', async_views.notification_list, name='async-notification-list'),
+    path('async/surveys/<int:pk>/', async_views.survey_detail, name='async-survey-detail'),
 ]
@@ -1,10 +1,16 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Count
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Count, F, Prefetch, Q
 from django.core.mail import send_mail
 from django.conf import settings
-from rest_framework import viewsets, status, permissions
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from rest_framework import viewsets, status, permissions, mixins, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
@@ -12,14 +18,54 @@ from rest_framework.exceptions import PermissionDenied
 
 from .models import (
     User, Post, Comment, Reaction, Survey,
-    SurveyResponse, Group, Notification
+    SurveyResponse, Group, Notification, Event, EventAttendee,
+    Hashtag, PostHashtag, Mention, UserSuggestion, ChangeLog, UploadSession, ArchivedNotification, AuditEvent
 )
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, PostSerializer,
     CommentSerializer, ReactionSerializer, SurveySerializer,
     SurveyResponseSerializer, GroupSerializer, NotificationSerializer,
-    GroupMembershipSerializer, NotificationBulkCreateSerializer
+    GroupMembershipSerializer, NotificationBulkCreateSerializer,
+    EventSerializer, EventAttendeeSerializer, ReactionUserSerializer,
+    PostListSerializer, CommentListSerializer, SurveyListSerializer,
+    GroupListSerializer, NotificationListSerializer, SurveyAnswerSerializer,
+    HashtagSerializer, MentionSerializer, DirectoryUserSerializer, UserSuggestionSerializer,
+    UploadSessionSerializer, ArchivedNotificationSerializer
 )
+from .paginators import ReactionCursorPagination, FeedCursorPagination
+from . import audit, directory, purge, retention, surveys, sync, uploads
+from .db_router import use_primary, use_replica
+from .idempotency import idempotent
+from .throttling import throttle_scope
+
+
+def post_list_queryset():
+    # Danh sách bài viết chỉ trả về excerpt: không tải nội dung HTML gốc của bài viết và bình luận
+    comments = Comment.objects.defer('content').select_related('author').prefetch_related('rendered')
+    return Post.objects.select_related('author').defer('content') \
+        .prefetch_related('rendered', Prefetch('comments', queryset=comments))
+
+
+def get_my_reactions(user, posts):
+    # Reaction của người xem cho cả trang bài viết trong một truy vấn
+    return dict(Reaction.objects.filter(
+        user=user,
+        post_id__in=[post.pk for post in posts]
+    ).values_list('post_id', 'reaction_type'))
+
+
+def reaction_count_rows(post_ids):
+    # (bài viết, loại, số reaction) chỉ cho các bài viết của trang, GROUP BY trên index (post, reaction_type, ...)
+    return Reaction.objects.filter(post_id__in=post_ids).order_by() \
+        .values_list('post_id', 'reaction_type').annotate(count=Count('pk'))
+
+
+def get_reaction_counts(posts):
+    # Số reaction theo loại cho cả trang bài viết trong một truy vấn, không JOIN/GROUP BY trên bảng bài viết
+    counts = {post.pk: dict.fromkeys(Reaction.ReactionType.values, 0) for post in posts}
+    for post_id, reaction_type, count in reaction_count_rows(list(counts)):
+        counts[post_id][reaction_type] = count
+    return counts
 
 
 class IsAdminOrLecturerOrReadOnly(permissions.BasePermission):
@@ -29,6 +75,16 @@ class IsAdminOrLecturerOrReadOnly(permissions.BasePermission):
         return request.user.role in [User.Role.ADMIN, User.Role.LECTURER]
 
 
+class ExcerptListMixin:
+    # Action list dùng serializer chỉ trả về excerpt thay cho HTML gốc
+    list_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+
 class AuthViewSet(viewsets.ViewSet):
     permission_classes = []
 
@@ -40,25 +96,91 @@ class AuthViewSet(viewsets.ViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def change_password(self, request):
         user = request.user
+        if not user.check_password(request.data.get('old_password') or ''):
+            return Response({"error": "Old password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
         if user.role == User.Role.LECTURER:
             if user.password_change_deadline and timezone.now() > user.password_change_deadline:
                 return Response(
                     {"error": "Password change deadline has passed. Contact admin."},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            user.password_change_deadline = None
-            user.save()
+        new_password = request.data.get('new_password') or ''
+        try:
+            validate_password(new_password, user)
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        user.set_password(new_password)
+        user.password_change_deadline = None
+        user.save(update_fields=['password', 'password_change_deadline'])
         return Response({"message": "Password changed successfully"})
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        if not (request.user == user or request.user.role == User.Role.ADMIN):
+            raise PermissionDenied("You don't have permission to delete this user")
+        purge.soft_delete_user(user)
+        audit.record(request, AuditEvent.Action.DELETE_USER, user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, url_path='directory')
+    def search_directory(self, request):
+        params = request.query_params
+        users = directory.directory_users()
+        try:
+            if params.get('graduation_year'):
+                users = users.filter(graduation_year=int(params['graduation_year']))
+            if params.get('group'):
+                users = users.filter(groups_custom=int(params['group']))
+        except ValueError:
+            return Response({"error": "graduation_year and group must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if params.get('role'):
+            if params['role'] not in User.Role.values:
+                return Response({"error": "Invalid role"}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(role=params['role'])
+        if params.get('is_verified'):
+            if params['is_verified'] not in ('true', 'false'):
+                return Response({"error": "is_verified must be true or false"}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(is_verified=params['is_verified'] == 'true')
+        # Mỗi từ khóa phải khớp tiền tố của tên, username hoặc mã số sinh viên (dùng được index)
+        for term in params.get('q', '').split()[:5]:
+            users = users.filter(
+                Q(first_name__istartswith=term) | Q(last_name__istartswith=term) |
+                Q(username__istartswith=term) | Q(student_id__startswith=term)
+            )
+
+        page = self.paginate_queryset(users.order_by('first_name', 'last_name', 'pk'))
+        response = self.get_paginated_response(
+            DirectoryUserSerializer(page, many=True, context=self.get_serializer_context()).data)
+        response.data['facets'] = directory.get_facets()
+        return response
+
+    @action(detail=False, url_path='me/suggestions')
+    def suggestions(self, request):
+        # Đã tính sẵn bởi lệnh compute_suggestions, chỉ đọc theo index (user, -score)
+        suggestions = UserSuggestion.objects.filter(
+            user=request.user,
+            suggested__is_active=True,
+            suggested__deleted_at__isnull=True,
+        ).select_related('suggested').order_by('-score')
+        return Response(UserSuggestionSerializer(suggestions, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=False, url_path='me/mentions', pagination_class=FeedCursorPagination)
+    def mentions(self, request):
+        mentions = Mention.objects.filter(user=request.user).select_related('author')
+        page = self.paginate_queryset(mentions)
+        return self.get_paginated_response(
+            MentionSerializer(page, many=True, context=self.get_serializer_context()).data)
+
     @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
     def create_lecturer(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
@@ -75,6 +197,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email]
             )
+            audit.record(request, AuditEvent.Action.CREATE_LECTURER, user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -88,13 +211,37 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         user.is_verified = True
         user.save()
+        audit.record(request, AuditEvent.Action.VERIFY_ALUMNI, user)
         return Response({"message": "Alumni verified successfully"})
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class PostViewSet(ExcerptListMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
+    list_serializer_class = PostListSerializer
     permission_classes = [IsAuthenticated]
+    # Giới hạn riêng của từng action (throttling.py), đặt qua @action(throttle_scope=...)
+    throttle_scope = None
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return post_list_queryset()
+        if self.action == 'reactions':
+            # Chỉ cần kiểm tra bài viết tồn tại, không nạp bình luận
+            return super().get_queryset()
+        return super().get_queryset().prefetch_related('rendered', 'comments__author', 'comments__rendered')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        posts = page if page is not None else list(queryset)
+        context = self.get_serializer_context()
+        context['my_reactions'] = get_my_reactions(request.user, posts)
+        context['reaction_counts'] = get_reaction_counts(posts)
+        serializer = self.get_serializer_class()(posts, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -103,9 +250,13 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         if not (request.user == post.author or request.user.role == User.Role.ADMIN):
             raise PermissionDenied("You don't have permission to delete this post")
-        return super().destroy(request, *args, **kwargs)
+        # Xóa mềm, dữ liệu liên quan được xóa dần bởi lệnh purge_deleted
+        purge.soft_delete_post(post)
+        audit.record(request, AuditEvent.Action.DELETE_POST, post, author=post.author_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], throttle_scope='react')
+    @idempotent
     def react(self, request, pk=None):
         post = self.get_object()
         reaction_type = request.data.get('reaction_type')
@@ -117,16 +268,49 @@ class PostViewSet(viewsets.ModelViewSet):
         if not created:
             if reaction.reaction_type == reaction_type:
                 reaction.delete()
+                sync.record(Post, [post.pk])
                 return Response({"message": "Reaction removed"})
             reaction.reaction_type = reaction_type
             reaction.save()
         return Response({"message": "Reaction updated"})
 
-
-class CommentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], url_path='reactions',
+            pagination_class=ReactionCursorPagination)
+    def reactions(self, request, pk=None):
+        post = self.get_object()
+        reactions = Reaction.objects.filter(post=post).select_related('user')
+        reaction_type = request.query_params.get('type')
+        if reaction_type:
+            if reaction_type not in Reaction.ReactionType.values:
+                return Response({"error": "Invalid reaction type"}, status=status.HTTP_400_BAD_REQUEST)
+            reactions = reactions.filter(reaction_type=reaction_type)
+        page = self.paginate_queryset(reactions)
+        return self.get_paginated_response(
+            ReactionUserSerializer(page, many=True, context=self.get_serializer_context()).data)
+
+
+class CommentViewSet(ExcerptListMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    list_serializer_class = CommentListSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.defer('content').select_related('author').prefetch_related('rendered')
+        return queryset
+
+    def get_throttles(self):
+        # Chỉ việc tạo bình luận có giới hạn riêng
+        if self.action == 'create':
+            self.throttle_scope = 'comment'
+        return super().get_throttles()
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, id=self.request.data.get('post'))
@@ -141,43 +325,249 @@ class CommentViewSet(viewsets.ModelViewSet):
                 request.user == post.author or
                 request.user.role == User.Role.ADMIN):
             raise PermissionDenied("You don't have permission to delete this comment")
-        return super().destroy(request, *args, **kwargs)
+        purge.soft_delete_comment(comment)
+        audit.record(request, AuditEvent.Action.DELETE_COMMENT, comment, author=comment.author_id, post=post.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SurveyViewSet(viewsets.ModelViewSet):
+class SurveyViewSet(ExcerptListMixin, viewsets.ModelViewSet):
     queryset = Survey.objects.all()
     serializer_class = SurveySerializer
+    list_serializer_class = SurveyListSerializer
     permission_classes = [IsAdminOrLecturerOrReadOnly]
+    throttle_scope = None
 
-    @action(detail=True, methods=['post'])
+    def get_queryset(self):
+        queryset = surveys.visible_to(super().get_queryset(), self.request.user)
+        if self.action in ('list', 'pending'):
+            return queryset.defer('description').prefetch_related(
+                'rendered', 'post__rendered', 'questions__options', 'questions__rendered')
+        return queryset
+
+    def perform_create(self, serializer):
+        # Lưu khảo sát và audience_groups trong một transaction để đối tượng chỉ tính một lần sau commit
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def pending(self, request):
+        # Khảo sát còn mở mà người dùng thuộc đối tượng nhưng chưa trả lời, theo index (user, responded_at)
+        queryset = self.get_queryset().filter(
+            eligibility__user=request.user,
+            eligibility__responded_at__isnull=True,
+            end_date__gt=timezone.now(),
+        ).order_by('end_date', 'pk')
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(
+            SurveyListSerializer(page, many=True, context=self.get_serializer_context()).data)
+
+    def get_survey_version(self, pk):
+        try:
+            version = surveys.get_version(int(pk))
+        except ValueError:
+            version = None
+        if version is None:
+            raise Http404
+        return version
+
+    @action(detail=True)
+    def definition(self, request, pk=None):
+        # Định nghĩa khảo sát đã cache, client gửi If-None-Match để nhận 304 khi chưa đổi version
+        version = self.get_survey_version(pk)
+        etag = surveys.etag(pk, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(surveys.get_definition(pk, version))
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @idempotent
     def submit_response(self, request, pk=None):
-        survey = self.get_object()
-        if not survey.is_active:
+        definition = surveys.get_definition(pk, self.get_survey_version(pk))
+        if timezone.now() > parse_datetime(definition['end_date']):
             return Response(
                 {"error": "Survey has ended"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        serializer = SurveyResponseSerializer(data=request.data)
+        if not surveys.can_respond(pk, request.user):
+            return Response({"error": "You are not in this survey's audience"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = SurveyAnswerSerializer(data=request.data, context={'request': request, 'definition': definition})
         if serializer.is_valid():
-            serializer.save(user=request.user, survey=survey)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            survey_response = serializer.save()
+            surveys.mark_responded(pk, request.user)
+            return Response(SurveyResponseSerializer(survey_response).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=True)
+    @action(detail=True, throttle_scope='statistics')
     def statistics(self, request, pk=None):
         survey = self.get_object()
-        responses = SurveyResponse.objects.filter(survey=survey)
+        total, by_question = surveys.response_statistics(survey.pk)
         return Response({
-            'total_responses': responses.count(),
-            'responses_by_question': self.get_question_statistics(survey)
+            'total_responses': total,
+            'responses_by_question': by_question,
+            'audience': surveys.response_rate(survey.pk),
         })
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class EventFull(Exception):
+    pass
+
+
+class NotRegistered(Exception):
+    pass
+
+
+# MySQL: 1213 deadlock, 1205 hết thời gian chờ khóa; InnoDB đã rollback transaction nên chạy lại được
+RETRYABLE_LOCK_ERRORS = (1213, 1205)
+LOCK_RETRIES = 3
+
+
+def retry_on_deadlock(func):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func()
+        except OperationalError as e:
+            if attempt == LOCK_RETRIES - 1 or not e.args or e.args[0] not in RETRYABLE_LOCK_ERRORS:
+                raise
+
+
+class EventViewSet(viewsets.ModelViewSet):
+    queryset = Event.objects.filter(post__deleted_at__isnull=True).select_related('post')
+    serializer_class = EventSerializer
+    permission_classes = [IsAdminOrLecturerOrReadOnly]
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            post = Post.objects.create(
+                author=self.request.user,
+                content=self.request.data.get('content', ''),
+                post_type=Post.PostType.EVENT
+            )
+            serializer.save(post=post)
+
+    def check_owner(self, event):
+        # Giảng viên chỉ sửa/xóa sự kiện mình tạo
+        user = self.request.user
+        if not (user.pk == event.post.author_id or user.role == User.Role.ADMIN):
+            raise PermissionDenied("You don't have permission to modify this event")
+
+    def perform_update(self, serializer):
+        self.check_owner(serializer.instance)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        self.check_owner(instance)
+        # Xóa mềm bài viết của sự kiện như PostViewSet.destroy: sự kiện và người tham dự được purge cùng bài viết
+        purge.soft_delete_post(instance.post)
+        audit.record(self.request, AuditEvent.Action.DELETE_POST, instance.post, author=instance.post.author_id)
+
+    @action(detail=False)
+    def upcoming(self, request):
+        # Dùng index trên start_time
+        events = self.get_queryset().filter(start_time__gte=timezone.now()).order_by('start_time')
+        page = self.paginate_queryset(events)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def rsvp(self, request, pk=None):
+        event = self.get_object()
+        if event.start_time <= timezone.now():
+            return Response({"error": "Event has already started"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def register():
+            with transaction.atomic():
+                # UPDATE có điều kiện trước: khóa dòng sự kiện rồi mới INSERT người tham dự. INSERT trước sẽ giữ
+                # khóa chia sẻ (khóa ngoại) trên dòng này và hai request đồng thời deadlock khi cùng nâng lên
+                updated = Event.objects.filter(
+                    Q(capacity__isnull=True) | Q(attendee_count__lt=F('capacity')),
+                    pk=event.pk
+                ).update(attendee_count=F('attendee_count') + 1)
+                if not updated:
+                    raise EventFull
+                # Đã đăng ký: IntegrityError làm rollback cả phần tăng số đếm
+                EventAttendee.objects.create(event=event, user=request.user)
+
+        try:
+            retry_on_deadlock(register)
+        except IntegrityError:
+            return Response({"error": "Already registered"}, status=status.HTTP_400_BAD_REQUEST)
+        except EventFull:
+            # Sự kiện đã đủ chỗ nhưng người này đã đăng ký từ trước
+            if EventAttendee.objects.filter(event=event, user=request.user).exists():
+                return Response({"error": "Already registered"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": "Event is full"}, status=status.HTTP_409_CONFLICT)
+        return Response({"message": "Registered successfully"}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def cancel_rsvp(self, request, pk=None):
+        event = self.get_object()
+
+        def cancel():
+            with transaction.atomic():
+                # Cùng thứ tự khóa với rsvp: dòng sự kiện trước, người tham dự sau
+                Event.objects.filter(pk=event.pk, attendee_count__gt=0) \
+                    .update(attendee_count=F('attendee_count') - 1)
+                deleted, _ = EventAttendee.objects.filter(event=event, user=request.user).delete()
+                if not deleted:
+                    raise NotRegistered
+
+        try:
+            retry_on_deadlock(cancel)
+        except NotRegistered:
+            return Response({"error": "Not registered"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Registration cancelled"})
+
+    @action(detail=True)
+    def attendees(self, request, pk=None):
+        event = self.get_object()
+        attendees = EventAttendee.objects.filter(event=event).select_related('user')
+        page = self.paginate_queryset(attendees)
+        return self.get_paginated_response(EventAttendeeSerializer(page, many=True, context=self.get_serializer_context()).data)
+
+
+class HashtagViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = Hashtag.objects.all()
+    serializer_class = HashtagSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'name'
+
+    def get_object(self):
+        # Tên tag luôn được lưu chữ thường
+        self.kwargs['name'] = self.kwargs['name'].lower()
+        return super().get_object()
+
+    @action(detail=True, pagination_class=FeedCursorPagination)
+    def posts(self, request, name=None):
+        hashtag = self.get_object()
+        # Phân trang trên index (hashtag, created_at) rồi lấy bài viết theo khóa chính
+        links = PostHashtag.objects.filter(hashtag=hashtag, post__deleted_at__isnull=True)
+        page = self.paginate_queryset(links)
+        posts = post_list_queryset().in_bulk([link.post_id for link in page])
+        posts = [posts[link.post_id] for link in page if link.post_id in posts]
+        context = self.get_serializer_context()
+        context['my_reactions'] = get_my_reactions(request.user, posts)
+        context['reaction_counts'] = get_reaction_counts(posts)
+        return self.get_paginated_response(PostListSerializer(posts, many=True, context=context).data)
+
+
+class GroupViewSet(ExcerptListMixin, viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    list_serializer_class = GroupListSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.defer('description').prefetch_related('rendered')
+        return queryset
+
     def perform_create(self, serializer):
         if self.request.user.role != User.Role.ADMIN:
             raise PermissionDenied("Only admins can create groups")
@@ -192,22 +582,59 @@ class GroupViewSet(viewsets.ModelViewSet):
                 group.members.add(*serializer.validated_data['user_ids'])
             else:
                 group.members.remove(*serializer.validated_data['user_ids'])
+            audit.record(request, AuditEvent.Action.MANAGE_MEMBERS, group,
+                         operation=serializer.validated_data['action'], user_ids=serializer.validated_data['user_ids'])
             return Response({"message": "Members updated successfully"})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ExcerptListMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
+    list_serializer_class = NotificationListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        queryset = Notification.objects.filter(recipient=self.request.user)
+        if self.action == 'list':
+            return queryset.defer('message').select_related('recipient').prefetch_related('rendered')
+        return queryset
+
+    def get_archived_queryset(self):
+        return ArchivedNotification.objects.filter(recipient=self.request.user).select_related('recipient')
+
+    def list(self, request, *args, **kwargs):
+        # Hết thông báo trong bảng chính thì các trang sau lấy từ bảng lưu trữ (xem retention.py)
+        inbox = retention.InboxList(self.filter_queryset(self.get_queryset()), self.get_archived_queryset())
+        page = self.paginate_queryset(inbox)
+        hot = [notification for notification in page if isinstance(notification, Notification)]
+        data = self.get_serializer(hot, many=True).data + ArchivedNotificationSerializer(
+            page[len(hot):], many=True, context=self.get_serializer_context()).data
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # generics.get_object_or_404: pk không phải số trả về 404 như bảng chính, không phải lỗi 500
+            archived = generics.get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
+            return Response(ArchivedNotificationSerializer(archived, context=self.get_serializer_context()).data)
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except Http404:
+            generics.get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk']).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    @idempotent
     def send_bulk(self, request):
         serializer = NotificationBulkCreateSerializer(data=request.data)
         if serializer.is_valid():
             notifications = serializer.create(serializer.validated_data)
+            audit.record(request, AuditEvent.Action.SEND_BULK, serializer.validated_data.get('related_post'),
+                         notification_type=serializer.validated_data['notification_type'],
+                         title=serializer.validated_data['title'], recipients=len(notifications))
             return Response(
                 NotificationSerializer(notifications, many=True).data,
                 status=status.HTTP_201_CREATED
@@ -216,12 +643,89 @@ class NotificationViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        # UPDATE có điều kiện thay cho save(): thông báo có thể vừa được chuyển sang bảng lưu trữ
+        if self.get_queryset().filter(pk=pk).update(is_read=True, updated_at=timezone.now()):
+            sync.record(Notification, [pk], recipient_ids=[request.user.pk])
+        elif not self.get_archived_queryset().filter(pk=pk).update(is_read=True):
+            raise Http404
         return Response({"message": "Marked as read"})
 
 
+def upload_error_response(error):
+    data = {"error": str(error)}
+    headers = {}
+    if error.offset is not None:
+        # Client tiếp tục gửi từ byte này
+        data['offset'] = error.offset
+        headers['Upload-Offset'] = str(error.offset)
+    return Response(data, status=error.status_code, headers=headers)
+
+
+class UploadSessionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Upload ảnh bài viết, avatar và ảnh bìa theo từng phần (xem uploads.py)."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = uploads.create_session(request.user, **serializer.validated_data)
+        except uploads.UploadError as e:
+            return upload_error_response(e)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED,
+                        headers={'Upload-Offset': '0'})
+
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        return Response(self.get_serializer(session).data, headers={'Upload-Offset': str(session.offset)})
+
+    def destroy(self, request, pk=None):
+        uploads.discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({"error": "Upload-Offset and Content-Length headers are required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        checksum = uploads.parse_checksum(request.headers.get('Upload-Checksum', ''))
+        if offset < 0 or checksum is None:
+            return Response({"error": "Upload-Checksum must be \"sha256 <hex digest>\" of the chunk"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Đọc thẳng body của request thay vì request.data: không đệm cả phần vào bộ nhớ
+        try:
+            uploads.write_chunk(session, offset, length, checksum, request.stream)
+        except uploads.UploadError as e:
+            return upload_error_response(e)
+        return Response({"offset": session.offset, "size": session.size},
+                        headers={'Upload-Offset': str(session.offset)})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        try:
+            target, field_name = uploads.complete(session)
+        except uploads.UploadError as e:
+            return upload_error_response(e)
+        data = self.get_serializer(session).data
+        data['url'] = request.build_absolute_uri(getattr(target, field_name).url)
+        return Response(data)
+
+
+@use_replica
+@throttle_scope('statistics')
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def get_statistics(request):
@@ -257,4 +761,76 @@ def get_statistics(request):
         }
     }
 
-    return Response(stats)
\ No newline at end of file
+    return Response(stats)
+
+
+# (khóa trong response, loại đối tượng, serializer của endpoint danh sách tương ứng)
+SYNC_ENTITIES = (
+    ('posts', ChangeLog.Entity.POST, PostListSerializer),
+    ('groups', ChangeLog.Entity.GROUP, GroupListSerializer),
+    ('notifications', ChangeLog.Entity.NOTIFICATION, NotificationListSerializer),
+)
+
+
+def sync_queryset(entity, user):
+    if entity == ChangeLog.Entity.POST:
+        return post_list_queryset()
+    if entity == ChangeLog.Entity.GROUP:
+        return Group.objects.defer('description').select_related('created_by').prefetch_related('rendered', 'members')
+    return Notification.objects.filter(recipient=user).defer('message') \
+        .select_related('recipient').prefetch_related('rendered')
+
+
+# Nhật ký thay đổi phải đọc từ primary: sync.get_cutoff đo transaction đang chạy trên primary, replica bị trễ
+# có thể đã có dòng N+1 mà chưa có dòng N, con trỏ của client vượt qua N và bỏ sót nó
+@use_primary
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Bài viết, nhóm và thông báo đã tạo/sửa/xóa sau con trỏ since.
+
+    Không có since hoặc con trỏ cũ hơn phần nhật ký còn giữ: trả về reset=true cùng
+    con trỏ hiện tại; client tải lại danh sách qua các endpoint thường rồi đồng bộ tiếp
+    từ con trỏ đó. has_more=true: gọi tiếp ngay với con trỏ mới.
+    """
+    try:
+        since = request.query_params.get('since')
+        since = int(since) if since is not None else None
+        limit = min(int(request.query_params.get('limit', sync.DEFAULT_BATCH_SIZE)), sync.MAX_BATCH_SIZE)
+    except ValueError:
+        return Response({"error": "since and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1 or (since is not None and since < 0):
+        return Response({"error": "since must be >= 0 and limit >= 1"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if since is None or sync.is_expired(since):
+        return Response({
+            'cursor': str(sync.current_cursor()),
+            'reset': True,
+            'has_more': False,
+            'changes': {key: [] for key, _, _ in SYNC_ENTITIES},
+            'deleted': {key: [] for key, _, _ in SYNC_ENTITIES},
+        })
+
+    rows, has_more = sync.changes_since(request.user, since, limit)
+    latest = sync.collapse(rows)
+    context = {'request': request}
+    changes, deleted = {}, {}
+    for key, entity, serializer_class in SYNC_ENTITIES:
+        ids = [pk for pk, is_deleted in latest[entity].items() if not is_deleted]
+        objects = list(sync_queryset(entity, request.user).filter(pk__in=ids).order_by('pk')) if ids else []
+        found = {obj.pk for obj in objects}
+        # Tombstone: bị xóa (kể cả xóa mềm) trong hoặc sau các thay đổi của lô này
+        deleted[key] = sorted(pk for pk in latest[entity] if pk not in found)
+        if entity == ChangeLog.Entity.POST:
+            context['my_reactions'] = get_my_reactions(request.user, objects)
+            context['reaction_counts'] = get_reaction_counts(objects)
+        changes[key] = serializer_class(objects, many=True, context=context).data
+
+    return Response({
+        'cursor': str(rows[-1][0] if rows else since),
+        'reset': False,
+        'has_more': has_more,
+        'changes': changes,
+        'deleted': deleted,
+    })